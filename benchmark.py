@@ -0,0 +1,651 @@
+# Offline load and latency benchmark for the Airtel support agent.
+#
+# Drives `main_agent.agent.root_agent` through the ADK Runner with a scripted model
+# in place of Gemini and (by default) a local SQLite stand-in seeded with the
+# scenarios from setup_database.py, so no network, API key or database server is
+# needed. Scripted conversations are replayed at a configurable concurrency and
+# per-turn metrics are written to a JSON file that later runs can be compared to.
+#
+#   python benchmark.py --sessions 200 --concurrency 20 --output bench_results.json
+#   python benchmark.py --baseline bench_results.json   # compare against an earlier run
+#   python benchmark.py --workers 4 --llm-latency-ms 200   # multi-worker, shared session store
+import argparse
+import asyncio
+import contextlib
+import contextvars
+import io
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+# --- Scripted conversations ---
+# Each turn lists the steps the model takes, in order, across all agents it passes
+# through: a tool call (including transfer_to_agent) or a final text reply. When the
+# fast path answers a turn, the model is only asked for the final reply.
+
+ROOT_AGENT = "airtel_support_agent"
+
+
+def transfer(agent_name: str) -> Tuple[str, str, Dict[str, Any]]:
+    return ("call", "transfer_to_agent", {"agent_name": agent_name})
+
+
+def call(tool: str, **args: Any) -> Tuple[str, str, Dict[str, Any]]:
+    return ("call", tool, args)
+
+
+def reply(text: str) -> Tuple[str, str, Dict[str, Any]]:
+    return ("text", text, {})
+
+
+@dataclass(frozen=True)
+class Turn:
+    message: str
+    steps: Tuple[Tuple[str, str, Dict[str, Any]], ...]
+
+
+CONVERSATIONS: Dict[str, Tuple[Turn, ...]] = {
+    # README sample: broadband order stuck in feasibility, order ID given as a follow-up.
+    "broadband_feasibility": (
+        Turn("The broadband order is stuck in feasibility check", (
+            transfer("knowledge_agent"),
+            call("search_sop", query="broadband order stuck feasibility check"),
+            transfer(ROOT_AGENT),
+            reply("Please share the order ID so I can check the address data."),
+        )),
+        Turn("The order ID is XBB10054321", (
+            transfer("execution_agent"),
+            call("run_named_query", name="broadband_address_check", params={"order_id": "XBB10054321"}),
+            transfer(ROOT_AGENT),
+            reply("The rsu is missing for XBB10054321; a ticket to the GIS team is needed."),
+        )),
+    ),
+    # README sample: bulk scan for stuck DTH activations.
+    "dth_activation_scan": (
+        Turn("Find all DTH orders stuck in activation", (
+            transfer("knowledge_agent"),
+            call("search_sop", query="DTH activation stuck"),
+            transfer("execution_agent"),
+            call("run_named_query", name="stuck_by_status_and_age", params={
+                "status": "Activation In Progress",
+                "min_age_hours": 24,
+                "organisation_process_path": "AIRTEL.DTH.INSTALL_AND_FAULT_REPAIR",
+            }),
+            transfer(ROOT_AGENT),
+            reply("DT100987654 has been in 'Activation In Progress' for more than a day."),
+        )),
+    ),
+    # Bulk triage of every stuck order in feasibility check, with GIS escalations.
+    "feasibility_triage": (
+        Turn("Triage all orders stuck in feasibility check for more than a day and raise the GIS tickets", (
+            transfer("execution_agent"),
+            call("triage_orders", root_causes=["feasibility_address_missing", "feasibility_address_present"],
+                 min_age_hours=24, escalate=True),
+            transfer(ROOT_AGENT),
+            reply("The orders stuck in feasibility check are grouped by root cause; GIS tickets were raised."),
+        )),
+    ),
+    # README sample: "Reached Onsite" by mobile number.
+    "reached_onsite": (
+        Turn("A customer with mobile number 9860434407 is unable to have a technician mark their task as 'Reached Onsite'", (
+            transfer("execution_agent"),
+            call("run_named_query", name="tasks_pending_with", params={"pending_with_details": "9860434407"}),
+            transfer(ROOT_AGENT),
+            reply("ONSITE_ISSUE_101 is pending with 9860434407 in 'Reached Onsite'."),
+        )),
+    ),
+    # Free-form SQL followed by a ticket escalation.
+    "suborder_flag_ticket": (
+        Turn("Order XBB_STUCK_999 is stuck in Pending, can you check it?", (
+            transfer("execution_agent"),
+            call("run_sql", query="SELECT order_id, status, one_airtel_suborder FROM task WHERE order_id = 'XBB_STUCK_999'"),
+            transfer(ROOT_AGENT),
+            reply("XBB_STUCK_999 is flagged as a One Airtel sub-order, which blocks it."),
+        )),
+        Turn("Please raise a ticket for it", (
+            transfer("ticket_creation_agent"),
+            call("create_ticket_api_call", ticket_details={
+                "subject": "Order stuck due to incorrect sub-order flag",
+                "description": "one_airtel_suborder is true for a standalone broadband order.",
+                "order_id": "XBB_STUCK_999",
+                "category": "Technical",
+                "priority": "High",
+            }),
+            transfer(ROOT_AGENT),
+            reply("A ticket has been raised for XBB_STUCK_999."),
+        )),
+    ),
+    # A long troubleshooting session over several orders, to check that prompt tokens per
+    # turn stay flat as the history grows (compare with --no-compaction).
+    "long_session": tuple(
+        Turn(f"Please check order {order_id} for me", (
+            transfer("execution_agent"),
+            call("run_sql", query="SELECT order_id, corelation_id, status, task_type, organisation_process_path, "
+                                  "common_details, rsu, operating_boundary_path, created_date FROM task "
+                                  f"WHERE order_id = '{order_id}' OR status = 'Completed' LIMIT 20"),
+            transfer(ROOT_AGENT),
+            reply(f"Here is what I found for {order_id}."),
+        ))
+        for order_id in ("XBB10054321", "DT100987654", "XBB_STUCK_999", "OAOE_ORDER_123",
+                         "10045909651", "SR_POSTPAID_98765", "ONSITE_ISSUE_101", "XBB10054321")
+    ),
+}
+
+
+# --- Scripted model ---
+
+
+@dataclass
+class TurnScript:
+    steps: List[Tuple[str, str, Dict[str, Any]]]
+    llm_hops: int = 0
+    prompt_tokens: int = 0
+    output_tokens: int = 0
+    fast_path: bool = False
+
+
+# The script of the turn being run by the current session task.
+current_script: contextvars.ContextVar[TurnScript] = contextvars.ContextVar("current_script")
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token)."""
+    return max(1, len(text) // 4) if text else 0
+
+
+def make_scripted_llm(llm_latency: float):
+    """Builds the scripted BaseLlm class (ADK is imported lazily, after the environment is set)."""
+    from google.adk.models.base_llm import BaseLlm
+    from google.adk.models.llm_response import LlmResponse
+    from google.genai import types
+
+    class ScriptedLlm(BaseLlm):
+        async def generate_content_async(self, llm_request, stream: bool = False):
+            script = current_script.get()
+            script.llm_hops += 1
+            prompt = str(llm_request.config.system_instruction or "") + "".join(
+                str(p.text or p.function_call or p.function_response or "")
+                for c in llm_request.contents for p in (c.parts or [])
+            )
+            prompt_tokens = estimate_tokens(prompt)
+            script.prompt_tokens += prompt_tokens
+            if llm_latency:
+                await asyncio.sleep(llm_latency)
+
+            if not llm_request.tools_dict:
+                # The fast path removed the tools: only the final answer is left to phrase.
+                script.fast_path = True
+                kind, value, _ = script.steps[-1]
+                script.steps.clear()
+            else:
+                if not script.steps:
+                    raise RuntimeError("Script exhausted: the agent asked the model for more steps than scripted.")
+                kind, value, args = script.steps.pop(0)
+                if kind == "call" and value not in llm_request.tools_dict:
+                    raise RuntimeError(
+                        f"Scripted tool '{value}' is not available here (tools: {', '.join(llm_request.tools_dict)})."
+                    )
+
+            if kind == "text":
+                part = types.Part(text=value)
+                output_tokens = estimate_tokens(value)
+            else:
+                part = types.Part(function_call=types.FunctionCall(name=value, args=args))
+                output_tokens = estimate_tokens(json.dumps(args))
+            script.output_tokens += output_tokens
+            yield LlmResponse(
+                content=types.Content(role="model", parts=[part]),
+                usage_metadata=types.GenerateContentResponseUsageMetadata(
+                    prompt_token_count=prompt_tokens,
+                    candidates_token_count=output_tokens,
+                    total_token_count=prompt_tokens + output_tokens,
+                ),
+            )
+
+    return ScriptedLlm
+
+
+def install_scripted_llm(root_agent, llm_latency: float) -> None:
+    """Replaces the model of every agent in the tree with one shared scripted model."""
+    scripted_llm = make_scripted_llm(llm_latency)(model="scripted")
+    agents = [root_agent]
+    while agents:
+        agent = agents.pop()
+        agent.model = scripted_llm
+        agents.extend(agent.sub_agents)
+
+
+# --- Measurement ---
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Linear-interpolated percentile; None for no values."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def distribution(values: List[float]) -> Dict[str, Any]:
+    return {
+        "count": len(values),
+        "mean": round(sum(values) / len(values), 3) if values else None,
+        "p50": round(percentile(values, 50), 3) if values else None,
+        "p95": round(percentile(values, 95), 3) if values else None,
+        "p99": round(percentile(values, 99), 3) if values else None,
+        "max": round(max(values), 3) if values else None,
+    }
+
+
+@dataclass
+class TurnResult:
+    conversation: str
+    turn: int
+    latency_ms: float
+    llm_hops: int = 0
+    tool_calls: int = 0
+    transfers: int = 0
+    tool_latency_ms: Dict[str, List[float]] = field(default_factory=dict)
+    rows_fetched: int = 0
+    fast_path: bool = False
+    answer_cache_hit: bool = False
+    prompt_tokens: int = 0
+    output_tokens: int = 0
+    error: Optional[str] = None
+
+
+async def run_turn(runner, session_id: str, conversation: str, index: int, turn: Turn) -> TurnResult:
+    from google.genai import types
+
+    script = TurnScript(steps=list(turn.steps))
+    token = current_script.set(script)
+    result = TurnResult(conversation=conversation, turn=index, latency_ms=0.0)
+    pending: Dict[str, Tuple[str, float]] = {}
+    message = types.Content(role="user", parts=[types.Part(text=turn.message)])
+    started = time.perf_counter()
+    try:
+        async for event in runner.run_async(user_id="bench", session_id=session_id, new_message=message):
+            now = time.perf_counter()
+            fast_path = (event.actions.state_delta or {}).get("fast_path") if event.actions else None
+            if fast_path:
+                result.rows_fetched += fast_path.get("row_count", 0)
+                if fast_path.get("answer_cache") == "hit":
+                    # Answered from the answer cache: the scripted final reply is not needed.
+                    result.answer_cache_hit = script.fast_path = True
+                    script.steps.clear()
+            for fc in event.get_function_calls():
+                if fc.name == "transfer_to_agent":
+                    result.transfers += 1
+                else:
+                    result.tool_calls += 1
+                    pending[fc.id] = (fc.name, now)
+            for fr in event.get_function_responses():
+                if fr.id in pending:
+                    name, called_at = pending.pop(fr.id)
+                    result.tool_latency_ms.setdefault(name, []).append((now - called_at) * 1000)
+                    response = fr.response or {}
+                    if isinstance(response.get("row_count"), int):
+                        result.rows_fetched += response["row_count"]
+    except Exception as e:
+        result.error = f"{type(e).__name__}: {e}"
+    finally:
+        current_script.reset(token)
+    result.latency_ms = (time.perf_counter() - started) * 1000
+    result.llm_hops = script.llm_hops
+    result.fast_path = script.fast_path
+    result.prompt_tokens = script.prompt_tokens
+    result.output_tokens = script.output_tokens
+    if result.error is None and script.steps:
+        result.error = f"Turn ended with {len(script.steps)} scripted step(s) unused."
+    return result
+
+
+async def run_session(runner, session_service, conversation: str) -> List[TurnResult]:
+    session = await session_service.create_session(app_name=runner.app_name, user_id="bench")
+    results = []
+    for index, turn in enumerate(CONVERSATIONS[conversation]):
+        results.append(await run_turn(runner, session.id, conversation, index, turn))
+    return results
+
+
+def summarize(results: List[TurnResult], sessions: int, wall_seconds: float) -> Dict[str, Any]:
+    tool_latency: Dict[str, List[float]] = {}
+    for r in results:
+        for name, values in r.tool_latency_ms.items():
+            tool_latency.setdefault(name, []).extend(values)
+    per_turn: Dict[str, List[TurnResult]] = {}
+    for r in results:
+        per_turn.setdefault(f"{r.conversation}#{r.turn}", []).append(r)
+
+    def totals(group: List[TurnResult]) -> Dict[str, Any]:
+        n = len(group)
+        return {
+            "turns": n,
+            "errors": sum(1 for r in group if r.error),
+            "latency_ms": distribution([r.latency_ms for r in group]),
+            "llm_hops_mean": round(sum(r.llm_hops for r in group) / n, 3),
+            "tool_calls_mean": round(sum(r.tool_calls for r in group) / n, 3),
+            "transfers_mean": round(sum(r.transfers for r in group) / n, 3),
+            "rows_fetched_mean": round(sum(r.rows_fetched for r in group) / n, 3),
+            "fast_path_rate": round(sum(1 for r in group if r.fast_path) / n, 4),
+            "answer_cache_hit_rate": round(sum(1 for r in group if r.answer_cache_hit) / n, 4),
+            "prompt_tokens_mean": round(sum(r.prompt_tokens for r in group) / n, 1),
+            "output_tokens_mean": round(sum(r.output_tokens for r in group) / n, 1),
+        }
+
+    return {
+        **totals(results),
+        "sessions": sessions,
+        "wall_seconds": round(wall_seconds, 3),
+        "sessions_per_second": round(sessions / wall_seconds, 3) if wall_seconds else None,
+        "turns_per_second": round(len(results) / wall_seconds, 3) if wall_seconds else None,
+        "llm_hops_total": sum(r.llm_hops for r in results),
+        "tool_calls_total": sum(r.tool_calls for r in results),
+        "rows_fetched_total": sum(r.rows_fetched for r in results),
+        "tool_latency_ms": {name: distribution(values) for name, values in sorted(tool_latency.items())},
+        "per_turn": {key: totals(group) for key, group in sorted(per_turn.items())},
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any]) -> List[str]:
+    """Lines describing how the headline numbers moved relative to a baseline run."""
+    lines = []
+
+    def delta(label, new, old):
+        if new is None or old in (None, 0):
+            return
+        lines.append(f"  {label}: {old} -> {new} ({(new - old) / old * 100:+.1f}%)")
+
+    for pct in ("p50", "p95", "p99"):
+        delta(f"turn latency {pct} (ms)", current["latency_ms"][pct], baseline["latency_ms"][pct])
+    delta("sessions/second", current["sessions_per_second"], baseline["sessions_per_second"])
+    delta("LLM hops per turn", current["llm_hops_mean"], baseline["llm_hops_mean"])
+    delta("rows fetched per turn", current["rows_fetched_mean"], baseline["rows_fetched_mean"])
+    return lines
+
+
+# --- Entry point ---
+
+
+def prepare_environment(args, workdir: str) -> None:
+    """Points the agent at throwaway local state before any agent module is imported."""
+    os.environ["TICKET_DB_PATH"] = os.path.join(workdir, "tickets.db")
+    if args.no_result_cache:
+        os.environ["RESULT_CACHE_MAX_BYTES"] = "0"
+    if args.no_compaction:
+        os.environ["CONTEXT_COMPACTION"] = "false"
+    if args.no_answer_cache:
+        os.environ["ANSWER_CACHE_TTL"] = "0"
+    if not args.use_configured_db:
+        os.environ["DB_BACKEND"] = "local"
+        os.environ["LOCAL_DB_PATH"] = os.path.join(workdir, "task.db")
+        os.environ["SESSION_DB_URL"] = f"sqlite:///{os.path.join(workdir, 'sessions.db')}"
+        from setup_database import setup_database
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            setup_database(synthetic_rows=args.synthetic_rows)
+    if args.workers:
+        from serve import prepare_session_store
+
+        prepare_session_store()
+
+
+async def run_benchmark(args) -> Dict[str, Any]:
+    from google.adk.runners import Runner
+    from google.adk.sessions import InMemorySessionService
+
+    from main_agent.agent import root_agent
+    from main_agent.answer_cache import answer_cache
+    from main_agent.db_pool import close_pool, get_backend_name, pool_stats
+    from main_agent.result_cache import result_cache
+
+    install_scripted_llm(root_agent, args.llm_latency_ms / 1000)
+    session_service = InMemorySessionService()
+    runner = Runner(agent=root_agent, app_name="benchmark", session_service=session_service)
+    conversations = args.conversations or list(CONVERSATIONS)
+    plan = [conversations[i % len(conversations)] for i in range(args.sessions)]
+
+    # Warm-up passes over each conversation (SOP index load, pool connections, imports).
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(args.warmup):
+            for name in conversations:
+                await run_session(runner, session_service, name)
+    result_cache.clear()
+    answer_cache.clear()
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def bounded(name):
+        async with semaphore:
+            return await run_session(runner, session_service, name)
+
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        sessions = await asyncio.gather(*(bounded(name) for name in plan))
+    wall_seconds = time.perf_counter() - started
+    results = [r for session in sessions for r in session]
+
+    report = {
+        "config": {
+            "sessions": args.sessions,
+            "concurrency": args.concurrency,
+            "conversations": conversations,
+            "llm_latency_ms": args.llm_latency_ms,
+            "synthetic_rows": 0 if args.use_configured_db else args.synthetic_rows,
+            "result_cache": not args.no_result_cache,
+            "context_compaction": not args.no_compaction,
+            "answer_cache": not args.no_answer_cache,
+            "db_backend": get_backend_name(),
+        },
+        "summary": summarize(results, len(sessions), wall_seconds),
+        "pool": pool_stats(),
+        "result_cache": result_cache.stats(),
+        "answer_cache": answer_cache.stats(),
+        "errors": sorted({r.error for r in results if r.error}),
+    }
+    close_pool()
+    return report
+
+
+# --- Multi-worker mode ---
+# With --workers N the sessions run in N worker processes that share one session store
+# (SESSION_DB_URL; a SQLite file in the work directory unless --use-configured-db), as
+# behind serve.py. The parent dispatches one turn at a time through a shared queue, so
+# consecutive turns of a session usually run in different workers, as they would behind
+# a load balancer without session affinity. --concurrency sessions per worker are in
+# flight at once, so throughput can be compared across worker counts.
+
+
+def _session_service(url: str):
+    from google.adk.cli.utils.service_factory import create_session_service_from_options
+
+    from serve import AGENT_DIR
+
+    return create_session_service_from_options(base_dir=AGENT_DIR, session_service_uri=url)
+
+
+async def _serve_turns(args, jobs, results, ready) -> None:
+    from google.adk.runners import Runner
+
+    from main_agent.agent import root_agent
+    from main_agent.answer_cache import answer_cache
+    from main_agent.config import SESSION_DB_URL
+    from main_agent.db_pool import close_pool, pool_stats
+    from main_agent.result_cache import result_cache
+
+    install_scripted_llm(root_agent, args.llm_latency_ms / 1000)
+    session_service = _session_service(SESSION_DB_URL)
+    runner = Runner(agent=root_agent, app_name="benchmark", session_service=session_service)
+    for _ in range(args.warmup):
+        for name in args.conversations or list(CONVERSATIONS):
+            await run_session(runner, session_service, name)
+    result_cache.clear()
+    answer_cache.clear()
+    await asyncio.to_thread(ready.wait)
+
+    # Each consumer waits for its next job on a thread of its own: blocking gets in the
+    # default executor would starve the agent's to_thread calls, and a single reader
+    # would take jobs ahead of this worker's idle consumers.
+    loop = asyncio.get_running_loop()
+    receivers = ThreadPoolExecutor(args.concurrency, thread_name_prefix="benchmark-jobs")
+
+    async def consume() -> None:
+        while True:
+            job = await loop.run_in_executor(receivers, jobs.get)
+            if job is None:
+                return
+            plan_index, session_id, conversation, index = job
+            if session_id is None:
+                session = await session_service.create_session(app_name=runner.app_name, user_id="bench")
+                session_id = session.id
+            turn = CONVERSATIONS[conversation][index]
+            results.put(("turn", plan_index, session_id, await run_turn(runner, session_id, conversation, index, turn)))
+
+    await asyncio.gather(*(consume() for _ in range(args.concurrency)))
+    receivers.shutdown()
+    results.put(("worker", os.getpid(), {
+        "pool": pool_stats(), "result_cache": result_cache.stats(), "answer_cache": answer_cache.stats(),
+    }))
+    close_pool()
+
+
+def _worker_main(args, jobs, results, ready) -> None:
+    with contextlib.redirect_stdout(io.StringIO()):
+        asyncio.run(_serve_turns(args, jobs, results, ready))
+
+
+def run_multi_worker_benchmark(args) -> Dict[str, Any]:
+    import multiprocessing
+    import queue
+
+    from main_agent.config import DB_BACKEND, SESSION_DB_URL
+
+    context = multiprocessing.get_context("spawn")
+    jobs, results = context.Queue(), context.Queue()
+    ready = context.Barrier(args.workers + 1)
+    workers = [context.Process(target=_worker_main, args=(args, jobs, results, ready), daemon=True)
+               for _ in range(args.workers)]
+    for worker in workers:
+        worker.start()
+
+    conversations = args.conversations or list(CONVERSATIONS)
+    plan = [conversations[i % len(conversations)] for i in range(args.sessions)]
+    sessions: List[List[TurnResult]] = [[] for _ in plan]
+    # Workers finish their warm-up before the clock starts.
+    ready.wait()
+    started = time.perf_counter()
+    next_session = min(len(plan), args.workers * args.concurrency)
+    for i in range(next_session):
+        jobs.put((i, None, plan[i], 0))
+    finished = 0
+    while finished < len(plan):
+        try:
+            message = results.get(timeout=1)
+        except queue.Empty:
+            if not all(worker.is_alive() for worker in workers):
+                raise RuntimeError("A benchmark worker exited early.")
+            continue
+        _, plan_index, session_id, result = message
+        sessions[plan_index].append(result)
+        if len(sessions[plan_index]) < len(CONVERSATIONS[plan[plan_index]]):
+            jobs.put((plan_index, session_id, plan[plan_index], len(sessions[plan_index])))
+            continue
+        finished += 1
+        if next_session < len(plan):
+            jobs.put((next_session, None, plan[next_session], 0))
+            next_session += 1
+    wall_seconds = time.perf_counter() - started
+
+    for _ in range(args.workers * args.concurrency):
+        jobs.put(None)
+    worker_stats = {}
+    while len(worker_stats) < args.workers:
+        _, pid, stats = results.get(timeout=60)
+        worker_stats[pid] = stats
+    for worker in workers:
+        worker.join()
+
+    results_list = [r for session in sessions for r in session]
+    return {
+        "config": {
+            "sessions": args.sessions,
+            "concurrency": args.concurrency,
+            "workers": args.workers,
+            "conversations": conversations,
+            "llm_latency_ms": args.llm_latency_ms,
+            "synthetic_rows": 0 if args.use_configured_db else args.synthetic_rows,
+            "result_cache": not args.no_result_cache,
+            "context_compaction": not args.no_compaction,
+            "answer_cache": not args.no_answer_cache,
+            "db_backend": DB_BACKEND,
+            "session_store": SESSION_DB_URL.split("://", 1)[0],
+        },
+        "summary": summarize(results_list, len(sessions), wall_seconds),
+        "workers": worker_stats,
+        "errors": sorted({r.error for r in results_list if r.error}),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Offline load and latency benchmark for root_agent.")
+    parser.add_argument("--sessions", type=int, default=100, help="Number of conversations to replay.")
+    parser.add_argument("--concurrency", type=int, default=10, help="Conversations run at the same time.")
+    parser.add_argument("--conversations", nargs="*", choices=sorted(CONVERSATIONS),
+                        help="Conversations to replay round-robin (default: all).")
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0,
+                        help="Simulated model latency added to every LLM hop.")
+    parser.add_argument("--warmup", type=int, default=1, help="Untimed passes over each conversation before measuring.")
+    parser.add_argument("--no-result-cache", action="store_true", help="Disable the tool result cache.")
+    parser.add_argument("--no-compaction", action="store_true", help="Disable session context compaction.")
+    parser.add_argument("--no-answer-cache", action="store_true", help="Disable the fast-path answer cache.")
+    parser.add_argument("--use-configured-db", action="store_true",
+                        help="Use the database configured in the environment (already seeded with setup_database.py) "
+                             "instead of a fresh local SQLite stand-in.")
+    parser.add_argument("--synthetic-rows", type=int, default=0,
+                        help="Synthetic tasks to add to the local stand-in, to benchmark against a realistic table size.")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="Run sessions in this many worker processes sharing one session store, dispatching "
+                             "each turn to any worker (default: a single in-process runner with in-memory sessions).")
+    parser.add_argument("--output", default="bench_results.json", help="Where to write the JSON results.")
+    parser.add_argument("--baseline", help="A previous results file to compare against.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="airtel_bench_") as workdir:
+        prepare_environment(args, workdir)
+        if args.workers:
+            report = run_multi_worker_benchmark(args)
+        else:
+            report = asyncio.run(run_benchmark(args))
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    summary = report["summary"]
+    latency = summary["latency_ms"]
+    print(f"{summary['sessions']} sessions / {summary['turns']} turns in {summary['wall_seconds']}s "
+          f"({summary['sessions_per_second']} sessions/s), {summary['errors']} errors")
+    print(f"Turn latency ms: p50={latency['p50']} p95={latency['p95']} p99={latency['p99']} max={latency['max']}")
+    print(f"Per turn: {summary['llm_hops_mean']} LLM hops, {summary['tool_calls_mean']} tool calls, "
+          f"{summary['rows_fetched_mean']} rows, fast path {summary['fast_path_rate'] * 100:.0f}%, "
+          f"answer cache {summary['answer_cache_hit_rate'] * 100:.0f}%")
+    for name, dist in summary["tool_latency_ms"].items():
+        print(f"  {name}: n={dist['count']} p50={dist['p50']}ms p95={dist['p95']}ms p99={dist['p99']}ms")
+    for error in report["errors"]:
+        print(f"ðŸ”´ Error: {error}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        print(f"Compared to {args.baseline}:")
+        print("\n".join(compare(summary, baseline["summary"])) or "  (no comparable numbers)")
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+import asyncio
+import json
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from .config import (
+    SERVE_MAX_ACTIVE_TURNS,
+    SERVE_MAX_QUEUED_TURNS,
+    SERVE_MAX_SQL_BACKLOG,
+    SERVE_QUEUE_TIMEOUT_SECONDS,
+)
+from .telemetry import metrics
+
+# --- Admission control for served agent turns ---
+# Each worker runs at most SERVE_MAX_ACTIVE_TURNS turns at once, and does not start a
+# new one while the SQL tools' queue is longer than SERVE_MAX_SQL_BACKLOG. Turns that
+# cannot start wait in a bounded FIFO queue; past its length or wait timeout they are
+# rejected straight away with 503 and Retry-After, so a load balancer or client can
+# retry on a less busy worker instead of piling more work onto this one.
+
+# Agent-run endpoints of ADK's API server; everything else (sessions, health) bypasses admission.
+RUN_PATHS = frozenset({"/run", "/run_sse", "/run_live"})
+# How often a queued turn re-checks the SQL backlog.
+_BACKLOG_POLL_SECONDS = 0.05
+
+
+class Overloaded(Exception):
+    """Raised when a turn is not admitted; ``reason`` is draining, queue_full or queue_timeout."""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(f"Service overloaded ({reason}), retry in {retry_after}s.")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+def _sql_backlog() -> int:
+    from .sub_agents.execution_agent.agent import sql_limiter
+
+    return sql_limiter.stats()["waiting"]
+
+
+class AdmissionController:
+    """Bounds running and queued turns in one worker process.
+
+    The semaphore is created on first use, on the worker's event loop.
+    """
+
+    def __init__(
+        self,
+        max_active: int = SERVE_MAX_ACTIVE_TURNS,
+        max_queued: int = SERVE_MAX_QUEUED_TURNS,
+        queue_timeout: float = SERVE_QUEUE_TIMEOUT_SECONDS,
+        max_backlog: int = SERVE_MAX_SQL_BACKLOG,
+        backlog: Callable[[], int] = _sql_backlog,
+    ):
+        self.max_active = max_active
+        self.max_queued = max_queued
+        self.queue_timeout = queue_timeout
+        self.max_backlog = max_backlog
+        self.backlog = backlog
+        self.draining = False
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._active = 0
+        self._queued = 0
+        self._stats = {"admitted": 0, "queued_total": 0, "shed_total": 0, "max_active_seen": 0, "max_queued_seen": 0}
+
+    def _db_busy(self) -> bool:
+        try:
+            return self.backlog() > self.max_backlog
+        except Exception:
+            return False
+
+    def saturated(self) -> bool:
+        """True when a new turn would have to queue."""
+        return self._active >= self.max_active or self._db_busy()
+
+    def _shed(self, reason: str) -> Overloaded:
+        self._stats["shed_total"] += 1
+        metrics.inc("airtel_admission_total", {"outcome": reason})
+        # Roughly how long the queue ahead takes to clear.
+        return Overloaded(reason, max(1, round(self.queue_timeout / 2)))
+
+    async def _admit(self) -> None:
+        await self._semaphore.acquire()
+        try:
+            while self._db_busy():
+                await asyncio.sleep(_BACKLOG_POLL_SECONDS)
+        except BaseException:
+            self._semaphore.release()
+            raise
+
+    async def acquire(self) -> None:
+        """Waits for a slot; raises Overloaded if the turn is shed instead."""
+        if self.draining:
+            raise self._shed("draining")
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_active)
+        if self._queued == 0 and not self._semaphore.locked() and not self._db_busy():
+            await self._semaphore.acquire()
+            outcome = "admitted"
+        else:
+            if self._queued >= self.max_queued:
+                raise self._shed("queue_full")
+            self._queued += 1
+            self._stats["queued_total"] += 1
+            self._stats["max_queued_seen"] = max(self._stats["max_queued_seen"], self._queued)
+            started = time.perf_counter()
+            try:
+                await asyncio.wait_for(self._admit(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                raise self._shed("queue_timeout") from None
+            finally:
+                self._queued -= 1
+            metrics.observe("airtel_admission_wait_seconds", {}, time.perf_counter() - started)
+            outcome = "queued"
+        self._active += 1
+        self._stats["admitted"] += 1
+        self._stats["max_active_seen"] = max(self._stats["max_active_seen"], self._active)
+        metrics.inc("airtel_admission_total", {"outcome": outcome})
+
+    def release(self) -> None:
+        self._active -= 1
+        self._semaphore.release()
+
+    async def drain(self, timeout: float) -> bool:
+        """Stops admitting turns and waits up to ``timeout`` for running ones; True if none are left."""
+        self.draining = True
+        deadline = time.monotonic() + timeout
+        while self._active and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+        return self._active == 0
+
+    def stats(self) -> Dict[str, Any]:
+        return dict(
+            self._stats, active=self._active, queued=self._queued, max_active=self.max_active,
+            max_queued=self.max_queued, draining=int(self.draining),
+        )
+
+
+# Process-wide controller; each worker process has its own.
+admission = AdmissionController()
+
+
+class AdmissionMiddleware:
+    """ASGI middleware that holds an admission slot for the whole of each agent run.
+
+    The slot covers streamed (SSE) responses and live websockets until they end.
+    Rejected HTTP requests get 503 with Retry-After; rejected websockets are refused
+    before the handshake completes.
+    """
+
+    def __init__(self, app, controller: AdmissionController = admission, paths=RUN_PATHS):
+        self.app = app
+        self.controller = controller
+        self.paths = paths
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket") or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+        try:
+            await self.controller.acquire()
+        except Overloaded as e:
+            await self._reject(scope, send, e)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release()
+
+    @staticmethod
+    async def _reject(scope, send, error: Overloaded) -> None:
+        if scope["type"] == "websocket":
+            await send({"type": "websocket.close", "code": 1013})
+            return
+        body = json.dumps({"detail": str(error), "reason": error.reason}).encode("utf-8")
+        headers: Tuple[Tuple[bytes, bytes], ...] = (
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(error.retry_after).encode()),
+        )
+        await send({"type": "http.response.start", "status": 503, "headers": list(headers)})
+        await send({"type": "http.response.body", "body": body})
@@ -2,13 +2,11 @@ from google.adk.agents import LlmAgent
 from .sub_agents.knowledge_agent.agent import knowledge_agent
 from .sub_agents.execution_agent.agent import execution_agent
 from .sub_agents.ticket_creation.agent import ticket_creation_agent
-from dotenv import load_dotenv
-
-load_dotenv()
-
-# Use a valid and available Gemini model name
-MODEL_GEMINI = "gemini-2.0-flash"
-SOP_FAQ_FILE_PATH = "Airtel_Support_SOP_FAQ.pdf" # Make sure this PDF file is in the same directory
+from .fast_path import fast_path_router
+from .answer_cache import remember_answer
+from .context_compaction import enable_compaction
+from .telemetry import instrument_agent_tree
+from .config import MODEL_GEMINI
 
 
 # --- Agent Definitions ---
@@ -19,6 +17,10 @@ root_agent = LlmAgent(
     model=MODEL_GEMINI,
     description="A multi-agent system for Airtel customer and technical support.",
     sub_agents=[knowledge_agent, execution_agent, ticket_creation_agent],
+    # Known SOP scenarios with an order ID are diagnosed directly and only phrased by the model.
+    before_model_callback=fast_path_router,
+    # Fast-path answers are kept as templates for orders in the same state.
+    after_model_callback=remember_answer,
     instruction="""
     You are the main routing agent for Airtel support. Your job is to understand the user's query and orchestrate a solution using your specialist agents.
 
@@ -30,3 +32,8 @@ root_agent = LlmAgent(
     6. If the SOP indicates that a support ticket should be created, **delegate this task to the `ticket_creation_agent`**.
     """,
 )
+
+# Earlier turns reach each agent as session facts and a short summary (see context_compaction.py).
+enable_compaction(root_agent)
+# Spans and metrics for every agent hop, model call and tool call (see telemetry.py).
+instrument_agent_tree(root_agent)
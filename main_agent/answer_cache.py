@@ -0,0 +1,188 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from .config import ANSWER_CACHE_MAX_ENTRIES, ANSWER_CACHE_TTL
+from .result_cache import make_key
+from .telemetry import metrics
+
+# --- Answer-level cache for fast-path scenarios ---
+# Orders in the same state get the same answer from the same SOP section; only the
+# order's own identifiers differ. The final answer of a fast-path turn is stored as a
+# template keyed on the scenario, the SOP section and a fingerprint of the diagnostic
+# row, and a later turn with the same key is answered without calling the model.
+
+ANSWER_CACHE_STATE_KEY = "temp:answer_cache"
+
+# Identifying values: they are replaced by placeholders in a stored answer, and only
+# whether they are present is part of the fingerprint.
+VALUE_COLUMNS = ("order_id", "corelation_id", "rsu", "operating_boundary_path", "pending_with_details")
+# Columns left out of the fingerprint; an answer quoting a date is not cached.
+TIME_COLUMNS = ("created_date", "modified_date")
+_DATE_RE = re.compile(r"\b\d{4}-\d{2}-\d{2}\b")
+# Shorter values could match unrelated text in the answer.
+_MIN_VALUE_LENGTH = 3
+
+
+def answer_key(scenario: str, sop: Optional[Dict[str, str]], rows: List[Dict[str, Any]]) -> Optional[str]:
+    """Cache key for a diagnostic result, or None if it cannot be shared between orders.
+
+    Only results with at most one row are cacheable: a list of orders is specific to its
+    identifier. Every other column of the row (status, flags, JSON bin) is fingerprinted.
+    """
+    if len(rows) > 1:
+        return None
+    state: Dict[str, Any] = {"rows": len(rows)}
+    for column, value in (rows[0] if rows else {}).items():
+        if column in VALUE_COLUMNS:
+            state[f"has_{column}"] = bool(value)
+        elif column not in TIME_COLUMNS:
+            state[column] = value
+    return make_key("answer", scenario, sop["id"] if sop else None, state)
+
+
+def answer_values(identifier: str, rows: List[Dict[str, Any]]) -> Dict[str, str]:
+    """The order-specific values of an answer, by placeholder name."""
+    values = {"identifier": identifier}
+    for column in VALUE_COLUMNS:
+        value = rows[0].get(column) if rows else None
+        if value and str(value) != identifier:
+            values[column] = str(value)
+    return values
+
+
+def make_template(answer: str, values: Dict[str, str], id_pattern: str) -> Optional[str]:
+    """Replaces the order-specific values in an answer with placeholders.
+
+    Returns None if the answer still names another identifier or quotes a date, which a
+    different order in the same state would not share.
+    """
+    template = answer
+    for name, value in sorted(values.items(), key=lambda item: -len(item[1])):
+        if len(value) >= _MIN_VALUE_LENGTH:
+            template = template.replace(value, "{" + name + "}")
+    if re.search(id_pattern, template) or _DATE_RE.search(template):
+        return None
+    return template
+
+
+def fill_template(template: str, values: Dict[str, str]) -> str:
+    for name, value in values.items():
+        template = template.replace("{" + name + "}", value)
+    return template
+
+
+class AnswerCache:
+    """A thread-safe TTL cache of answer templates with LRU eviction by entry count.
+
+    Each entry remembers the hash of the SOP document it was answered from; an entry
+    from an older document is stale, like an expired one.
+    """
+
+    def __init__(self, max_entries: int = ANSWER_CACHE_MAX_ENTRIES, ttl: float = ANSWER_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # key -> (template, sop_hash, expires_at)
+        self._entries: "OrderedDict[str, Tuple[str, str, float]]" = OrderedDict()
+        self._stats = {"hits": 0, "misses": 0, "stale": 0, "stores": 0, "evictions": 0}
+
+    def get(self, key: str, sop_hash: str) -> Tuple[Optional[str], str]:
+        """Returns (template, outcome) with outcome 'hit', 'miss' or 'stale'."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None, "miss"
+            template, entry_hash, expires_at = entry
+            if entry_hash != sop_hash or expires_at <= time.monotonic():
+                del self._entries[key]
+                self._stats["stale"] += 1
+                return None, "stale"
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+        return template, "hit"
+
+    def put(self, key: str, template: str, sop_hash: str) -> None:
+        if self.ttl <= 0 or self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (template, sop_hash, time.monotonic() + self.ttl)
+            self._stats["stores"] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def clear(self) -> int:
+        with self._lock:
+            count = len(self._entries)
+            self._entries.clear()
+        return count
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns hit-rate, staleness and occupancy counters."""
+        with self._lock:
+            stats = dict(self._stats, entries=len(self._entries), max_entries=self.max_entries)
+        lookups = stats["hits"] + stats["misses"] + stats["stale"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        return stats
+
+
+# Process-wide cache shared by every session in this worker.
+answer_cache = AnswerCache()
+
+
+def _sop_hash() -> Optional[str]:
+    try:
+        from .sub_agents.knowledge_agent.agent import get_sop_index
+
+        return get_sop_index().source_hash
+    except Exception:
+        return None
+
+
+def lookup_answer(callback_context, scenario, identifier: str, rows: List[Dict[str, Any]],
+                  sop: Optional[Dict[str, str]]) -> Tuple[Optional[str], Optional[str]]:
+    """Looks up the answer for a fast-path diagnostic; returns (answer, outcome).
+
+    On a miss the key is kept in invocation state so `remember_answer` can store the
+    model's answer. The outcome is None when the result is not cacheable.
+    """
+    key = answer_key(scenario.name, sop, rows) if answer_cache.ttl > 0 else None
+    sop_hash = _sop_hash() if key else None
+    if sop_hash is None:
+        return None, None
+    values = answer_values(identifier, rows)
+    template, outcome = answer_cache.get(key, sop_hash)
+    metrics.inc("airtel_answer_cache_total", {"scenario": scenario.name, "outcome": outcome})
+    if template is not None:
+        return fill_template(template, values), outcome
+    callback_context.state[ANSWER_CACHE_STATE_KEY] = {
+        "invocation_id": callback_context.invocation_id,
+        "key": key,
+        "sop_hash": sop_hash,
+        "values": values,
+        "id_pattern": scenario.id_pattern,
+    }
+    return None, outcome
+
+
+def remember_answer(callback_context, llm_response) -> None:
+    """after_model_callback for `root_agent`: stores the answer of a fast-path miss."""
+    pending = callback_context.state.get(ANSWER_CACHE_STATE_KEY)
+    if not pending or pending.get("invocation_id") != callback_context.invocation_id:
+        return None
+    if llm_response.partial or llm_response.error_code or not llm_response.content:
+        return None
+    parts = llm_response.content.parts or []
+    if not parts or any(p.function_call for p in parts):
+        return None
+    answer = "".join(p.text or "" for p in parts if not p.thought).strip()
+    callback_context.state[ANSWER_CACHE_STATE_KEY] = None
+    template = make_template(answer, pending["values"], pending["id_pattern"]) if answer else None
+    if template is not None:
+        answer_cache.put(pending["key"], template, pending["sop_hash"])
+    return None
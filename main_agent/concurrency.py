@@ -0,0 +1,72 @@
+import asyncio
+import weakref
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Dict, Optional
+
+
+class ToolLimiter:
+    """Caps how many calls of one tool run at once on an event loop.
+
+    ADK awaits async tools on the server's event loop, so a limiter keeps one busy
+    tool (e.g. a slow database) from starving every other session. Semaphores are
+    bound to an event loop, so one is created lazily per running loop.
+    """
+
+    def __init__(self, name: str, limit: int):
+        if limit < 1:
+            raise ValueError(f"Concurrency limit for '{name}' must be at least 1.")
+        self.name = name
+        self.limit = limit
+        self._semaphores = weakref.WeakKeyDictionary()
+        self._stats = {"in_flight": 0, "max_in_flight": 0, "waiting": 0, "calls": 0, "cancelled": 0}
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.limit)
+        return semaphore
+
+    @asynccontextmanager
+    async def slot(self):
+        """Waits for a free slot and holds it for the duration of the block."""
+        semaphore = self._semaphore()
+        self._stats["waiting"] += 1
+        try:
+            await semaphore.acquire()
+        finally:
+            self._stats["waiting"] -= 1
+        self._stats["calls"] += 1
+        self._stats["in_flight"] += 1
+        self._stats["max_in_flight"] = max(self._stats["max_in_flight"], self._stats["in_flight"])
+        try:
+            yield
+        except asyncio.CancelledError:
+            self._stats["cancelled"] += 1
+            raise
+        finally:
+            self._stats["in_flight"] -= 1
+            semaphore.release()
+
+    async def run_in_thread(
+        self, func: Callable[..., Any], *args: Any, on_cancel: Optional[Callable[[], None]] = None
+    ) -> Any:
+        """Runs a blocking function in a worker thread while holding a slot.
+
+        If the awaiting task is cancelled (e.g. the user's session went away),
+        ``on_cancel`` is called so the blocking work can be interrupted, and the slot
+        is kept until the thread has actually finished so the limit stays accurate.
+        """
+        async with self.slot():
+            future = asyncio.ensure_future(asyncio.to_thread(func, *args))
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if on_cancel is not None:
+                    on_cancel()
+                await asyncio.wait([future])
+                raise
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns in-flight, queue and cancellation counters for this tool."""
+        return {"limit": self.limit, **self._stats}
@@ -0,0 +1,410 @@
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from . import config
+
+
+class PoolTimeout(Exception):
+    """Raised when no pooled connection becomes available within the acquire timeout."""
+
+
+# --- Connection Backends ---
+# Each backend is a zero-argument callable returning a new DB-API connection.
+# They import their drivers lazily so only the selected backend's packages are needed.
+
+# Global variable for the Cloud SQL Connector instance to manage its lifecycle
+cloud_sql_connector = None
+
+
+def connect_cloud_sql():
+    """Opens a pg8000 connection through the Cloud SQL Python Connector.
+
+    Uses CLOUD_SQL_CONNECTION_NAME, DB_USER, DB_PASSWORD and DB_NAME, which
+    main_agent/config.py checks at startup. The connector itself is created on the
+    first connection and shared by every later one.
+
+    Raises:
+        Exception: If the connection fails for any reason.
+    """
+    global cloud_sql_connector
+    instance_connection_name = config.CLOUD_SQL_CONNECTION_NAME
+    try:
+        from google.cloud.sql.connector import Connector, IPTypes
+
+        if cloud_sql_connector is None:
+            ip_type = IPTypes.PUBLIC # Or IPTypes.PRIVATE
+            cloud_sql_connector = Connector(ip_type=ip_type)
+        return cloud_sql_connector.connect(
+            instance_connection_name,
+            "pg8000",  # Specify the driver the connector should use
+            user=config.DB_USER,
+            password=config.DB_PASSWORD,
+            db=config.DB_NAME,
+        )
+    except Exception as e:
+        print(f"ðŸ”´ Error: Could not connect to the Cloud SQL database.")
+        print(f"Please ensure CLOUD_SQL_CONNECTION_NAME ('{instance_connection_name}') is correct,")
+        print(f"and that your application has permission (Cloud SQL Client role) to connect.")
+        raise e
+
+
+def connect_postgres():
+    """Opens a direct pg8000 connection using PG_HOST, PG_PORT, PG_DBNAME, PG_USER and PG_PASSWORD."""
+    import pg8000.dbapi
+
+    return pg8000.dbapi.connect(
+        host=config.PG_HOST or "localhost",
+        port=config.PG_PORT,
+        database=config.PG_DBNAME,
+        user=config.PG_USER,
+        password=config.PG_PASSWORD,
+    )
+
+
+def connect_local():
+    """Opens a connection to a local SQLite file, a stand-in for development and tests.
+
+    The file is taken from LOCAL_DB_PATH (default ``local_task.db``). PostgreSQL-only
+    SQL such as JSONB operators is not supported by this backend.
+    """
+    import sqlite3
+
+    return sqlite3.connect(config.LOCAL_DB_PATH, check_same_thread=False)
+
+
+def close_backends():
+    """Releases backend-level resources such as the Cloud SQL Connector."""
+    global cloud_sql_connector
+    if cloud_sql_connector is not None:
+        cloud_sql_connector.close()
+        cloud_sql_connector = None
+        print("Cloud SQL Connector resources released.")
+
+
+BACKENDS: Dict[str, Callable[[], Any]] = {
+    "cloudsql": connect_cloud_sql,
+    "postgres": connect_postgres,
+    "local": connect_local,
+}
+
+# PostgreSQL server process ID of each connection, looked up once per connection.
+_backend_pids = weakref.WeakKeyDictionary()
+
+
+def backend_pid(conn) -> int:
+    """Returns the PostgreSQL server process ID serving ``conn``."""
+    pid = _backend_pids.get(conn)
+    if pid is None:
+        cursor = conn.cursor()
+        cursor.execute("SELECT pg_backend_pid()")
+        pid = _backend_pids[conn] = cursor.fetchone()[0]
+        cursor.close()
+    return pid
+
+
+def cancel_backend(pid: int) -> bool:
+    """Cancels the statement running in PostgreSQL server process ``pid``.
+
+    pg8000 connections cannot cancel their own statement from another thread, so the
+    request is sent on a new, unpooled connection (the pool may be exhausted).
+    """
+    conn = BACKENDS[get_backend_name()]()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT pg_cancel_backend(%s)", (pid,))
+        cancelled = bool(cursor.fetchone()[0])
+        conn.commit()
+        return cancelled
+    finally:
+        conn.close()
+
+
+def get_backend_name() -> str:
+    """Returns the configured backend: DB_BACKEND if set, otherwise inferred from the environment."""
+    return config.DB_BACKEND
+
+
+# --- Connection Pool ---
+
+
+class ConnectionPool:
+    """A bounded, thread-safe pool of DB-API connections.
+
+    Connections are borrowed with :meth:`connection` (or :meth:`acquire`/:meth:`release`).
+    Idle connections are health-checked before being handed out if they have been idle
+    longer than ``health_check_after`` seconds, and connections idle longer than
+    ``max_idle`` seconds are closed, never shrinking the pool below ``min_size``.
+    Callers that cannot get a connection within ``acquire_timeout`` seconds get a
+    :class:`PoolTimeout`.
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], Any],
+        min_size: int = 1,
+        max_size: int = 5,
+        max_idle: float = 300.0,
+        acquire_timeout: float = 10.0,
+        health_check_after: float = 5.0,
+        on_close: Optional[Callable[[], None]] = None,
+    ):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError("Pool sizes must satisfy 0 <= min_size <= max_size and max_size >= 1.")
+        self._connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_idle = max_idle
+        self.acquire_timeout = acquire_timeout
+        self.health_check_after = health_check_after
+        self._on_close = on_close
+        self._cond = threading.Condition()
+        # Idle connections as (connection, returned_at) pairs; the most recently
+        # returned connection is reused first so the tail can age out.
+        self._idle: List[Tuple[Any, float]] = []
+        self._size = 0
+        self._closed = False
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "waits": 0,
+            "timeouts": 0,
+            "wait_seconds_total": 0.0,
+            "wait_seconds_max": 0.0,
+            "health_check_failures": 0,
+            "recycled": 0,
+        }
+
+    # -- internal helpers (called without holding the lock unless noted) --
+
+    def _close_quietly(self, conn) -> None:
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _is_healthy(self, conn) -> bool:
+        try:
+            conn.rollback()
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchall()
+            cursor.close()
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    def _prune_idle_locked(self, now: float) -> List[Any]:
+        """Removes connections idle past max_idle (lock must be held); returns them for closing."""
+        expired = []
+        keep = []
+        for conn, returned_at in self._idle:
+            if now - returned_at > self.max_idle and self._size - len(expired) > self.min_size:
+                expired.append(conn)
+            else:
+                keep.append((conn, returned_at))
+        self._idle = keep
+        self._size -= len(expired)
+        self._stats["recycled"] += len(expired)
+        return expired
+
+    def _open_new(self):
+        """Opens a new connection for a slot already reserved in ``_size``."""
+        try:
+            return self._connect()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+    # -- public API --
+
+    def acquire(self, timeout: Optional[float] = None):
+        """Borrows a connection, opening a new one if the pool has room.
+
+        Raises:
+            PoolTimeout: If no connection is available within the timeout.
+        """
+        timeout = self.acquire_timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+        waited = False
+        while True:
+            with self._cond:
+                if self._closed:
+                    raise RuntimeError("Connection pool is closed.")
+                expired = self._prune_idle_locked(time.monotonic())
+                candidate = None
+                open_new = False
+                while candidate is None and not open_new:
+                    if self._idle:
+                        candidate, returned_at = self._idle.pop()
+                    elif self._size < self.max_size:
+                        self._size += 1
+                        open_new = True
+                    else:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self._stats["timeouts"] += 1
+                            raise PoolTimeout(
+                                f"Timed out after {timeout:.1f}s waiting for a database connection "
+                                f"(pool max_size={self.max_size})."
+                            )
+                        waited = True
+                        self._cond.wait(remaining)
+                if waited:
+                    self._stats["waits"] += 1
+                    self._record_wait_locked(started)
+                    waited = False
+            for conn in expired:
+                self._close_quietly(conn)
+
+            if open_new:
+                conn = self._open_new()
+                with self._cond:
+                    self._stats["misses"] += 1
+                return conn
+
+            if time.monotonic() - returned_at < self.health_check_after or self._is_healthy(candidate):
+                with self._cond:
+                    self._stats["hits"] += 1
+                return candidate
+
+            # Stale connection: drop it and try again with the freed slot.
+            self._close_quietly(candidate)
+            with self._cond:
+                self._size -= 1
+                self._stats["health_check_failures"] += 1
+
+    def _record_wait_locked(self, started: float) -> None:
+        waited_for = time.monotonic() - started
+        self._stats["wait_seconds_total"] += waited_for
+        self._stats["wait_seconds_max"] = max(self._stats["wait_seconds_max"], waited_for)
+
+    def release(self, conn, discard: bool = False) -> None:
+        """Returns a borrowed connection to the pool, or closes it if ``discard`` is True.
+
+        Any transaction left open by the caller is rolled back first; a connection that
+        cannot be rolled back is discarded.
+        """
+        if not discard:
+            try:
+                conn.rollback()
+            except Exception:
+                discard = True
+        with self._cond:
+            if discard or self._closed:
+                self._size -= 1
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+        if discard or self._closed:
+            self._close_quietly(conn)
+
+    @contextmanager
+    def connection(self, timeout: Optional[float] = None):
+        """Context manager that borrows a connection and always returns it.
+
+        If the block raises, the connection is only reused if it still passes a
+        health check, since a failed statement can leave it in an unusable state.
+        """
+        conn = self.acquire(timeout)
+        discard = False
+        try:
+            yield conn
+        except BaseException:
+            discard = not self._is_healthy(conn)
+            raise
+        finally:
+            self.release(conn, discard=discard)
+
+    def warm_up(self) -> None:
+        """Opens connections until the pool holds ``min_size`` of them."""
+        conns = []
+        try:
+            while True:
+                with self._cond:
+                    if self._size >= self.min_size:
+                        break
+                    self._size += 1
+                conns.append(self._open_new())
+        finally:
+            for conn in conns:
+                self.release(conn)
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns hit/miss, wait-time and occupancy counters for sizing the pool."""
+        with self._cond:
+            stats = dict(self._stats)
+            stats.update(
+                size=self._size,
+                idle=len(self._idle),
+                in_use=self._size - len(self._idle),
+                min_size=self.min_size,
+                max_size=self.max_size,
+            )
+        borrows = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / borrows, 4) if borrows else 0.0
+        stats["wait_seconds_avg"] = (
+            round(stats["wait_seconds_total"] / stats["waits"], 6) if stats["waits"] else 0.0
+        )
+        return stats
+
+    def close(self) -> None:
+        """Closes every idle connection; borrowed ones are closed when released."""
+        with self._cond:
+            self._closed = True
+            idle = [conn for conn, _ in self._idle]
+            self._size -= len(idle)
+            self._idle = []
+            self._cond.notify_all()
+        for conn in idle:
+            self._close_quietly(conn)
+        if self._on_close is not None:
+            self._on_close()
+
+
+# Global pool shared by the agent tools and setup_database.py
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    """Returns the process-wide connection pool, creating it on first use.
+
+    The backend comes from :func:`get_backend_name`; sizing comes from DB_POOL_MIN_SIZE,
+    DB_POOL_MAX_SIZE, DB_POOL_MAX_IDLE_SECONDS, DB_POOL_ACQUIRE_TIMEOUT and
+    DB_POOL_HEALTH_CHECK_AFTER.
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    BACKENDS[get_backend_name()],
+                    min_size=config.DB_POOL_MIN_SIZE,
+                    max_size=config.DB_POOL_MAX_SIZE,
+                    max_idle=config.DB_POOL_MAX_IDLE_SECONDS,
+                    acquire_timeout=config.DB_POOL_ACQUIRE_TIMEOUT,
+                    health_check_after=config.DB_POOL_HEALTH_CHECK_AFTER,
+                    on_close=close_backends,
+                )
+    return _pool
+
+
+def pool_stats() -> Dict[str, Any]:
+    """Returns the shared pool's counters, or an empty dict if no pool was created yet."""
+    return _pool.stats() if _pool is not None else {}
+
+
+def close_pool() -> None:
+    """Closes the shared pool and its backend resources."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
@@ -0,0 +1,271 @@
+import asyncio
+import json
+import re
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+from .answer_cache import lookup_answer
+from .sub_agents.execution_agent.query_templates import run_template
+from .telemetry import span
+
+# --- Deterministic fast path for known SOP scenarios ---
+# Recognises high-volume intents with an identifiable order (or mobile number),
+# runs the SOP's diagnostic query directly and lets the root agent's model only
+# phrase the answer, unless an order in the same state was answered before (see
+# answer_cache.py). Anything ambiguous falls through to the full agent chain.
+
+
+@dataclass(frozen=True)
+class Scenario:
+    name: str
+    # Regex for the identifier the diagnostic needs (order ID or mobile number).
+    id_pattern: str
+    # At least one of these phrases must appear in the user's recent messages.
+    intent_keywords: Tuple[str, ...]
+    # Query used to find the SOP section quoted in the answer.
+    sop_query: str
+    # Named diagnostic query (see execution_agent/query_templates.py) and the
+    # parameter the matched identifier is bound to.
+    query_name: str
+    param_name: str
+    # Maps the diagnostic rows to (finding, next step).
+    evaluate: Callable[[List[Dict[str, Any]]], Tuple[str, str]]
+
+
+def _evaluate_dth_activation(rows):
+    if not rows:
+        return "No DTH install task was found for this order.", "Ask the user to confirm the order ID."
+    if rows[0]["status"] == "Activation In Progress":
+        return (
+            "The DTH order is stuck in 'Activation In Progress' (QMS activation callback not received).",
+            "Advance the workflow to 'Completed' with the honcho stateJump API using corelation_id "
+            f"'{rows[0]['corelation_id']}'. If that API call fails, raise a ticket to the DTH Backend Team.",
+        )
+    return f"The DTH order is in status '{rows[0]['status']}', not stuck in activation.", "No SOP action is needed."
+
+
+def _evaluate_feasibility(rows):
+    if not rows:
+        return "No broadband task was found for this order.", "Ask the user to confirm the order ID."
+    row = rows[0]
+    missing = [col for col in ("rsu", "operating_boundary_path") if not row.get(col)]
+    if row["status"] == "Feasibility Check" and missing:
+        return (
+            f"The order is stuck in 'Feasibility Check' and {' and '.join(missing)} is missing (address not mapped).",
+            "Raise a ticket to the GIS team to fix the address data; once fixed, re-push the order with the "
+            "Jenkins job using the order_id.",
+        )
+    if row["status"] == "Feasibility Check":
+        return (
+            "The order is in 'Feasibility Check' but its address data (rsu, operating_boundary_path) is present.",
+            "The address-mismatch SOP does not apply; escalate with the order details.",
+        )
+    return f"The order is in status '{row['status']}', not 'Feasibility Check'.", "No SOP action is needed."
+
+
+def _evaluate_postpaid_bill(rows):
+    if not rows:
+        return "No postpaid billing service request was found.", "Ask the user to confirm the SR number."
+    row = rows[0]
+    return (
+        f"The service request is in status '{row['status']}' with corelation_id '{row['corelation_id']}'.",
+        "Check the billing cycle with GET https://billing-service.airtelwork.com/api/v1/cycle/status/"
+        f"{row['corelation_id']}. If the cycle is running, inform the user of the delay; on an ERROR "
+        "response raise a ticket to the Billing Operations Team.",
+    )
+
+
+def _evaluate_oaoe_assignment(rows):
+    if not rows:
+        return "No task was found for this order.", "Ask the user to confirm the order ID."
+    row = rows[0]
+    if row["status"] == "Installation Engineer Assignment" and row.get("bin") == "OAOE":
+        return (
+            "The OAOE order is stuck at 'Installation Engineer Assignment' "
+            f"(one_airtel_suborder={row['one_airtel_suborder']}, bin=OAOE).",
+            "Follow the OAOE engineer-assignment SOP; if it cannot be resolved, raise a ticket with the order details.",
+        )
+    return f"The order is in status '{row['status']}' (bin={row.get('bin')}).", "The OAOE assignment SOP does not apply."
+
+
+def _evaluate_reached_onsite(rows):
+    if not rows:
+        return "No task is pending with this mobile number.", "Ask the user to confirm the technician's number."
+    orders = ", ".join(f"{r['order_id']} ({r['status']})" for r in rows)
+    return (
+        f"Tasks pending with this number: {orders}.",
+        "Check why the task cannot move to 'Reached Onsite'; if it cannot be resolved, raise a ticket with these order IDs.",
+    )
+
+
+SCENARIOS = (
+    Scenario(
+        name="dth_activation_stuck",
+        id_pattern=r"\bDT\d{6,}\b",
+        intent_keywords=("activation", "dth"),
+        sop_query="DTH activation stuck activation in progress",
+        query_name="dth_activation_check",
+        param_name="order_id",
+        evaluate=_evaluate_dth_activation,
+    ),
+    Scenario(
+        name="broadband_feasibility_check",
+        id_pattern=r"\bXBB\w+\b",
+        intent_keywords=("feasibility",),
+        sop_query="broadband order stuck feasibility check address mismatch",
+        query_name="broadband_address_check",
+        param_name="order_id",
+        evaluate=_evaluate_feasibility,
+    ),
+    Scenario(
+        name="postpaid_bill_not_generated",
+        id_pattern=r"\bSR_POSTPAID_\w+\b",
+        intent_keywords=("bill", "postpaid"),
+        sop_query="postpaid mobile bill not generated pending with billing system",
+        query_name="postpaid_sr_lookup",
+        param_name="order_id",
+        evaluate=_evaluate_postpaid_bill,
+    ),
+    Scenario(
+        name="oaoe_engineer_assignment",
+        id_pattern=r"\bOAOE_\w+\b",
+        intent_keywords=("engineer assignment", "oaoe"),
+        sop_query="order stuck installation engineer assignment",
+        query_name="oaoe_order_check",
+        param_name="order_id",
+        evaluate=_evaluate_oaoe_assignment,
+    ),
+    Scenario(
+        name="reached_onsite_by_mobile",
+        id_pattern=r"(?<!\d)[6-9]\d{9}(?!\d)",
+        intent_keywords=("reached onsite", "onsite", "on site"),
+        sop_query="technician unable to mark reached onsite",
+        query_name="tasks_pending_with",
+        param_name="pending_with_details",
+        evaluate=_evaluate_reached_onsite,
+    ),
+)
+
+# How many of the latest user messages are searched for the intent keywords, so a
+# follow-up such as "The order ID is XBB10054321" still matches the earlier intent.
+INTENT_LOOKBACK_MESSAGES = 3
+FAST_PATH_STATE_KEY = "fast_path"
+# ADK replays other agents' events to the current agent as user-role content starting
+# with this prefix; those are transcripts, not messages from the user.
+_AGENT_TRANSCRIPT_PREFIX = "For context:"
+
+
+def is_agent_transcript(content) -> bool:
+    return bool(content.parts) and (content.parts[0].text or "").startswith(_AGENT_TRANSCRIPT_PREFIX)
+
+
+def _user_texts(llm_request) -> List[str]:
+    texts = []
+    for content in llm_request.contents:
+        if content.role == "user" and content.parts and not is_agent_transcript(content):
+            text = " ".join(p.text for p in content.parts if p.text)
+            if text:
+                texts.append(text)
+    return texts
+
+
+def match_scenario(latest: str, recent: str) -> Optional[Tuple[Scenario, str]]:
+    """Returns the single scenario whose identifier is in the latest message and whose
+    intent is in the recent messages, or None if there is no unambiguous match."""
+    recent = recent.lower()
+    matches = []
+    for scenario in SCENARIOS:
+        ids = set(re.findall(scenario.id_pattern, latest))
+        if len(ids) == 1 and any(k in recent for k in scenario.intent_keywords):
+            matches.append((scenario, ids.pop()))
+    return matches[0] if len(matches) == 1 else None
+
+
+def _run_diagnostic(scenario: Scenario, identifier: str) -> List[Dict[str, Any]]:
+    columns, rows = run_template(scenario.query_name, {scenario.param_name: identifier}, max_rows=20)
+    return [dict(zip(columns, row)) for row in rows]
+
+
+def _sop_excerpt(query: str) -> Optional[Dict[str, str]]:
+    try:
+        from .sub_agents.knowledge_agent.agent import get_sop_index
+
+        results = get_sop_index().search(query, 1)
+    except Exception:
+        return None
+    return {"id": results[0]["id"], "title": results[0]["title"], "content": results[0]["content"]} if results else None
+
+
+async def fast_path_router(callback_context, llm_request) -> None:
+    """before_model_callback for `root_agent`.
+
+    On the first model call of a turn, tries to resolve the request with a known SOP
+    diagnostic. On a confident match the request is rewritten so the model only
+    phrases the answer from the diagnostic facts (no tools, no sub-agent transfer), or
+    answered from the answer cache without a model call. Otherwise the request is left untouched and the normal agent chain runs.
+    """
+    if not llm_request.contents or llm_request.contents[-1].role != "user":
+        return None
+    if is_agent_transcript(llm_request.contents[-1]):
+        # Control came back from a sub-agent mid-turn, not from a new user message.
+        return None
+    texts = _user_texts(llm_request)
+    if not texts:
+        return None
+    state = callback_context.state
+    previous = state.get(FAST_PATH_STATE_KEY) or {}
+    if previous.get("invocation_id") == callback_context.invocation_id:
+        return None
+
+    match = match_scenario(texts[-1], " ".join(texts[-INTENT_LOOKBACK_MESSAGES:]))
+    if match is None:
+        return None
+    scenario, identifier = match
+    try:
+        with span(callback_context.invocation_id, f"fast_path {scenario.name}", {"fast_path.query": scenario.query_name}) as diagnostic:
+            rows = await asyncio.to_thread(_run_diagnostic, scenario, identifier)
+            if diagnostic is not None:
+                diagnostic.set("sql.row_count", len(rows))
+    except Exception as e:
+        print(f"Fast path '{scenario.name}' failed, using the full agent chain: {e}")
+        return None
+
+    finding, next_step = scenario.evaluate(rows)
+    sop = _sop_excerpt(scenario.sop_query)
+    answer, answer_cache_outcome = lookup_answer(callback_context, scenario, identifier, rows, sop)
+    facts = {
+        "scenario": scenario.name,
+        "identifier": identifier,
+        "diagnostic_rows": rows,
+        "finding": finding,
+        "next_step": next_step,
+        "sop": sop,
+    }
+    state[FAST_PATH_STATE_KEY] = {
+        "invocation_id": callback_context.invocation_id,
+        "scenario": scenario.name,
+        "identifier": identifier,
+        "row_count": len(rows),
+        "status": rows[0].get("status") if len(rows) == 1 else None,
+        "sop_section": {"id": sop["id"], "title": sop["title"]} if sop else None,
+        "finding": finding,
+        "next_step": next_step,
+        "answer_cache": answer_cache_outcome,
+    }
+    if answer is not None:
+        # Same scenario, SOP section and order state as an earlier answer: no model call.
+        return LlmResponse(content=types.Content(role="model", parts=[types.Part(text=answer)]))
+
+    llm_request.config.system_instruction = (
+        "You are the Airtel support agent. The SOP diagnostic for the user's request has already "
+        "been run. Using only the facts below, tell the user what was found and the next step from "
+        "the SOP, quoting the order or mobile number. Be brief and do not invent data. If the next "
+        "step needs an API call or a ticket, say so and offer to proceed.\n\n"
+        f"Diagnostic facts:\n{json.dumps(facts, default=str, indent=2)}"
+    )
+    llm_request.config.tools = None
+    llm_request.tools_dict = {}
+    return None
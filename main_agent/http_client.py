@@ -0,0 +1,246 @@
+import asyncio
+import json
+import random
+import time
+import weakref
+from typing import Any, Dict, Optional
+
+import httpx
+
+from .config import (
+    HTTP_BREAKER_FAILURE_THRESHOLD,
+    HTTP_BREAKER_RESET_SECONDS,
+    HTTP_MAX_CONNECTIONS,
+    HTTP_MAX_CONNECTIONS_PER_HOST,
+    HTTP_MAX_KEEPALIVE_CONNECTIONS,
+    HTTP_MAX_RESPONSE_BYTES,
+    HTTP_MAX_RETRIES,
+    HTTP_RETRY_BACKOFF_SECONDS,
+    HTTP_TIMEOUT_SECONDS,
+)
+from .telemetry import record_http_response
+
+# Methods that are safe to retry: repeating them has no additional effect.
+RETRYABLE_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+RETRYABLE_STATUS_CODES = frozenset({429, 502, 503, 504})
+
+
+class HttpClientError(Exception):
+    """Base class for failures raised by this module's request helpers."""
+
+
+class CircuitOpenError(HttpClientError):
+    """Raised without calling the host while its circuit breaker is open."""
+
+
+class DeadlineExceeded(HttpClientError):
+    """Raised when the caller's deadline budget is used up."""
+
+
+class ResponseTooLarge(HttpClientError):
+    """Raised when a response body exceeds the size cap; the rest is not read."""
+
+
+class InvalidRequestURL(HttpClientError):
+    """Raised without sending anything when the URL cannot be parsed."""
+
+
+# One shared client per event loop: connections are kept alive and reused across
+# tool calls instead of paying a TCP/TLS handshake on every request.
+_clients = weakref.WeakKeyDictionary()
+# Per-loop, per-host semaphores limiting concurrent connections to one host.
+_host_limits = weakref.WeakKeyDictionary()
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """Returns the shared async HTTP client for the running event loop, creating it on first use.
+
+    Timeouts and limits come from HTTP_TIMEOUT_SECONDS, HTTP_MAX_CONNECTIONS and
+    HTTP_MAX_KEEPALIVE_CONNECTIONS.
+    """
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            timeout=httpx.Timeout(HTTP_TIMEOUT_SECONDS),
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            ),
+        )
+        _clients[loop] = client
+    return client
+
+
+async def aclose_client() -> None:
+    """Closes the running event loop's shared client, if one was created."""
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+def _host_semaphore(host: str) -> asyncio.Semaphore:
+    per_loop = _host_limits.setdefault(asyncio.get_running_loop(), {})
+    semaphore = per_loop.get(host)
+    if semaphore is None:
+        semaphore = per_loop[host] = asyncio.Semaphore(HTTP_MAX_CONNECTIONS_PER_HOST)
+    return semaphore
+
+
+class CircuitBreaker:
+    """Per-host breaker: after ``failure_threshold`` consecutive failures the host is
+    skipped for ``reset_seconds``, then a single trial request decides whether to close."""
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self.trial_in_flight:
+            self.trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self.trial_in_flight = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def get_breaker(host: str) -> CircuitBreaker:
+    breaker = _breakers.get(host)
+    if breaker is None:
+        breaker = _breakers[host] = CircuitBreaker(HTTP_BREAKER_FAILURE_THRESHOLD, HTTP_BREAKER_RESET_SECONDS)
+    return breaker
+
+
+def breaker_states() -> Dict[str, Dict[str, Any]]:
+    """Returns each known host's breaker state and consecutive failure count."""
+    return {host: {"state": b.state, "failures": b.failures} for host, b in _breakers.items()}
+
+
+async def _read_capped(response: httpx.Response, max_bytes: int) -> bytes:
+    declared = response.headers.get("content-length")
+    if declared is not None and declared.isdigit() and int(declared) > max_bytes:
+        raise ResponseTooLarge(f"Response of {declared} bytes exceeds the {max_bytes}-byte limit.")
+    body = bytearray()
+    async for chunk in response.aiter_bytes():
+        body.extend(chunk)
+        if len(body) > max_bytes:
+            raise ResponseTooLarge(f"Response exceeds the {max_bytes}-byte limit; stopped reading.")
+    return bytes(body)
+
+
+async def request_json(
+    method: str,
+    url: str,
+    *,
+    headers: Optional[Dict[str, str]] = None,
+    params: Optional[Dict[str, Any]] = None,
+    json_body: Any = None,
+    deadline: Optional[float] = None,
+    max_bytes: int = HTTP_MAX_RESPONSE_BYTES,
+) -> Any:
+    """Sends a request on the shared client and returns the decoded JSON body.
+
+    Idempotent methods are retried on connection errors, timeouts and 429/502/503/504
+    with jittered exponential backoff. Each host has its own connection limit and
+    circuit breaker. ``deadline`` is an absolute ``time.time()`` after which no further
+    attempt is started and which also caps each attempt's timeout. The body is
+    streamed and reading stops once it exceeds ``max_bytes``.
+
+    Raises:
+        httpx.HTTPError: For transport errors and non-2xx responses after retries.
+        HttpClientError: If the URL is invalid, the circuit is open, the deadline passed or
+            the body is too large.
+        ValueError: If the body is not valid JSON.
+    """
+    method = method.upper()
+    try:
+        host = httpx.URL(url).host
+    except httpx.InvalidURL as e:
+        raise InvalidRequestURL(f"Invalid URL '{url}': {e}") from None
+    breaker = get_breaker(host)
+    attempts = 1 + (HTTP_MAX_RETRIES if method in RETRYABLE_METHODS else 0)
+
+    for attempt in range(attempts):
+        timeout = HTTP_TIMEOUT_SECONDS
+        if deadline is not None:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                raise DeadlineExceeded(f"Deadline budget exhausted before calling {host}.")
+            timeout = min(timeout, remaining)
+        if not breaker.allow():
+            record_http_response(host, method, "circuit_open")
+            raise CircuitOpenError(f"Circuit breaker for {host} is open; skipping the call.")
+
+        retry_error: Optional[Exception] = None
+        try:
+            async with _host_semaphore(host):
+                async with get_async_client().stream(
+                    method, url, headers=headers, params=params, json=json_body, timeout=timeout
+                ) as response:
+                    record_http_response(host, method, response.status_code)
+                    if response.status_code in RETRYABLE_STATUS_CODES:
+                        retry_error = httpx.HTTPStatusError(
+                            f"Server error '{response.status_code}' for url '{url}'",
+                            request=response.request,
+                            response=response,
+                        )
+                    else:
+                        body = await _read_capped(response, max_bytes)
+        except ResponseTooLarge:
+            breaker.record_success()
+            raise
+        except asyncio.CancelledError:
+            # Let the next caller run the half-open trial instead.
+            breaker.trial_in_flight = False
+            raise
+        except (httpx.TransportError, httpx.TimeoutException) as e:
+            record_http_response(host, method, type(e).__name__)
+            retry_error = e
+        except Exception:
+            # E.g. httpx.DecodingError or TooManyRedirects: not retried, but it still
+            # counts against the host and ends a half-open trial.
+            breaker.record_failure()
+            raise
+
+        if retry_error is None:
+            if response.status_code >= 500:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+            response.raise_for_status()
+            return json.loads(body) if body else {}
+
+        breaker.record_failure()
+        if attempt + 1 >= attempts:
+            raise retry_error
+        # Full jitter: sleep a random fraction of the exponential backoff.
+        backoff = random.uniform(0, HTTP_RETRY_BACKOFF_SECONDS * (2 ** attempt))
+        if deadline is not None and time.time() + backoff >= deadline:
+            raise retry_error
+        await asyncio.sleep(backoff)
@@ -0,0 +1,244 @@
+import copy
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, Iterable, Optional, Set, Tuple
+
+from .config import RESULT_CACHE_API_TTL, RESULT_CACHE_MAX_BYTES, RESULT_CACHE_SQL_TTL
+
+# --- TTL + LRU result cache for diagnostic tool calls ---
+# The same order lookup or status GET is often repeated by several agents within
+# one session. Results are cached per normalised call with a TTL, evicted LRU under
+# a byte budget, and SQL writes invalidate the entries of the tables/keys they touch.
+
+# Columns whose literal values identify the rows a statement reads or writes.
+KEY_COLUMNS = ("order_id", "corelation_id")
+IDEMPOTENT_HTTP_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+_STRING_LITERAL_RE = re.compile(r"'(?:[^']|'')*'")
+_WHITESPACE_RE = re.compile(r"\s+")
+_READ_TABLES_RE = re.compile(r"\b(?:from|join)\s+(?:only\s+)?([a-z_][\w.]*)", re.IGNORECASE)
+_WRITE_TABLE_RE = re.compile(
+    r"^\s*(?:with\b.*?\)\s*)?(?:insert\s+into|update|delete\s+from|truncate(?:\s+table)?|merge\s+into)\s+(?:only\s+)?([a-z_][\w.]*)",
+    re.IGNORECASE | re.DOTALL,
+)
+# One conjunct of a WHERE clause that pins a key column: ``order_id = 'X'`` or
+# ``t.order_id IN ('X', 'Y')``, with string literals already replaced by @n markers.
+_KEY_CONDITION_RE = re.compile(
+    r"\(*\s*(?:[a-z_]\w*\.)?(" + "|".join(KEY_COLUMNS) + r")\s*"
+    r"(?:=\s*(@\d+)|in\s*\(\s*(@\d+(?:\s*,\s*@\d+)*)\s*\))\s*\)*",
+    re.IGNORECASE,
+)
+_LITERAL_MARKER_RE = re.compile(r"@(\d+)")
+_WHERE_RE = re.compile(r"\bwhere\b", re.IGNORECASE)
+# Clauses that end a WHERE clause.
+_WHERE_END_RE = re.compile(
+    r"\b(?:group\s+by|order\s+by|having|limit|offset|fetch|returning|window|for\s+update|for\s+share)\b",
+    re.IGNORECASE,
+)
+_AND_RE = re.compile(r"\band\b", re.IGNORECASE)
+# Anything that makes a plain left-to-right reading of the WHERE clause unsafe.
+_COMPLEX_SQL_RE = re.compile(r"\(\s*select\b|\b(?:union|intersect|except)\b|--|/\*", re.IGNORECASE)
+_KEY_ASSIGNMENT_RE = re.compile(r"\b(?:" + "|".join(KEY_COLUMNS) + r")\s*=", re.IGNORECASE)
+
+
+def normalize_sql(query: str) -> str:
+    """Collapses whitespace, drops trailing semicolons and lower-cases everything
+    outside string literals, so trivially different spellings share a cache entry."""
+    query = query.strip().rstrip(";").strip()
+    parts = []
+    last = 0
+    for match in _STRING_LITERAL_RE.finditer(query):
+        parts.append(_WHITESPACE_RE.sub(" ", query[last:match.start()]).lower())
+        parts.append(match.group(0))
+        last = match.end()
+    parts.append(_WHITESPACE_RE.sub(" ", query[last:]).lower())
+    return "".join(parts)
+
+
+def _table_name(name: str) -> str:
+    return name.lower().split(".")[-1]
+
+
+def sql_read_tables(query: str) -> Set[str]:
+    return {_table_name(t) for t in _READ_TABLES_RE.findall(_STRING_LITERAL_RE.sub("''", query))}
+
+
+def sql_write_table(query: str) -> Optional[str]:
+    """Returns the table an INSERT/UPDATE/DELETE/TRUNCATE/MERGE writes to, if recognisable."""
+    match = _WRITE_TABLE_RE.match(query)
+    return _table_name(match.group(1)) if match else None
+
+
+def sql_key_values(query: str) -> Set[str]:
+    """Returns the key values a statement is restricted to, such as ``order_id=X``.
+
+    Only a WHERE clause that is an AND of key equalities and IN lists narrows a
+    statement; anything else (OR, NOT, other columns, subqueries, an UPDATE that sets
+    a key column) returns an empty set, which means "any row of the table".
+    """
+    literals = []
+
+    def mark(match):
+        literals.append(match.group(0)[1:-1].replace("''", "'"))
+        return f"@{len(literals) - 1}"
+
+    masked = _STRING_LITERAL_RE.sub(mark, query.strip().rstrip(";"))
+    if _COMPLEX_SQL_RE.search(masked):
+        return set()
+    wheres = list(_WHERE_RE.finditer(masked))
+    if len(wheres) != 1:
+        return set()
+    if masked.lstrip().lower().startswith("update") and _KEY_ASSIGNMENT_RE.search(masked[:wheres[0].start()]):
+        # The update moves rows to other key values.
+        return set()
+    clause = masked[wheres[0].end():]
+    end = _WHERE_END_RE.search(clause)
+    if end:
+        clause = clause[:end.start()]
+
+    keys = set()
+    for condition in _AND_RE.split(clause):
+        match = _KEY_CONDITION_RE.fullmatch(condition.strip())
+        if match is None or condition.count("(") != condition.count(")"):
+            return set()
+        column, single, many = match.groups()
+        for marker in _LITERAL_MARKER_RE.findall(single or many):
+            keys.add(f"{column.lower()}={literals[int(marker)]}")
+    return keys
+
+
+def param_key_values(params: Optional[Dict[str, Any]]) -> Set[str]:
+    return {f"{k}={v}" for k, v in (params or {}).items() if k in KEY_COLUMNS and v is not None}
+
+
+def make_key(*parts: Any) -> str:
+    return json.dumps(parts, sort_keys=True, default=str, separators=(",", ":"))
+
+
+class ResultCache:
+    """A thread-safe TTL cache with LRU eviction under a byte budget.
+
+    Each entry carries the tables it was read from and the key values it is
+    restricted to (e.g. ``order_id=XBB10054321``), so writes can invalidate precisely.
+    """
+
+    def __init__(self, max_bytes: int = RESULT_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # key -> (value, expires_at, size, tables, key_values)
+        self._entries: "OrderedDict[str, Tuple[Any, float, int, FrozenSet[str], FrozenSet[str]]]" = OrderedDict()
+        self._bytes = 0
+        self._stats = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0, "invalidations": 0, "stores": 0}
+
+    def _remove_locked(self, key: str) -> None:
+        _, _, size, _, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def get(self, key: str) -> Optional[Any]:
+        """Returns the cached value, or None on a miss or expired entry."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            if entry[1] <= time.monotonic():
+                self._remove_locked(key)
+                self._stats["expired"] += 1
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+        # Callers get their own copy so they cannot mutate the cached value.
+        return copy.deepcopy(entry[0])
+
+    def put(
+        self,
+        key: str,
+        value: Any,
+        ttl: float,
+        tables: Iterable[str] = (),
+        key_values: Iterable[str] = (),
+    ) -> None:
+        """Stores a value; values larger than the whole budget are not cached."""
+        if ttl <= 0:
+            return
+        size = len(key) + len(json.dumps(value, default=str))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove_locked(key)
+            self._entries[key] = (copy.deepcopy(value), time.monotonic() + ttl, size, frozenset(tables), frozenset(key_values))
+            self._bytes += size
+            self._stats["stores"] += 1
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove_locked(oldest)
+                self._stats["evictions"] += 1
+
+    def invalidate(self, table: Optional[str] = None, key_values: Iterable[str] = ()) -> int:
+        """Drops entries read from ``table`` (all entries if table is None).
+
+        With ``key_values``, entries restricted to other values of the same key column
+        are kept; entries with no key restriction (e.g. aggregate scans) or restricted on
+        a different key column are always dropped.
+        """
+        key_values = frozenset(key_values)
+        key_columns = {k.split("=", 1)[0] for k in key_values}
+
+        def affected(tables, entry_keys):
+            if table is not None and table not in tables:
+                return False
+            if not key_values or not entry_keys:
+                return True
+            if not key_columns & {k.split("=", 1)[0] for k in entry_keys}:
+                return True
+            return bool(entry_keys & key_values)
+
+        with self._lock:
+            doomed = [
+                key
+                for key, (_, _, _, tables, entry_keys) in self._entries.items()
+                if affected(tables, entry_keys)
+            ]
+            for key in doomed:
+                self._remove_locked(key)
+            self._stats["invalidations"] += len(doomed)
+        return len(doomed)
+
+    def clear(self) -> int:
+        """Drops every entry and returns how many were removed."""
+        with self._lock:
+            removed = len(self._entries)
+            self._entries.clear()
+            self._bytes = 0
+            self._stats["invalidations"] += removed
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns hit-rate, eviction and occupancy counters."""
+        with self._lock:
+            stats = dict(self._stats, entries=len(self._entries), bytes=self._bytes, max_bytes=self.max_bytes)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        return stats
+
+
+# Process-wide cache shared by every agent and session in this worker.
+result_cache = ResultCache()
+
+
+def invalidate_for_sql_write(query: str) -> int:
+    """Invalidates entries affected by a write statement.
+
+    Unrecognised statements (DDL, functions with side effects) clear the whole cache.
+    """
+    table = sql_write_table(query)
+    if table is None:
+        return result_cache.clear()
+    # TRUNCATE and writes without key literals affect every row of the table.
+    keys = set() if query.lstrip().lower().startswith("truncate") else sql_key_values(query)
+    return result_cache.invalidate(table, keys)
@@ -1,92 +1,293 @@
 from google.adk.agents import LlmAgent
-from google.adk.tools import FunctionTool
-from psycopg2 import sql, OperationalError
-import os
-import requests
-import psycopg2 
-from google.cloud.sql.connector import Connector, IPTypes
-import pg8000.dbapi
-from typing import Optional, Dict, Any
-from dotenv import load_dotenv
-
-
-MODEL_GEMINI = "gemini-2.0-flash"
-SOP_FAQ_FILE_PATH = "Airtel_Support_SOP_FAQ.pdf" 
-load_dotenv()
-# Global variable for the Cloud SQL Connector instance to manage its lifecycle
-cloud_sql_connector = None
-
-def get_cloud_sql_connection():
-    """Establishes a connection to the PostgresSQL database vial Cloud Sql Connector. 
-    This internal helper function ensures the connector is initialized only once.\
-    and uses env variables for security.
+from google.adk.tools import FunctionTool, ToolContext
+import asyncio
+import threading
+import time
+import httpx
+from contextlib import contextmanager
+from typing import Optional, Dict, Any, List
 
-    Returns:
-        pg8000.dbapi.Connection: An active connection object to the PostgreSQL database.
-    Raises:
-        ValueError: If any required environment variable is not set.
-        Exception: If the connection fails for any reason.
+from ...concurrency import ToolLimiter
+from ...config import (
+    API_TOOL_CONCURRENCY,
+    HTTP_TURN_BUDGET_SECONDS,
+    MODEL_GEMINI,
+    SQL_DEFAULT_MAX_ROWS,
+    SQL_MAX_ROWS_LIMIT,
+    SQL_TOOL_CONCURRENCY,
+    TRIAGE_MAX_ORDERS,
+)
+from ...db_pool import backend_pid, cancel_backend, get_backend_name, get_pool
+from ...http_client import HttpClientError, request_json
+from ...result_cache import (
+    IDEMPOTENT_HTTP_METHODS,
+    RESULT_CACHE_API_TTL,
+    RESULT_CACHE_SQL_TTL,
+    invalidate_for_sql_write,
+    make_key,
+    normalize_sql,
+    param_key_values,
+    result_cache,
+    sql_key_values,
+    sql_read_tables,
+)
+from ..ticket_creation.ticket_store import get_ticket_store, get_ticket_submitter
+from .bulk_triage import (
+    ROOT_CAUSES,
+    classify_orders,
+    escalation_tickets,
+    order_ids_from_upload,
+    parse_order_ids,
+    record_tickets,
+    remediate_orders,
+    triage_report,
+)
+from .query_guard import check_write_plan, guard_query, set_statement_timeout
+from .query_templates import QUERY_TEMPLATES, describe_templates, run_template
+from .sql_results import (
+    compact_rows,
+    decode_page_token,
+    encode_page_token,
+    fetch_page,
+    is_read_only,
+    parse_json_paths,
+    project_columns,
+    query_fingerprint,
+    strip_query,
+)
+
+
+# Per-tool concurrency limits on the ADK event loop. SQL defaults to the pool size so
+# queued calls wait here instead of tying up worker threads on the pool.
+sql_limiter = ToolLimiter("run_sql", SQL_TOOL_CONCURRENCY)
+api_limiter = ToolLimiter("make_api_call", API_TOOL_CONCURRENCY)
+
+# Total time all API calls of one conversation turn may take, retries included
+# (HTTP_TURN_BUDGET_SECONDS); the default and hard upper bound on rows returned by one
+# `run_sql` call are SQL_DEFAULT_MAX_ROWS and SQL_MAX_ROWS_LIMIT.
+TURN_DEADLINE_STATE_KEY = "temp:api_deadline"
+
+
+def _turn_deadline(tool_context: Optional[ToolContext]) -> Optional[float]:
+    """Returns the wall-clock deadline shared by all API calls of the current turn.
+
+    The first call of a turn starts the budget; it lives in invocation-scoped
+    ("temp:") session state, so the next user message gets a fresh budget.
+    """
+    if tool_context is None or HTTP_TURN_BUDGET_SECONDS <= 0:
+        return None
+    deadline = tool_context.state.get(TURN_DEADLINE_STATE_KEY)
+    if deadline is None:
+        deadline = time.time() + HTTP_TURN_BUDGET_SECONDS
+        tool_context.state[TURN_DEADLINE_STATE_KEY] = deadline
+    return deadline
+
+
+@contextmanager
+def _cancellable(active: Dict[str, Any], conn, is_postgres: bool):
+    """Registers the connection running a call's statement so `_interrupt` can stop it.
+
+    The entry is removed under the call's lock before the connection goes back to the
+    pool, so a late cancel never reaches a statement of another caller.
     """
-    global cloud_sql_connector
-    instance_connection_name = os.environ.get("CLOUD_SQL_CONNECTION_NAME")
-    db_user = os.environ.get("DB_USER")
-    db_password = os.environ.get("DB_PASSWORD")
-    db_name = os.environ.get("DB_NAME")
-
-    if not all([instance_connection_name, db_user, db_password, db_name]):
-        print("ðŸ”´ Error: Missing one or more required environment variables for Cloud SQL.")
-        print("Please set CLOUD_SQL_CONNECTION_NAME, DB_USER, DB_PASSWORD, and DB_NAME.")
-        raise ValueError("Cloud SQL environment variables not set.")
+    pid = backend_pid(conn) if is_postgres else None
+    with active["lock"]:
+        if active.get("cancelled"):
+            raise RuntimeError("The call was cancelled before its statement started.")
+        active.update(conn=conn, pid=pid)
     try:
-        if cloud_sql_connector is None:
-            ip_type = IPTypes.PUBLIC
-            cloud_sql_connector = Connector(ip_type=ip_type)
-
-        conn = cloud_sql_connector.connect(
-            instance_connection_name,
-            "pg8000",  # Specify the driver the connector should use
-            user=db_user,
-            password=db_password,
-            db=db_name,
-        )
-        return conn
+        yield
+    finally:
+        with active["lock"]:
+            active.pop("conn", None)
+            active.pop("pid", None)
+
+
+def _cancel_statement(active: Dict[str, Any]) -> None:
+    with active["lock"]:
+        active["cancelled"] = True
+        conn = active.get("conn")
+        if conn is None:
+            return
+        try:
+            if active.get("pid") is not None:
+                # pg_cancel_backend from a separate connection; pg8000 has no cancel().
+                cancel_backend(active["pid"])
+            else:
+                # sqlite3 aborts the running statement from any thread.
+                conn.interrupt()
+        except Exception as e:
+            print(f"ðŸ”´ Error: Could not cancel the running statement. {str(e)}")
+
+
+def _interrupt(active: Dict[str, Any]) -> None:
+    """Best effort: stops the statement a cancelled call is still running.
+
+    Runs on a separate thread, since cancelling on PostgreSQL opens a connection.
+    """
+    threading.Thread(target=_cancel_statement, args=(active,), name="sql-cancel", daemon=True).start()
+
+
+def _execute_sql(
+    query: str,
+    max_rows: int,
+    columns: Optional[List[str]],
+    json_paths: Optional[List[str]],
+    page_token: Optional[str],
+    count_total: bool,
+    active: Dict[str, Any],
+) -> dict:
+    """Blocking part of `run_sql`, run in a worker thread with a pooled connection."""
+    try:
+        query = strip_query(query)
+        limit = max(1, min(int(max_rows), SQL_MAX_ROWS_LIMIT))
+        is_postgres = get_backend_name() != "local"
+        with get_pool().connection() as conn, _cancellable(active, conn, is_postgres):
+            if is_postgres:
+                set_statement_timeout(conn)
+
+            # Row-returning queries are paged; everything else runs as before.
+            if is_read_only(query):
+                fingerprint = query_fingerprint(query, columns)
+                offset = decode_page_token(page_token, fingerprint) if page_token else 0
+                # Guarded before projection, so a LIMIT lands next to the query's own ORDER BY.
+                paged_query, bounded = query, False
+                if is_postgres:
+                    paged_query, bounded = guard_query(conn, query, offset + limit + 1)
+                paged_query = project_columns(paged_query, columns)
+                colnames, records, truncated, total = fetch_page(
+                    conn,
+                    paged_query,
+                    offset,
+                    limit,
+                    server_side=is_postgres,
+                    count_total=count_total and not bounded,
+                )
+                conn.commit()
+                result = {
+                    "columns": colnames,
+                    "rows": compact_rows(colnames, records, parse_json_paths(json_paths)),
+                    "row_count": len(records),
+                    "offset": offset,
+                    "truncated": truncated,
+                    "total_rows": total,
+                    "next_page_token": encode_page_token(fingerprint, offset + len(records)) if truncated else None,
+                }
+                if bounded:
+                    result["note"] = "The query plan was too expensive, so its LIMIT was lowered to the rows needed; add filters for exact totals."
+                return result
+
+            if is_postgres:
+                check_write_plan(conn, query)
+            cursor = conn.cursor()
+            cursor.execute(query)
+            if cursor.description:
+                # Statements such as UPDATE ... RETURNING still return rows
+                colnames = [desc[0] for desc in cursor.description]
+                records = cursor.fetchmany(limit)
+                result = {"columns": colnames, "rows": compact_rows(colnames, records, {})}
+            else:
+                # For non-SELECT queries (INSERT, UPDATE, DELETE)
+                result = {"status": "success", "rows_affected": cursor.rowcount}
+
+            conn.commit()
+            cursor.close()
+        return {"result": result}
     except Exception as e:
-        print(f"ðŸ”´ Error: Could not connect to the Cloud SQL database.")
-        print(f"Please ensure CLOUD_SQL_CONNECTION_NAME ('{instance_connection_name}') is correct,")
-        print(f"and that your application has permission (Cloud SQL Client role) to connect.")
-        raise e
+        # Handle pool timeouts, invalid arguments, database connection and query errors
+        return {"error": f"Database error: {e}"}
 
-def run_sql(query: str) -> dict:
+
+async def run_sql(
+    query: str,
+    max_rows: int = SQL_DEFAULT_MAX_ROWS,
+    columns: Optional[List[str]] = None,
+    json_paths: Optional[List[str]] = None,
+    page_token: Optional[str] = None,
+    count_total: bool = False,
+) -> dict:
     """
-    Connects to the PostgreSQL database, executes a given SQL query, and returns the result.
-    Database connection details are sourced from environment variables.
+    Executes a SQL query against the PostgreSQL database and returns a bounded, compact result.
+
+    Args:
+        query (str): The SQL statement to run.
+        max_rows (int): Maximum number of rows to return (capped by the server).
+        columns (List[str], optional): Only return these result columns.
+        json_paths (List[str], optional): Dotted paths such as
+            'common_details.commonDetails.telemedia.bin'; JSON columns are trimmed to them.
+        page_token (str, optional): The `next_page_token` of a previous call with the same
+            query and columns, to continue where it stopped.
+        count_total (bool): Also count the rows beyond the page when the result is truncated.
+
+    Returns:
+        dict: For queries, `columns`, `rows` (one list of values per row, in column order),
+        `row_count`, `truncated`, `total_rows` (null if unknown) and `next_page_token`.
+        For other statements, `result` with the number of rows affected.
     """
-    conn = None
+    read_only = is_read_only(strip_query(query))
+    if read_only:
+        cache_key = make_key("sql", normalize_sql(query), max_rows, columns, json_paths, page_token, count_total)
+        cached = result_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    active: Dict[str, Any] = {"lock": threading.Lock()}
+    result = await sql_limiter.run_in_thread(
+        _execute_sql, query, max_rows, columns, json_paths, page_token, count_total, active,
+        on_cancel=lambda: _interrupt(active),
+    )
+    if not read_only:
+        # Drop cached reads of the rows this statement may have changed.
+        invalidate_for_sql_write(query)
+    elif "error" not in result:
+        result_cache.put(
+            cache_key, result, RESULT_CACHE_SQL_TTL,
+            tables=sql_read_tables(query), key_values=sql_key_values(query),
+        )
+    return result
+
+
+def _execute_named_query(name: str, params: Optional[Dict[str, Any]]) -> dict:
+    """Blocking part of `run_named_query`."""
     try:
-        # Establish connection using environment variables for security
-        conn = get_cloud_sql_connection()
-        cursor = conn.cursor()
-        cursor.execute(query)
-
-        # Check if the query was a SELECT to fetch results
-        if cursor.description:
-            # Fetch all rows and column names
-            colnames = [desc[0] for desc in cursor.description]
-            records = cursor.fetchall()
-            result = [dict(zip(colnames, record)) for record in records]
-        else:
-            # For non-SELECT queries (INSERT, UPDATE, DELETE)
-            result = {"status": "success", "rows_affected": cursor.rowcount}
-
-        conn.commit()
-        cursor.close()
-        return {"result": result}
-    except (OperationalError, psycopg2.Error) as e:
-        # Handle database connection or query errors
+        colnames, records = run_template(name, params, max_rows=SQL_MAX_ROWS_LIMIT)
+    except KeyError as e:
+        return {"error": str(e.args[0])}
+    except ValueError as e:
+        return {"error": f"Invalid parameters: {e}"}
+    except Exception as e:
         return {"error": f"Database error: {e}"}
-    finally:
-        if conn is not None:
-            conn.close()
+    return {
+        "query": name,
+        "columns": colnames,
+        "rows": compact_rows(colnames, records, {}),
+        "row_count": len(records),
+    }
+
+
+async def run_named_query(name: str, params: Optional[Dict[str, Any]] = None) -> dict:
+    """
+    Runs one of the predefined, parameterised diagnostic queries on the `task` table and its summaries.
+    Prefer this over `run_sql` whenever a named query fits.
+
+    Args:
+        name (str): The query name, e.g. 'order_by_id' or 'stuck_by_status_and_age'.
+        params (Dict[str, Any], optional): The query's parameters, e.g. {"order_id": "XBB10054321"}.
+
+    Returns:
+        dict: `columns`, `rows` (one list of values per row, in column order) and `row_count`.
+    """
+    cache_key = make_key("named", name, params)
+    cached = result_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    result = await sql_limiter.run_in_thread(_execute_named_query, name, params)
+    if "error" not in result:
+        result_cache.put(
+            cache_key, result, RESULT_CACHE_SQL_TTL,
+            tables=set(QUERY_TEMPLATES[name].tables), key_values=param_key_values(params),
+        )
+    return result
 
 # --- Core Agent Functions ---
 
@@ -95,28 +296,127 @@ sql_tool = FunctionTool(
     func=run_sql
 )
 
-def make_api_call(
+named_query_tool = FunctionTool(
+    func=run_named_query
+)
+
+def _invalidate_after_api_write(host_tag: str) -> None:
+    result_cache.invalidate(host_tag)
+    result_cache.invalidate("task")
+
+
+async def make_api_call(
     method: str,
     url: str,
     headers: Optional[Dict[str, str]] = None,
     params: Optional[Dict[str, Any]] = None,
-    data: Optional[Dict[str, Any]] = None) -> dict:
+    data: Optional[Dict[str, Any]] = None,
+    tool_context: Optional[ToolContext] = None) -> dict:
     """
     Makes an HTTP request to a specified URL.
     """
+    # Idempotent calls are cached per host. Any other method may change that host's
+    # answers and, like triage remediation, move orders on in the workflow, so it
+    # invalidates the host's entries and cached reads of `task`, before and after the call.
     try:
-        response = requests.request(
-            method,
-            url,
-            headers=headers,
-            params=params,
-            json=data,
-            timeout=10
-        )
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
+        host_tag = f"api:{httpx.URL(url).host}"
+    except httpx.InvalidURL as e:
+        return {"error": f"API call failed: invalid URL '{url}' ({e})"}
+    cacheable = method.upper() in IDEMPOTENT_HTTP_METHODS
+    if cacheable:
+        cache_key = make_key("api", method.upper(), url, headers, params, data)
+        cached = result_cache.get(cache_key)
+        if cached is not None:
+            return cached
+    else:
+        _invalidate_after_api_write(host_tag)
+
+    try:
+        async with api_limiter.slot():
+            result = await request_json(
+                method,
+                url,
+                headers=headers,
+                params=params,
+                json_body=data,
+                deadline=_turn_deadline(tool_context),
+            )
+    except (httpx.HTTPError, HttpClientError) as e:
         return {"error": f"API call failed: {e}"}
+    except ValueError as e:
+        return {"error": f"API call failed: response is not valid JSON ({e})"}
+    finally:
+        if not cacheable:
+            # Drops what concurrent reads cached while the call was running.
+            _invalidate_after_api_write(host_tag)
+    if cacheable:
+        result_cache.put(cache_key, result, RESULT_CACHE_API_TTL, tables={host_tag})
+    return result
+
+async def triage_orders(
+    order_ids: Optional[List[str]] = None,
+    status: Optional[str] = None,
+    organisation_process_path: Optional[str] = None,
+    task_type: Optional[str] = None,
+    root_causes: Optional[List[str]] = None,
+    min_age_hours: Optional[float] = None,
+    max_orders: int = TRIAGE_MAX_ORDERS,
+    from_upload: bool = False,
+    remediate: bool = False,
+    escalate: bool = False,
+    tool_context: Optional[ToolContext] = None) -> dict:
+    """
+    Diagnoses many orders at once against every SOP check, in one database pass, and
+    optionally remediates and escalates them. Use this instead of per-order queries
+    whenever more than a few orders are involved.
+
+    Args:
+        order_ids (List[str], optional): Order IDs to triage; pasted comma- or newline-separated lists are split.
+        status (str, optional): Only orders in this status, e.g. 'Activation In Progress'.
+        organisation_process_path (str, optional): Only orders on this process path.
+        task_type (str, optional): Only orders of this task type, e.g. 'INSTALL'.
+        root_causes (List[str], optional): Only orders with these root causes, e.g. ['dth_activation_stuck'].
+        min_age_hours (float, optional): Only orders created more than this many hours ago.
+        max_orders (int): Maximum number of orders to triage, oldest first (capped by the server).
+        from_upload (bool): Also read order IDs from text or CSV files attached to the user's message.
+        remediate (bool): Run the SOP's API call for each order (stateJump for stuck DTH activations,
+            the billing cycle check for pending postpaid bills). Only set this when the user asked to fix the orders.
+        escalate (bool): Raise tickets where the SOP says so (GIS team for missing address data, OAOE
+            assignment, failed stateJump calls, billing errors). Duplicates of open tickets are not created.
+
+    Returns:
+        dict: `order_count`, `truncated`, `not_found` and `root_causes`: one group per root cause with
+        its SOP, finding, next step, `outcomes` counts and the orders as `columns`/`rows`.
+    """
+    requested = parse_order_ids(order_ids)
+    if from_upload and tool_context is not None:
+        requested = parse_order_ids(requested + order_ids_from_upload(tool_context.user_content))
+    try:
+        orders, truncated = await sql_limiter.run_in_thread(
+            classify_orders, requested, status, organisation_process_path, task_type, root_causes,
+            min_age_hours, max_orders,
+        )
+    except ValueError as e:
+        return {"error": f"Invalid triage request: {e}"}
+    except Exception as e:
+        return {"error": f"Database error: {e}"}
+
+    if remediate:
+        await remediate_orders(orders, api_limiter, _turn_deadline(tool_context))
+        if any(o["outcome"] == "remediated" for o in orders):
+            # The workflow moved these orders on; cached reads of `task` are stale.
+            result_cache.invalidate("task")
+    if escalate:
+        pairs = escalation_tickets(orders)
+        if pairs:
+            try:
+                tickets = await asyncio.to_thread(get_ticket_store().create_many, [d for _, d in pairs])
+            except Exception as e:
+                return {"error": f"Failed to create tickets: {e}", **triage_report(orders, requested, truncated)}
+            record_tickets(pairs, tickets)
+            if any(t["status"] == "queued" for t in tickets):
+                get_ticket_submitter().notify()
+    return triage_report(orders, requested, truncated)
 
 # --- Tool Definitions ---
 # CORRECTED: Removed the 'description' keyword argument.
@@ -125,6 +425,10 @@ def make_api_call(
 api_call_tool = FunctionTool(
     func=make_api_call
 )
+
+triage_tool = FunctionTool(
+    func=triage_orders
+)
 execution_agent = LlmAgent(
     name="execution_agent",
     model=MODEL_GEMINI,
@@ -135,11 +439,13 @@ execution_agent = LlmAgent(
     1. You will receive a user request and a relevant Standard Operating Procedure (SOP).
     2. Analyze the user's request to extract key details (e.g., order_id).
     3. Follow the SOP step-by-step.
-    4. First, use the `run_sql` tool to execute the necessary query from the SOP to diagnose the problem.
-    5. **Analyze the result of the SQL query.**
+    4. First, use the `run_named_query` tool if one of the named queries below fits; otherwise use the `run_sql` tool to execute the necessary query from the SOP to diagnose the problem. Queries are checked with EXPLAIN before they run and may be rejected if they would scan too much of `task`; always filter on indexed columns (`order_id`, `corelation_id`, `status`, `organisation_process_path`, `task_type`, `pending_with_details`, `created_date`) where you can. When you list many orders, end the query with ORDER BY and LIMIT (e.g. `ORDER BY created_date LIMIT 50`); an over-budget query without its own ORDER BY is rejected rather than cut off at arbitrary rows.
+    5. **Analyze the result of the SQL query.** Results are compact: `columns` lists the column names once and each entry of `rows` holds the values in that order. Select only the columns you need (or pass `columns`), keep `max_rows` small, and pass `json_paths` (e.g. `common_details.commonDetails.telemedia.bin`) instead of reading whole `common_details` blobs. If `truncated` is true, call `run_sql` again with the same query and the returned `next_page_token` only if you really need more rows.
     6. Based on the result and the SOP, decide on the next step. This could be making an API call with the `api_call_tool` or providing an escalation instruction.
     7. Continue executing steps until the SOP is complete or requires escalation.
     8. If the SOP says create a ticket, use the `ticket_creation_agent` to create a support ticket.
+    9. **For many orders at once** (e.g. "find all DTH orders stuck in activation", or a list of order IDs), use the `triage_orders` tool instead of per-order queries: it diagnoses the whole set in one pass and groups the orders by root cause. Only pass `remediate=True` or `escalate=True` when the user asked to fix or escalate the orders; report the counts per root cause and outcome rather than listing every order.
+    10. **For counts or overviews of stuck orders** (e.g. "how many broadband orders are stuck in feasibility", "which orders are past their SOP threshold"), use the `stuck_order_summary` and `flagged_stuck_orders` named queries. They read small tables kept up to date by the stuck-order watcher; do not aggregate over `task` with `run_sql` for these questions.
     
     **Your Final Output:**
     - Provide a summary of the actions taken and the final outcome or the required escalation message.
@@ -155,6 +461,10 @@ execution_agent = LlmAgent(
     - `pending_with_details` (VARCHAR): Shows who the task is pending with (e.g., an engineer's mobile number).
     - `rsu` (VARCHAR): The Residential Service Unit.
     - `created_date` (TIMESTAMP): The timestamp when the task was created.
-    """,
-    tools=[sql_tool, api_call_tool]
+
+    **Bulk triage root causes (`triage_orders`):** """ + ", ".join(ROOT_CAUSES) + """
+
+    **Named Queries (`run_named_query`):**
+    """ + describe_templates(),
+    tools=[named_query_tool, sql_tool, api_call_tool, triage_tool]
 )
@@ -0,0 +1,380 @@
+import asyncio
+import re
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+import httpx
+
+from ...concurrency import ToolLimiter
+from ...config import BILLING_API_TOKEN, TRIAGE_API_CONCURRENCY, TRIAGE_MAX_LISTED_ORDERS, TRIAGE_MAX_ORDERS
+from ...db_pool import get_backend_name, get_pool
+from ...http_client import DeadlineExceeded, HttpClientError, request_json
+from ...telemetry import metrics
+from .query_guard import set_statement_timeout
+
+# --- Bulk multi-order triage ---
+# Diagnoses a whole set of orders at once: one SQL pass over `task` classifies every
+# order by SOP root cause, remediation API calls for the set run in a bounded worker
+# pool, and escalations are stored as one batch of tickets. The per-order SOP logic is
+# the same as the fast path's (see fast_path.py), expressed as SQL instead of Python.
+
+HONCHO_STATE_JUMP_URL = "https://honcho-service.airtelwork.com/honcho/stateJump/{corelation_id}"
+BILLING_CYCLE_STATUS_URL = "https://billing-service.airtelwork.com/api/v1/cycle/status/{corelation_id}"
+DTH_PATH = "AIRTEL.DTH.INSTALL_AND_FAULT_REPAIR"
+
+NO_SOP_MATCH = "no_sop_match"
+
+
+async def _advance_dth_workflow(order: Dict[str, Any], deadline: Optional[float]) -> Tuple[str, str, bool]:
+    await request_json(
+        "POST",
+        HONCHO_STATE_JUMP_URL.format(corelation_id=order["corelation_id"]),
+        json_body={"createContext": False, "nextState": "Completed", "transitionType": "dummy"},
+        deadline=deadline,
+    )
+    return "remediated", "Workflow advanced to 'Completed' with the stateJump API.", False
+
+
+async def _check_billing_cycle(order: Dict[str, Any], deadline: Optional[float]) -> Tuple[str, str, bool]:
+    headers = {"Authorization": f"Bearer {BILLING_API_TOKEN}"} if BILLING_API_TOKEN else None
+    body = await request_json(
+        "GET",
+        BILLING_CYCLE_STATUS_URL.format(corelation_id=order["corelation_id"]),
+        headers=headers,
+        deadline=deadline,
+    )
+    status = body.get("status") if isinstance(body, dict) else None
+    if status == "CYCLE_RUNNING":
+        return "cycle_running", "The billing cycle is still running; inform the customer of the delay.", False
+    if status == "ERROR":
+        return "billing_error", f"The billing service returned an error ({body.get('errorCode')}).", True
+    return "checked", f"The billing cycle status is {status!r}.", False
+
+
+@dataclass(frozen=True)
+class RootCause:
+    name: str
+    sop: str
+    finding: str
+    next_step: str
+    # Task statuses the root cause can occur in, used to narrow filtered scans to indexed values.
+    statuses: Tuple[str, ...]
+    # Remediation API call: returns (outcome, detail, escalate).
+    remediate: Optional[Callable[[Dict[str, Any], Optional[float]], Awaitable[Tuple[str, str, bool]]]] = None
+    # Team a ticket is raised to, and whether that happens without a remediation attempt
+    # (otherwise only when the remediation fails or asks for it).
+    team: Optional[str] = None
+    escalate_directly: bool = False
+    escalate_on_api_failure: bool = False
+
+
+ROOT_CAUSES: Dict[str, RootCause] = {
+    cause.name: cause
+    for cause in (
+        RootCause(
+            name="dth_activation_stuck",
+            sop="SOP 1",
+            finding="DTH install stuck in 'Activation In Progress' (QMS activation callback not received).",
+            next_step="Advance the workflow to 'Completed' with the honcho stateJump API; escalate to the "
+                      "DTH Backend Team if the call fails.",
+            statuses=("Activation In Progress",),
+            remediate=_advance_dth_workflow,
+            team="DTH Backend Team",
+            escalate_on_api_failure=True,
+        ),
+        RootCause(
+            name="feasibility_address_missing",
+            sop="SOP 2",
+            finding="Broadband order stuck in 'Feasibility Check' with rsu or operating_boundary_path missing.",
+            next_step="Raise a ticket to the GIS team to fix the address data, then re-push the order with "
+                      "the Jenkins job.",
+            statuses=("Feasibility Check",),
+            team="GIS Team",
+            escalate_directly=True,
+        ),
+        RootCause(
+            name="feasibility_address_present",
+            sop="SOP 2",
+            finding="Order in 'Feasibility Check' although its address data is present.",
+            next_step="The address-mismatch SOP does not apply; escalate with the order details.",
+            statuses=("Feasibility Check",),
+        ),
+        RootCause(
+            name="postpaid_bill_pending",
+            sop="SOP 3",
+            finding="Postpaid service request in 'Pending with Billing System'.",
+            next_step="Check the billing cycle status; raise a ticket to the Billing Operations Team on an "
+                      "ERROR response.",
+            statuses=("Pending with Billing System",),
+            remediate=_check_billing_cycle,
+            team="Billing Operations Team",
+        ),
+        RootCause(
+            name="oaoe_engineer_assignment",
+            sop="OAOE engineer assignment",
+            finding="OAOE order stuck at 'Installation Engineer Assignment'.",
+            next_step="Raise a ticket with the order details for engineer assignment.",
+            statuses=("Installation Engineer Assignment",),
+            team="OAOE Assignment Team",
+            escalate_directly=True,
+        ),
+        RootCause(
+            name=NO_SOP_MATCH,
+            sop="",
+            finding="No SOP check matches the order's current state.",
+            next_step="Investigate individually if the order is unexpectedly stuck.",
+            statuses=(),
+        ),
+    )
+}
+
+# The classification, evaluated by the database for every order in one pass. {bin} is
+# the dialect's expression for common_details.commonDetails.telemedia.bin.
+_ROOT_CAUSE_SQL = f"""
+    CASE
+        WHEN organisation_process_path = '{DTH_PATH}' AND task_type = 'INSTALL'
+             AND status = 'Activation In Progress' THEN 'dth_activation_stuck'
+        WHEN status = 'Feasibility Check'
+             AND (COALESCE(rsu, '') = '' OR COALESCE(operating_boundary_path, '') = '') THEN 'feasibility_address_missing'
+        WHEN status = 'Feasibility Check' THEN 'feasibility_address_present'
+        WHEN status = 'Pending with Billing System' THEN 'postpaid_bill_pending'
+        WHEN status = 'Installation Engineer Assignment' AND {{bin}} = 'OAOE' THEN 'oaoe_engineer_assignment'
+        ELSE '{NO_SOP_MATCH}'
+    END"""
+
+_DIALECTS = {
+    True: {
+        "bin": "common_details->'commonDetails'->'telemedia'->>'bin'",
+        "age_hours": "EXTRACT(EPOCH FROM now() - created_date) / 3600",
+        "older_than": "created_date < now() - {p} * interval '1 hour'",
+        "placeholder": "%s",
+    },
+    False: {
+        "bin": "json_extract(common_details, '$.commonDetails.telemedia.bin')",
+        "age_hours": "(julianday('now') - julianday(created_date)) * 24",
+        "older_than": "created_date < datetime('now', '-' || {p} || ' hours')",
+        "placeholder": "?",
+    },
+}
+
+# Order IDs in free text or an uploaded file: anything separated by commas, semicolons,
+# quotes or whitespace.
+_ORDER_ID_SPLIT_RE = re.compile(r"[\s,;'\"]+")
+_TEXT_MIME_TYPES = ("text/", "application/csv", "application/vnd.ms-excel")
+
+
+def parse_order_ids(values: Optional[Iterable[str]]) -> List[str]:
+    """Splits pasted lists of order IDs and drops duplicates, keeping the first-seen order."""
+    seen = {}
+    for value in values or ():
+        for order_id in _ORDER_ID_SPLIT_RE.split(str(value)):
+            if order_id and order_id.lower() not in ("order_id", "orderid"):
+                seen.setdefault(order_id, None)
+    return list(seen)
+
+
+def order_ids_from_upload(content) -> List[str]:
+    """Reads order IDs from the text/CSV attachments of a user message (ADK inline_data parts)."""
+    values = []
+    for part in (content.parts if content else None) or ():
+        blob = part.inline_data
+        if blob is not None and blob.data and (blob.mime_type or "").startswith(_TEXT_MIME_TYPES):
+            values.append(blob.data.decode("utf-8", errors="replace"))
+    return parse_order_ids(values)
+
+
+def build_triage_query(
+    is_postgres: bool,
+    order_ids: List[str],
+    statuses: List[str],
+    organisation_process_path: Optional[str],
+    task_type: Optional[str],
+    min_age_hours: Optional[float],
+    root_causes: List[str],
+    limit: int,
+) -> Tuple[str, List[Any]]:
+    """Builds the set-based classification query and its parameters."""
+    dialect = _DIALECTS[is_postgres]
+    p = dialect["placeholder"]
+    where, params = [], []
+    if order_ids:
+        if is_postgres:
+            where.append(f"order_id = ANY({p})")
+            params.append(order_ids)
+        else:
+            where.append(f"order_id IN ({', '.join([p] * len(order_ids))})")
+            params.extend(order_ids)
+    if statuses:
+        where.append(f"status IN ({', '.join([p] * len(statuses))})")
+        params.extend(statuses)
+    if organisation_process_path:
+        where.append(f"organisation_process_path = {p}")
+        params.append(organisation_process_path)
+    if task_type:
+        where.append(f"task_type = {p}")
+        params.append(task_type)
+    if min_age_hours is not None:
+        where.append(dialect["older_than"].format(p=p))
+        params.append(min_age_hours)
+    outer = ""
+    if root_causes:
+        outer = f"WHERE root_cause IN ({', '.join([p] * len(root_causes))}) "
+        params.extend(root_causes)
+    params.append(limit)
+    sql = (
+        "SELECT * FROM ("
+        "SELECT order_id, corelation_id, status, task_type, organisation_process_path, rsu, "
+        f"operating_boundary_path, created_date, {dialect['age_hours']} AS age_hours, "
+        f"{_ROOT_CAUSE_SQL.format(bin=dialect['bin'])} AS root_cause "
+        f"FROM task WHERE {' AND '.join(where)}) AS triage "
+        f"{outer}ORDER BY created_date LIMIT {p}"
+    )
+    return sql, params
+
+
+def classify_orders(
+    order_ids: List[str],
+    status: Optional[str] = None,
+    organisation_process_path: Optional[str] = None,
+    task_type: Optional[str] = None,
+    root_causes: Optional[List[str]] = None,
+    min_age_hours: Optional[float] = None,
+    max_orders: int = TRIAGE_MAX_ORDERS,
+) -> Tuple[List[Dict[str, Any]], bool]:
+    """Classifies every matching order in one query (blocking).
+
+    Returns:
+        (orders, truncated): one dict per order, oldest first, with its `root_cause`.
+    Raises:
+        ValueError: On unknown root causes, an empty filter or too many order IDs.
+    """
+    unknown = set(root_causes or ()) - set(ROOT_CAUSES)
+    if unknown:
+        raise ValueError(f"Unknown root cause(s): {', '.join(sorted(unknown))}. Use: {', '.join(ROOT_CAUSES)}.")
+    if len(order_ids) > TRIAGE_MAX_ORDERS:
+        raise ValueError(f"{len(order_ids)} order IDs given; at most {TRIAGE_MAX_ORDERS} can be triaged at once.")
+    statuses = [status] if status else []
+    if root_causes and not statuses and NO_SOP_MATCH not in root_causes:
+        # Narrow the scan to the statuses the requested root causes can occur in.
+        statuses = sorted({s for name in root_causes for s in ROOT_CAUSES[name].statuses})
+    if not (order_ids or statuses or organisation_process_path or task_type):
+        raise ValueError("Give order IDs or at least one filter (status, process path, task type or root cause).")
+    limit = max(1, min(int(max_orders), TRIAGE_MAX_ORDERS))
+
+    is_postgres = get_backend_name() != "local"
+    sql, params = build_triage_query(
+        is_postgres, order_ids, statuses, organisation_process_path, task_type, min_age_hours,
+        list(root_causes or ()), limit + 1,
+    )
+    with get_pool().connection() as conn:
+        if is_postgres:
+            set_statement_timeout(conn)
+        cursor = conn.cursor()
+        cursor.execute(sql, params)
+        columns = [desc[0] for desc in cursor.description]
+        rows = cursor.fetchall()
+        cursor.close()
+        conn.commit()
+    orders = [dict(zip(columns, row)) for row in rows]
+    truncated = len(orders) > limit
+    orders = orders[:limit]
+    for order in orders:
+        del order["created_date"]
+        order["age_hours"] = round(float(order["age_hours"]), 1) if order["age_hours"] is not None else None
+        missing = [c for c in ("rsu", "operating_boundary_path") if not order.pop(c)]
+        order["detail"] = f"missing {' and '.join(missing)}" if order["root_cause"] == "feasibility_address_missing" else None
+        order["outcome"] = "diagnosed"
+    return orders, truncated
+
+
+async def remediate_orders(
+    orders: List[Dict[str, Any]],
+    limiter: ToolLimiter,
+    deadline: Optional[float],
+    workers: int = TRIAGE_API_CONCURRENCY,
+) -> None:
+    """Runs each order's remediation API call in a bounded pool of worker tasks.
+
+    Every call also takes a slot of ``limiter`` (the `make_api_call` limiter), so a bulk
+    run cannot starve other sessions' API calls. Outcomes are written onto the orders.
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+    for order in orders:
+        if ROOT_CAUSES[order["root_cause"]].remediate is not None and order.get("corelation_id"):
+            queue.put_nowait(order)
+
+    async def worker():
+        while not queue.empty():
+            order = queue.get_nowait()
+            cause = ROOT_CAUSES[order["root_cause"]]
+            try:
+                async with limiter.slot():
+                    outcome, detail, escalate = await cause.remediate(order, deadline)
+            except DeadlineExceeded as e:
+                outcome, detail, escalate = "skipped", str(e), False
+            except (httpx.HTTPError, HttpClientError, ValueError) as e:
+                outcome, detail, escalate = "api_failed", f"API call failed: {e}", cause.escalate_on_api_failure
+            order.update(outcome=outcome, detail=detail, needs_ticket=escalate)
+
+    await asyncio.gather(*(worker() for _ in range(min(workers, queue.qsize()))))
+
+
+def escalation_tickets(orders: List[Dict[str, Any]]) -> List[Tuple[Dict[str, Any], Dict[str, Any]]]:
+    """Returns (order, ticket_details) for every order that should be escalated."""
+    tickets = []
+    for order in orders:
+        cause = ROOT_CAUSES[order["root_cause"]]
+        if cause.team and (cause.escalate_directly or order.get("needs_ticket")):
+            tickets.append((order, {
+                "order_id": order["order_id"],
+                "subject": f"{cause.sop}: {cause.finding}",
+                "category": cause.team,
+                "description": order.get("detail") or cause.next_step,
+                "corelation_id": order.get("corelation_id"),
+                "status": order.get("status"),
+                "root_cause": cause.name,
+                "source": "bulk_triage",
+            }))
+    return tickets
+
+
+def record_tickets(pairs: List[Tuple[Dict[str, Any], Dict[str, Any]]], tickets: List[Dict[str, Any]]) -> None:
+    """Writes the created (or already existing) tickets back onto their orders."""
+    for (order, _), ticket in zip(pairs, tickets):
+        order["outcome"] = "ticket_exists" if ticket["duplicate"] else "escalated"
+        order["ticket_id"] = ticket["ticket_id"]
+
+
+_ORDER_COLUMNS = ("order_id", "corelation_id", "status", "age_hours", "outcome", "detail", "ticket_id")
+
+
+def triage_report(orders: List[Dict[str, Any]], requested: List[str], truncated: bool) -> Dict[str, Any]:
+    """Groups the orders by root cause, largest group first, in the compact `columns`/`rows` form."""
+    groups: Dict[str, List[Dict[str, Any]]] = {}
+    for order in orders:
+        groups.setdefault(order["root_cause"], []).append(order)
+    found = {o["order_id"] for o in orders}
+    report = {
+        "order_count": len(orders),
+        "truncated": truncated,
+        "not_found": [order_id for order_id in requested if order_id not in found][:TRIAGE_MAX_LISTED_ORDERS],
+        "root_causes": [],
+    }
+    for name, members in sorted(groups.items(), key=lambda item: (-len(item[1]), item[0])):
+        cause = ROOT_CAUSES[name]
+        outcomes: Dict[str, int] = {}
+        for order in members:
+            outcomes[order["outcome"]] = outcomes.get(order["outcome"], 0) + 1
+            metrics.inc("airtel_triage_orders_total", {"root_cause": name, "outcome": order["outcome"]})
+        report["root_causes"].append({
+            "root_cause": name,
+            "sop": cause.sop,
+            "finding": cause.finding,
+            "next_step": cause.next_step,
+            "order_count": len(members),
+            "outcomes": outcomes,
+            "columns": list(_ORDER_COLUMNS),
+            "rows": [[o.get(c) for c in _ORDER_COLUMNS] for o in members[:TRIAGE_MAX_LISTED_ORDERS]],
+            "more_orders": max(0, len(members) - TRIAGE_MAX_LISTED_ORDERS),
+        })
+    return report
@@ -0,0 +1,147 @@
+import json
+import re
+from typing import List, Optional, Tuple
+
+from ...config import SQL_MAX_PLAN_COST, SQL_MAX_PLAN_ROWS, SQL_STATEMENT_TIMEOUT_MS
+
+# Guard rails for LLM-generated SQL on PostgreSQL: a per-statement timeout and a
+# cheap EXPLAIN check that rejects plans that would scan or change too much. Reads
+# that are only too expensive because of their result size are bounded instead.
+
+
+class QueryRejected(ValueError):
+    """Raised when a query's estimated plan is too expensive to run."""
+
+
+# Statements PostgreSQL can EXPLAIN; DDL and utility statements have no plan to check.
+EXPLAINABLE_KEYWORDS = frozenset({"select", "with", "values", "table", "insert", "update", "delete", "merge"})
+
+# Quoted text whose contents must not be read as SQL keywords or parentheses.
+_QUOTED_RE = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"")
+_ORDER_BY_RE = re.compile(r"\border\s+by\b", re.IGNORECASE)
+_LIMIT_RE = re.compile(r"\blimit\s+(\d+|all)\b", re.IGNORECASE)
+_ROW_CLAUSE_RE = re.compile(r"\b(?:limit|fetch)\b", re.IGNORECASE)
+_LOCKING_RE = re.compile(r"\bfor\s+(?:update|share|no\s+key|key)\b", re.IGNORECASE)
+_NO_ORDER_HINT = (
+    "Its rows have no defined order, so they cannot be cut off safely: add ORDER BY ... LIMIT n "
+    "(e.g. ORDER BY created_date LIMIT 50) or selective filters such as order_id, status, "
+    "organisation_process_path or a created_date range."
+)
+
+
+def set_statement_timeout(conn, timeout_ms: int = SQL_STATEMENT_TIMEOUT_MS) -> None:
+    """Limits every statement in the current transaction to ``timeout_ms`` milliseconds."""
+    if timeout_ms > 0:
+        cursor = conn.cursor()
+        cursor.execute(f"SET LOCAL statement_timeout = {int(timeout_ms)}")
+        cursor.close()
+
+
+def explain_plan(conn, query: str) -> Tuple[float, float]:
+    """Returns the planner's (total cost, estimated rows) for a query without running it."""
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {query}")
+        plan = cursor.fetchone()[0]
+    finally:
+        cursor.close()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    root = plan[0]["Plan"]
+    return float(root["Total Cost"]), float(root["Plan Rows"])
+
+
+def _within_limits(cost: float, rows: float) -> bool:
+    return cost <= SQL_MAX_PLAN_COST and rows <= SQL_MAX_PLAN_ROWS
+
+
+def _rejection(cost: float, rows: float, hint: str) -> QueryRejected:
+    return QueryRejected(
+        f"Query rejected: estimated cost {cost:.0f} and {rows:.0f} rows exceed the limits "
+        f"(cost {SQL_MAX_PLAN_COST:.0f}, rows {SQL_MAX_PLAN_ROWS:.0f}). {hint}"
+    )
+
+
+def check_write_plan(conn, query: str) -> None:
+    """Rejects a data-modifying statement whose plan exceeds the cost or row limits.
+
+    Writes are never bounded with a LIMIT; statements without a plan (DDL) pass.
+
+    Raises:
+        QueryRejected: If the plan exceeds the limits.
+    """
+    words = query.split(None, 1)
+    if not words or words[0].lower() not in EXPLAINABLE_KEYWORDS:
+        return
+    cost, rows = explain_plan(conn, query)
+    if not _within_limits(cost, rows):
+        raise _rejection(cost, rows, "Narrow the WHERE clause, e.g. by order_id, so fewer rows are changed.")
+
+
+def _top_level(pattern: re.Pattern, masked: str, depths: List[int], start: int = 0) -> List[re.Match]:
+    return [m for m in pattern.finditer(masked, start) if depths[m.start()] == 0]
+
+
+def limit_ordered_query(query: str, row_budget: int) -> Optional[str]:
+    """Caps an ordered query's own LIMIT at ``row_budget`` rows, adding one if it has none.
+
+    The LIMIT goes on the statement itself, next to its ORDER BY, because an ORDER BY
+    inside a subquery does not carry over to an outer LIMIT. Returns None when the
+    query has no top-level ORDER BY (or a row clause this cannot rewrite), and the
+    query unchanged when its LIMIT is already within the budget.
+    """
+    # Same-length masking keeps offsets into ``masked`` valid for ``query``.
+    masked = _QUOTED_RE.sub(lambda m: "'" + " " * (len(m.group(0)) - 2) + "'", query)
+    if "--" in masked or "/*" in masked:
+        return None
+    depths, depth = [], 0
+    for char in masked:
+        depth += char == "("
+        depths.append(depth)
+        depth -= char == ")"
+    orders = _top_level(_ORDER_BY_RE, masked, depths)
+    if not orders:
+        return None
+    tail = orders[-1].end()
+    limits = _top_level(_LIMIT_RE, masked, depths, tail)
+    if len(limits) != len(_top_level(_ROW_CLAUSE_RE, masked, depths, tail)):
+        # FETCH FIRST, or a LIMIT with an expression.
+        return None
+    if limits:
+        count = limits[0].group(1)
+        if count.isdigit() and int(count) <= row_budget:
+            return query
+        start, end = limits[0].span(1)
+        return f"{query[:start]}{int(row_budget)}{query[end:]}"
+    locking = _top_level(_LOCKING_RE, masked, depths, tail)
+    insert_at = locking[0].start() if locking else len(query)
+    return f"{query[:insert_at].rstrip()} LIMIT {int(row_budget)} {query[insert_at:]}".rstrip()
+
+
+def guard_query(conn, query: str, row_budget: int) -> Tuple[str, bool]:
+    """Checks a read-only query's plan against the configured cost and row limits.
+
+    A plan that is only too expensive because it would produce many rows is bounded
+    to ``row_budget`` rows (the caller never reads more than that anyway) and
+    re-checked. Only a query with its own ORDER BY is bounded, by adding or lowering
+    its LIMIT; without an order the kept rows would be arbitrary, so it is rejected,
+    as is a plan that is still too expensive.
+
+    Returns:
+        (query, rewritten): the query to run and whether its LIMIT was added or lowered.
+    Raises:
+        QueryRejected: If the plan exceeds the limits and cannot be bounded.
+    """
+    cost, rows = explain_plan(conn, query)
+    if _within_limits(cost, rows):
+        return query, False
+
+    bounded = limit_ordered_query(query, row_budget)
+    if bounded is None:
+        raise _rejection(cost, rows, _NO_ORDER_HINT)
+    if bounded != query and _within_limits(*explain_plan(conn, bounded)):
+        return bounded, True
+
+    raise _rejection(
+        cost, rows, "Add selective filters such as order_id, status, organisation_process_path or a created_date range."
+    )
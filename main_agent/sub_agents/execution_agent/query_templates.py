@@ -0,0 +1,272 @@
+import re
+import weakref
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from ...db_pool import get_backend_name, get_pool
+from .query_guard import set_statement_timeout
+
+# --- Named query templates for the `task` table ---
+# Each template is a fixed, parameterised statement. On PostgreSQL it is prepared at
+# protocol level once per pooled connection and then run with bound parameters, so
+# repeated diagnostics skip parsing and planning, and order IDs never become SQL text.
+
+_TASK_COLUMNS = (
+    "order_id, corelation_id, status, task_type, organisation_process_path, one_airtel_suborder, "
+    "pending_with_details, rsu, operating_boundary_path, created_date, modified_date"
+)
+
+
+@dataclass(frozen=True)
+class Param:
+    name: str
+    # PostgreSQL type the parameter is prepared with (a key of _PG_TYPE_OIDS).
+    pg_type: str
+    description: str
+    default: Any = None
+    required: bool = True
+
+
+@dataclass(frozen=True)
+class QueryTemplate:
+    name: str
+    description: str
+    # PostgreSQL statement using $1..$n in the order of `params`.
+    sql: str
+    params: Tuple[Param, ...] = ()
+    # Equivalent statement for the local SQLite stand-in, using ?n placeholders.
+    # None means "same as `sql` with $n replaced by ?n".
+    local_sql: Optional[str] = None
+    # Tables the statement reads, for result-cache invalidation.
+    tables: Tuple[str, ...] = ("task",)
+
+
+_LIMIT = Param("limit", "integer", "Maximum number of rows to return.", default=50, required=False)
+
+QUERY_TEMPLATES: Dict[str, QueryTemplate] = {
+    t.name: t
+    for t in (
+        QueryTemplate(
+            name="order_by_id",
+            description="All key fields of one task by order_id.",
+            sql=f"SELECT {_TASK_COLUMNS} FROM task WHERE order_id = $1",
+            params=(Param("order_id", "text", "The order ID, e.g. 'XBB10054321'."),),
+        ),
+        QueryTemplate(
+            name="order_by_corelation_id",
+            description="All key fields of one task by corelation_id.",
+            sql=f"SELECT {_TASK_COLUMNS} FROM task WHERE corelation_id = $1",
+            params=(Param("corelation_id", "text", "The correlation ID."),),
+        ),
+        QueryTemplate(
+            name="tasks_pending_with",
+            description="Tasks pending with a person, e.g. an engineer's mobile number, newest first.",
+            sql="SELECT order_id, status, task_type, organisation_process_path, created_date FROM task "
+                "WHERE pending_with_details = $1 ORDER BY created_date DESC LIMIT $2",
+            params=(Param("pending_with_details", "text", "Who the task is pending with (e.g. a mobile number)."), _LIMIT),
+        ),
+        QueryTemplate(
+            name="stuck_by_status_and_age",
+            description="Tasks in a status for longer than a number of hours, optionally for one process path, oldest first.",
+            sql="SELECT order_id, corelation_id, status, task_type, organisation_process_path, created_date FROM task "
+                "WHERE status = $1 AND created_date < now() - make_interval(hours => $2) "
+                "AND ($3::text IS NULL OR organisation_process_path = $3) ORDER BY created_date LIMIT $4",
+            params=(
+                Param("status", "text", "The task status, e.g. 'Activation In Progress'."),
+                Param("min_age_hours", "integer", "Minimum age of the task in hours.", default=24, required=False),
+                Param("organisation_process_path", "text", "Optional process path filter.", required=False),
+                _LIMIT,
+            ),
+            local_sql="SELECT order_id, corelation_id, status, task_type, organisation_process_path, created_date FROM task "
+                      "WHERE status = ?1 AND created_date < datetime('now', '-' || ?2 || ' hours') "
+                      "AND (?3 IS NULL OR organisation_process_path = ?3) ORDER BY created_date LIMIT ?4",
+        ),
+        QueryTemplate(
+            name="dth_activation_check",
+            description="SOP 1: confirm a DTH install order is stuck in 'Activation In Progress'.",
+            sql="SELECT order_id, corelation_id, status, created_date, modified_date FROM task "
+                "WHERE organisation_process_path = 'AIRTEL.DTH.INSTALL_AND_FAULT_REPAIR' "
+                "AND task_type = 'INSTALL' AND order_id = $1",
+            params=(Param("order_id", "text", "The DTH order ID, e.g. 'DT100987654'."),),
+        ),
+        QueryTemplate(
+            name="broadband_address_check",
+            description="SOP 2: status, rsu and operating_boundary_path of a broadband order stuck in feasibility.",
+            sql="SELECT order_id, status, rsu, operating_boundary_path FROM task WHERE order_id = $1",
+            params=(Param("order_id", "text", "The broadband order ID, e.g. 'XBB10054321'."),),
+        ),
+        QueryTemplate(
+            name="postpaid_sr_lookup",
+            description="SOP 3: corelation_id and status of a postpaid billing service request.",
+            sql="SELECT order_id, corelation_id, status, created_date FROM task WHERE order_id = $1",
+            params=(Param("order_id", "text", "The SR number, e.g. 'SR_POSTPAID_98765'."),),
+        ),
+        QueryTemplate(
+            name="oaoe_order_check",
+            description="Status, sub-order flag and telemedia bin of an order stuck at engineer assignment.",
+            sql="SELECT order_id, corelation_id, status, one_airtel_suborder, "
+                "common_details->'commonDetails'->'telemedia'->>'bin' AS bin FROM task WHERE order_id = $1",
+            params=(Param("order_id", "text", "The order ID, e.g. 'OAOE_ORDER_123'."),),
+        ),
+        # Read the tables kept up to date by order_watcher.py instead of scanning `task`.
+        QueryTemplate(
+            name="stuck_order_summary",
+            description="Order counts by status, process path and age bucket (<1d, 1-3d, 3-7d, 7-30d, >=30d), "
+                        "oldest buckets first; maintained by the stuck-order watcher.",
+            sql="SELECT status, organisation_process_path, age_bucket, order_count, oldest_created_day, refreshed_at "
+                "FROM task_summary WHERE ($1::text IS NULL OR status = $1) "
+                "AND ($2::text IS NULL OR organisation_process_path = $2) "
+                "ORDER BY min_age_days DESC, order_count DESC LIMIT $3",
+            params=(
+                Param("status", "text", "Optional task status filter.", required=False),
+                Param("organisation_process_path", "text", "Optional process path filter.", required=False),
+                _LIMIT,
+            ),
+            local_sql="SELECT status, organisation_process_path, age_bucket, order_count, oldest_created_day, refreshed_at "
+                      "FROM task_summary WHERE (?1 IS NULL OR status = ?1) "
+                      "AND (?2 IS NULL OR organisation_process_path = ?2) "
+                      "ORDER BY min_age_days DESC, order_count DESC LIMIT ?3",
+            tables=("task_summary",),
+        ),
+        QueryTemplate(
+            name="flagged_stuck_orders",
+            description="Orders past their SOP's age threshold in a stuck status, with the SOP that applies, oldest "
+                        "first; maintained by the stuck-order watcher.",
+            sql="SELECT order_id, corelation_id, status, organisation_process_path, created_date, threshold_hours, sop, "
+                "flagged_at FROM task_stuck_flags WHERE ($1::text IS NULL OR status = $1) "
+                "AND ($2::text IS NULL OR organisation_process_path = $2) ORDER BY created_date LIMIT $3",
+            params=(
+                Param("status", "text", "Optional task status filter, e.g. 'Feasibility Check'.", required=False),
+                Param("organisation_process_path", "text", "Optional process path filter.", required=False),
+                _LIMIT,
+            ),
+            local_sql="SELECT order_id, corelation_id, status, organisation_process_path, created_date, threshold_hours, "
+                      "sop, flagged_at FROM task_stuck_flags WHERE (?1 IS NULL OR status = ?1) "
+                      "AND (?2 IS NULL OR organisation_process_path = ?2) ORDER BY created_date LIMIT ?3",
+            tables=("task_stuck_flags",),
+        ),
+    )
+}
+
+# Protocol-level prepared statements of each pooled PostgreSQL connection, by template name.
+_prepared_statements = weakref.WeakKeyDictionary()
+
+# Type OIDs of the Param.pg_type names, sent when a template is prepared.
+_PG_TYPE_OIDS = {"text": 25, "integer": 23}
+# False once pg8000 turned out not to offer the prepared-statement internals used below.
+_named_statements_supported = True
+
+_PLACEHOLDER_RE = re.compile(r"\$(\d+)")
+
+
+def describe_templates() -> str:
+    """One line per template, for the execution agent's instruction."""
+    lines = []
+    for t in QUERY_TEMPLATES.values():
+        params = ", ".join(f"{p.name}{'' if p.required else '?'}" for p in t.params)
+        lines.append(f"- `{t.name}`({params}): {t.description}")
+    return "\n".join(lines)
+
+
+def bind_params(template: QueryTemplate, params: Optional[Dict[str, Any]]) -> List[Any]:
+    """Validates the caller's params against the template and returns them in order.
+
+    Raises:
+        ValueError: On unknown, missing or wrongly typed parameters.
+    """
+    params = dict(params or {})
+    known = {p.name for p in template.params}
+    unknown = set(params) - known
+    if unknown:
+        raise ValueError(f"Unknown parameter(s) for '{template.name}': {', '.join(sorted(unknown))}.")
+    values = []
+    for p in template.params:
+        value = params.get(p.name, p.default)
+        if value is None:
+            if p.required:
+                raise ValueError(f"Missing required parameter '{p.name}' for '{template.name}'.")
+        elif p.pg_type == "integer":
+            try:
+                value = int(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"Parameter '{p.name}' must be an integer.")
+        else:
+            value = str(value)
+            if "\x00" in value:
+                raise ValueError(f"Parameter '{p.name}' contains a NUL character.")
+        values.append(value)
+    return values
+
+
+def execute_template(
+    conn, template: QueryTemplate, values: List[Any], is_postgres: bool, max_rows: int
+) -> Tuple[List[str], List[tuple]]:
+    """Runs a template on a pooled connection and returns (columns, rows).
+
+    On PostgreSQL the template is prepared (Parse) the first time this connection sees
+    it and each run only binds the values and executes (falling back to a plain
+    parameterised statement if pg8000 lacks the internals for that); the local SQLite
+    stand-in relies on sqlite3's own statement cache.
+    """
+    if not is_postgres:
+        cursor = conn.cursor()
+        cursor.execute(template.local_sql or _PLACEHOLDER_RE.sub(r"?\1", template.sql), values)
+        columns = [desc[0] for desc in cursor.description]
+        rows = [tuple(r) for r in cursor.fetchmany(max_rows)]
+        cursor.close()
+        return columns, rows
+
+    global _named_statements_supported
+    if _named_statements_supported:
+        try:
+            return _execute_named(conn, template, values, max_rows)
+        except (AttributeError, TypeError, ImportError) as e:
+            # These pg8000 internals are only checked against the pinned release; a
+            # different one falls back to plain parameterised statements.
+            _named_statements_supported = False
+            print(f"ðŸ”´ Error: pg8000 prepared statements unavailable, using plain statements. {str(e)}")
+
+    cursor = conn.cursor()
+    sql = template.sql.replace("%", "%%") if values else template.sql
+    cursor.execute(_PLACEHOLDER_RE.sub("%s", sql), [values[int(n) - 1] for n in _PLACEHOLDER_RE.findall(sql)])
+    columns = [desc[0] for desc in cursor.description]
+    rows = [tuple(r) for r in cursor.fetchmany(max_rows)]
+    cursor.close()
+    return columns, rows
+
+
+def _execute_named(conn, template: QueryTemplate, values: List[Any], max_rows: int) -> Tuple[List[str], List[tuple]]:
+    """Runs a template as a protocol-level prepared statement, via pg8000 internals."""
+    from pg8000.converters import make_params
+
+    prepared = _prepared_statements.setdefault(conn, {})
+    if template.name not in prepared:
+        oids = tuple(_PG_TYPE_OIDS[p.pg_type] for p in template.params)
+        prepared[template.name] = conn.prepare_statement(template.sql, oids)
+    statement_name, columns, input_funcs = prepared[template.name]
+    context = conn.execute_named(
+        statement_name, make_params(conn.py_types, values), columns, input_funcs, template.sql
+    )
+    return [c["name"] for c in context.columns], [tuple(r) for r in (context.rows or [])[:max_rows]]
+
+
+def run_template(name: str, params: Optional[Dict[str, Any]] = None, max_rows: int = 500) -> Tuple[List[str], List[tuple]]:
+    """Runs a named template on a pooled connection (blocking).
+
+    Returns:
+        (columns, rows) with at most ``max_rows`` rows.
+    Raises:
+        KeyError: If no template has this name.
+        ValueError: If the params do not match the template.
+    """
+    if name not in QUERY_TEMPLATES:
+        raise KeyError(f"Unknown query '{name}'. Available: {', '.join(QUERY_TEMPLATES)}.")
+    template = QUERY_TEMPLATES[name]
+    values = bind_params(template, params)
+    is_postgres = get_backend_name() != "local"
+    with get_pool().connection() as conn:
+        if is_postgres:
+            set_statement_timeout(conn)
+        columns, rows = execute_template(conn, template, values, is_postgres, max_rows)
+        conn.commit()
+    return columns, rows
@@ -0,0 +1,197 @@
+import base64
+import datetime
+import decimal
+import hashlib
+import json
+import re
+import uuid
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# Helpers that keep `run_sql` results bounded and compact: row limits, server-side
+# cursor paging, column projection, JSON path trimming and continuation tokens.
+
+_IDENTIFIER_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+_LEADING_COMMENTS_RE = re.compile(r"^\s*(?:--[^\n]*\n\s*|/\*.*?\*/\s*)*", re.DOTALL)
+_READ_ONLY_START_RE = re.compile(r"^(select|with|values|table)\b", re.IGNORECASE)
+_WRITE_KEYWORD_RE = re.compile(r"\b(insert|update|delete|merge|truncate|drop|alter|create)\b", re.IGNORECASE)
+
+# Name of the server-side cursor used for paging. Each call uses its own pooled
+# connection and transaction, so a fixed name cannot collide.
+CURSOR_NAME = "run_sql_cursor"
+
+
+def strip_query(query: str) -> str:
+    """Removes surrounding whitespace and trailing semicolons from a statement."""
+    return query.strip().rstrip(";").strip()
+
+
+def is_read_only(query: str) -> bool:
+    """Returns True if the statement is a plain row-returning query that can be paged."""
+    body = _LEADING_COMMENTS_RE.sub("", query, count=1)
+    if not _READ_ONLY_START_RE.match(body):
+        return False
+    # Data-modifying CTEs (WITH ... UPDATE ...) cannot be wrapped in a cursor.
+    return not (body[:4].lower() == "with" and _WRITE_KEYWORD_RE.search(body))
+
+
+def quote_identifier(name: str) -> str:
+    """Validates and double-quotes a column name for use in a projection."""
+    if not _IDENTIFIER_RE.match(name):
+        raise ValueError(f"Invalid column name '{name}'.")
+    return f'"{name}"'
+
+
+def project_columns(query: str, columns: Optional[Sequence[str]]) -> str:
+    """Wraps a query so only the requested columns are returned."""
+    if not columns:
+        return query
+    return f"SELECT {', '.join(quote_identifier(c) for c in columns)} FROM ({query}) AS projected"
+
+
+def query_fingerprint(query: str, columns: Optional[Sequence[str]]) -> str:
+    """A short stable hash that ties a continuation token to the query it came from."""
+    key = json.dumps([" ".join(query.split()), list(columns or [])])
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+
+
+def encode_page_token(fingerprint: str, offset: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps({"q": fingerprint, "o": offset}).encode()).decode()
+
+
+def decode_page_token(token: str, fingerprint: str) -> int:
+    """Returns the row offset stored in a continuation token.
+
+    Raises:
+        ValueError: If the token is malformed or was issued for a different query.
+    """
+    try:
+        data = json.loads(base64.urlsafe_b64decode(token.encode()).decode())
+        offset = int(data["o"])
+    except Exception:
+        raise ValueError("Invalid page_token.")
+    if data.get("q") != fingerprint or offset < 0:
+        raise ValueError("page_token does not belong to this query; re-run it without a page_token.")
+    return offset
+
+
+def parse_json_paths(json_paths: Optional[Sequence[str]]) -> Dict[str, List[List[str]]]:
+    """Groups dotted paths like ``common_details.commonDetails.telemedia.bin`` by column."""
+    grouped: Dict[str, List[List[str]]] = {}
+    for path in json_paths or []:
+        column, _, rest = path.partition(".")
+        if column:
+            grouped.setdefault(column, []).append(rest.split(".") if rest else [])
+    return grouped
+
+
+def trim_json(value: Any, paths: List[List[str]]) -> Any:
+    """Keeps only the requested key paths of a JSON value, preserving their nesting."""
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            return value
+    if not isinstance(value, dict) or any(not p for p in paths):
+        return value
+    trimmed: Dict[str, Any] = {}
+    for path in paths:
+        node = value
+        for key in path:
+            if not isinstance(node, dict) or key not in node:
+                break
+            node = node[key]
+        else:
+            target = trimmed
+            for key in path[:-1]:
+                target = target.setdefault(key, {})
+            target[path[-1]] = node
+    return trimmed
+
+
+def to_jsonable(value: Any) -> Any:
+    """Converts driver types (timestamps, decimals, UUIDs) into JSON-friendly values."""
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return f"<{len(value)} bytes>"
+    return value
+
+
+def fetch_page(
+    conn, query: str, offset: int, limit: int, server_side: bool, count_total: bool = False
+) -> Tuple[List[str], List[tuple], bool, Optional[int]]:
+    """Fetches at most ``limit`` rows starting at ``offset``.
+
+    With ``server_side`` the query runs behind a PostgreSQL cursor (DECLARE/MOVE/FETCH)
+    so skipped and unread rows never leave the server; otherwise the driver cursor
+    is read incrementally with fetchmany.
+
+    Returns:
+        (columns, rows, truncated, total_rows) where total_rows is None when it is
+        unknown, i.e. the result was truncated and ``count_total`` was not requested.
+    """
+    cursor = conn.cursor()
+    try:
+        if server_side:
+            cursor.execute(f"DECLARE {CURSOR_NAME} NO SCROLL CURSOR FOR {query}")
+            if offset:
+                cursor.execute(f"MOVE FORWARD {int(offset)} FROM {CURSOR_NAME}")
+            cursor.execute(f"FETCH FORWARD {int(limit) + 1} FROM {CURSOR_NAME}")
+            columns = [desc[0] for desc in cursor.description]
+            rows = [tuple(r) for r in cursor.fetchall()]
+            remaining = None
+            if len(rows) > limit and count_total:
+                cursor.execute(f"MOVE FORWARD ALL FROM {CURSOR_NAME}")
+                remaining = cursor.rowcount
+            cursor.execute(f"CLOSE {CURSOR_NAME}")
+        else:
+            cursor.execute(query)
+            columns = [desc[0] for desc in cursor.description]
+            skipped = 0
+            while skipped < offset:
+                chunk = cursor.fetchmany(min(1000, offset - skipped))
+                if not chunk:
+                    break
+                skipped += len(chunk)
+            rows = [tuple(r) for r in cursor.fetchmany(limit + 1)]
+            remaining = None
+            if len(rows) > limit and count_total:
+                remaining = 0
+                while True:
+                    chunk = cursor.fetchmany(1000)
+                    if not chunk:
+                        break
+                    remaining += len(chunk)
+    finally:
+        cursor.close()
+
+    truncated = len(rows) > limit
+    rows = rows[:limit]
+    if not truncated:
+        total = offset + len(rows)
+    elif remaining is not None and remaining >= 0:
+        # The extra row fetched to detect truncation is counted in `rows`' overflow.
+        total = offset + limit + 1 + remaining
+    else:
+        total = None
+    return columns, rows, truncated, total
+
+
+def compact_rows(
+    columns: List[str], rows: List[tuple], json_paths: Dict[str, List[List[str]]]
+) -> List[list]:
+    """Converts rows to JSON-friendly lists, trimming JSON columns to the requested paths."""
+    trim_at = {i: json_paths[c] for i, c in enumerate(columns) if c in json_paths}
+    compacted = []
+    for row in rows:
+        values = []
+        for i, value in enumerate(row):
+            if i in trim_at and value is not None:
+                value = trim_json(value, trim_at[i])
+            values.append(to_jsonable(value))
+        compacted.append(values)
+    return compacted
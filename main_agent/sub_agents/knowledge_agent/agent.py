@@ -1,39 +1,64 @@
 from google.adk.agents import LlmAgent
 from google.adk.tools import FunctionTool
 import os
+import threading
 
+from ...config import MODEL_GEMINI, SOP_FAQ_FILE_PATH
+from .sop_index import load_or_build_index
 
-# --- Database Functionality (Previously in db_operations.py) ---
-SOP_FAQ_FILE_PATH = "Airtel_Support_SOP_FAQ.pdf" 
-MODEL_GEMINI = "gemini-2.0-flash"
 
+# --- Knowledge Base Retrieval ---
+# Global index instance, loaded on first search and reused for the process lifetime.
+# The PDF's mtime is remembered so an edited document is picked up without a restart.
+sop_index = None
+sop_index_mtime = None
+# Concurrent first searches wait for one load instead of each parsing the PDF.
+_sop_index_lock = threading.Lock()
 
-def read_knowledge_base(file_path: str) -> str:
-    """
-    Reads the content of the SOP/FAQ document.
-    """
-    if not os.path.exists(file_path):
-        return f"Error: Knowledge base file not found at '{file_path}'"
-    return f"Successfully accessed the knowledge base file at '{file_path}'. The agent should now use its internal knowledge to answer based on the SOPs and FAQs within."
+
+def get_sop_index():
+    """Returns the shared SOP index, (re)loading it if the PDF changed on disk."""
+    global sop_index, sop_index_mtime
+    mtime = os.path.getmtime(SOP_FAQ_FILE_PATH)
+    if sop_index is None or mtime != sop_index_mtime:
+        with _sop_index_lock:
+            if sop_index is None or mtime != sop_index_mtime:
+                sop_index = load_or_build_index(SOP_FAQ_FILE_PATH)
+                sop_index_mtime = mtime
+    return sop_index
 
 
-def get_knowledge_base_content():
+def search_sop(query: str, k: int = 3) -> dict:
     """
-    Helper function to get the content of the knowledge base.
-    This function will be wrapped by FunctionTool to give it a proper name.
+    Searches the SOP/FAQ document and returns the sections most relevant to the query.
+
+    Args:
+        query (str): The user's problem description, including any order ID, status or product.
+        k (int): The maximum number of sections to return.
+
+    Returns:
+        dict: The top-k matching sections with their id, title, full text and relevance score.
     """
-    return {"content": read_knowledge_base(SOP_FAQ_FILE_PATH)}
+    if not os.path.exists(SOP_FAQ_FILE_PATH):
+        return {"error": f"Knowledge base file not found at '{SOP_FAQ_FILE_PATH}'"}
+    try:
+        results = get_sop_index().search(query, k)
+    except Exception as e:
+        return {"error": f"Failed to search the knowledge base: {e}"}
+    if not results:
+        return {"results": [], "message": "No SOP or FAQ section matched the query."}
+    return {"results": results}
 
 
 knowledge_tool = FunctionTool(
-    func=get_knowledge_base_content # Now using a named function
+    func=search_sop
 )
 
 knowledge_agent = LlmAgent(
     name="knowledge_agent",
     model=MODEL_GEMINI,
     description="Answers user questions and follows procedures described in the SOP/FAQ document.",
-    instruction="You are a support agent who answers questions by consulting the provided knowledge base. You must use the 'read_knowledge_base' tool to access the SOP/FAQ document and provide solutions from it. If the solution requires a technical step like a database query or an API call, clearly state the required command. and pass it to the execution agent for execution."
+    instruction="You are a support agent who answers questions by consulting the provided knowledge base. You must use the 'search_sop' tool with a short description of the user's problem to retrieve the relevant SOP/FAQ sections and provide solutions from them. Only answer from the returned sections. If the solution requires a technical step like a database query or an API call, clearly state the required command. and pass it to the execution agent for execution."
     "If the SOP says create a ticket, use the `ticket_creation_agent` to create a support ticket." \
     "If the order_id is given in the chat go to the `execution_agent` to execute the SQL query and provide the result. and look what is wrong then refer the SOP if you find the solution then provide the solution to the user. If you don't find the solution then pass it to the `ticket_creation_agent` to create a support ticket.",
     tools=[knowledge_tool]
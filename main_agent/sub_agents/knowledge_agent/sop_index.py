@@ -0,0 +1,189 @@
+import hashlib
+import json
+import math
+import os
+import re
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+from ...config import SOP_INDEX_CACHE_DIR
+
+# BM25 tuning constants (standard Okapi defaults).
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+# Bump this when the on-disk layout or the section splitting changes so stale
+# caches are ignored instead of being loaded.
+INDEX_FORMAT_VERSION = 1
+
+_TOKEN_RE = re.compile(r"[a-z0-9_]+")
+# A section heading is a numbered title followed by "Issue:" (SOP) or "Answer:" (FAQ).
+_SECTION_RE = re.compile(r"(\d+)\.\s+((?:(?!\d+\.\s)[^:]){5,250}?)\s+(Issue|Answer):")
+_FAQ_MARKER = "FAQ (Frequently Asked Questions)"
+
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have i if in into is it its my of on or "
+    "so that the their then this to was we will with you your".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cases and splits text into index terms, dropping common stopwords."""
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in _STOPWORDS]
+
+
+def file_sha256(file_path: str) -> str:
+    """Returns the hex SHA-256 digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(65536), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def extract_pdf_text(file_path: str) -> str:
+    """Extracts the text of a PDF and collapses the extractor's whitespace."""
+    from pypdf import PdfReader
+
+    reader = PdfReader(file_path)
+    text = " ".join(page.extract_text() or "" for page in reader.pages)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def split_sections(text: str) -> List[Dict[str, str]]:
+    """
+    Splits the SOP/FAQ document text into one entry per SOP or FAQ item.
+
+    Falls back to fixed-size chunks if no headings are recognised, so an
+    unexpectedly formatted document still produces a searchable index.
+    """
+    faq_start = text.find(_FAQ_MARKER)
+    # Numbered plan steps can look like headings ("1. Confirm the Issue:"), so only
+    # keep matches that continue the 1, 2, 3... numbering of their part.
+    matches = []
+    expected = {"SOP": 1, "FAQ": 1}
+    for match in _SECTION_RE.finditer(text):
+        kind = "FAQ" if faq_start != -1 and match.start() > faq_start else "SOP"
+        if int(match.group(1)) == expected[kind]:
+            matches.append(match)
+            expected[kind] += 1
+    sections = []
+    for i, match in enumerate(matches):
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(text)
+        if faq_start != -1 and match.start() < faq_start < end:
+            end = faq_start
+        kind = "FAQ" if faq_start != -1 and match.start() > faq_start else "SOP"
+        sections.append({
+            "id": f"{kind}-{match.group(1)}",
+            "kind": kind,
+            "title": match.group(2).strip(),
+            "content": text[match.start():end].strip(),
+        })
+
+    if not sections:
+        chunk_size = 1500
+        for i in range(0, len(text), chunk_size):
+            sections.append({
+                "id": f"CHUNK-{i // chunk_size + 1}",
+                "kind": "CHUNK",
+                "title": text[i:i + 80],
+                "content": text[i:i + chunk_size],
+            })
+    return sections
+
+
+class SopIndex:
+    """An in-memory BM25 inverted index over the sections of the SOP/FAQ document."""
+
+    def __init__(self, sections: List[Dict[str, str]], source_hash: str = ""):
+        self.sections = sections
+        self.source_hash = source_hash
+        self.doc_lengths: List[int] = []
+        self.postings: Dict[str, Dict[int, int]] = {}
+        for doc_id, section in enumerate(sections):
+            # Titles are short but highly indicative, so they are counted twice.
+            terms = tokenize(section["title"]) * 2 + tokenize(section["content"])
+            self.doc_lengths.append(len(terms))
+            for term, freq in Counter(terms).items():
+                self.postings.setdefault(term, {})[doc_id] = freq
+        self.avg_doc_length = (
+            sum(self.doc_lengths) / len(self.doc_lengths) if self.doc_lengths else 0.0
+        )
+
+    def _idf(self, term: str) -> float:
+        n = len(self.sections)
+        df = len(self.postings.get(term, {}))
+        return math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+    def search(self, query: str, k: int = 3) -> List[Dict[str, Any]]:
+        """Returns the top-k sections for the query, highest BM25 score first."""
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = self._idf(term)
+            for doc_id, freq in postings.items():
+                norm = 1 - BM25_B + BM25_B * self.doc_lengths[doc_id] / self.avg_doc_length
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * freq * (BM25_K1 + 1) / (
+                    freq + BM25_K1 * norm
+                )
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:max(k, 0)]
+        return [
+            {**self.sections[doc_id], "score": round(score, 4)} for doc_id, score in ranked
+        ]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "version": INDEX_FORMAT_VERSION,
+            "source_hash": self.source_hash,
+            "sections": self.sections,
+            "doc_lengths": self.doc_lengths,
+            "postings": {t: {str(d): f for d, f in p.items()} for t, p in self.postings.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SopIndex":
+        index = cls.__new__(cls)
+        index.sections = data["sections"]
+        index.source_hash = data["source_hash"]
+        index.doc_lengths = data["doc_lengths"]
+        index.postings = {
+            t: {int(d): f for d, f in p.items()} for t, p in data["postings"].items()
+        }
+        index.avg_doc_length = (
+            sum(index.doc_lengths) / len(index.doc_lengths) if index.doc_lengths else 0.0
+        )
+        return index
+
+
+def load_or_build_index(file_path: str, cache_dir: Optional[str] = None) -> SopIndex:
+    """
+    Loads the index for the given PDF from the on-disk cache, building it if needed.
+
+    The cache file is keyed by the PDF's SHA-256, so editing the document
+    transparently triggers a rebuild while a warm start never re-parses it.
+    """
+    cache_dir = cache_dir or SOP_INDEX_CACHE_DIR
+    source_hash = file_sha256(file_path)
+    cache_path = os.path.join(cache_dir, f"{source_hash}.json")
+
+    if os.path.exists(cache_path):
+        try:
+            with open(cache_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == INDEX_FORMAT_VERSION:
+                return SopIndex.from_dict(data)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Warning: ignoring unreadable SOP index cache '{cache_path}': {e}")
+
+    index = SopIndex(split_sections(extract_pdf_text(file_path)), source_hash=source_hash)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(index.to_dict(), f)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        print(f"Warning: could not persist SOP index cache to '{cache_dir}': {e}")
+    return index
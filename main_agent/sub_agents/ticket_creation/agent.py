@@ -1,32 +1,44 @@
 from google.adk.agents import LlmAgent
 from google.adk.tools import FunctionTool
-import os
-import time
-from typing import Dict, Any
+import asyncio
+from typing import Dict, Any, Optional
 
-MODEL_GEMINI = "gemini-2.0-flash"
+from ...config import MODEL_GEMINI
+from .ticket_store import get_ticket_store, get_ticket_submitter
 
-def create_ticket_api_call(ticket_details:Dict[str, Any]) -> dict:
+async def create_ticket_api_call(ticket_details:Dict[str, Any]) -> dict:
     """
-    Simlulates the creation of a new support ticket with a hardcoded/generated ID, without making an actual API call.
+    Creates a support ticket, or returns the existing one if the same order, subject and category
+    was already escalated within the de-duplication window (TICKET_DEDUP_WINDOW_SECONDS).
+    The ticket is stored durably first and then queued for batched submission to the ticketing backend.
     Args: 
-        ticket_details(Dict[str,Any]): A dictionary conntaining details for the ticket, such as subject,decription,customer_id, etc.
+        ticket_details(Dict[str,Any]): A dictionary containing details for the ticket, such as subject, description, order_id, category, etc.
 
     Returns:
-         dict: A dictionary indicating the status of the ticket creation (success/faliure) and the generated ticket ID.
+         dict: The status of the ticket creation (success/failure), the ticket ID, whether it was a duplicate
+         and its submission status ('queued', 'submitted' or 'failed').
     
     """
     print(f"Creating ticket with details: {ticket_details}")    
 
     try:
-        # Simulate a unique ticket using cureent timestamp and a hash of details
-        #This will create a "hardcoded" simulation without needing an actual API. 
-        simulated_ticket_id = f"SIM-TKT- {int(time.time() *1000)- abs(hash(str(ticket_details)) % 10000)}"
-
+        ticket = await asyncio.to_thread(get_ticket_store().create, ticket_details)
+        if ticket["status"] == "queued":
+            get_ticket_submitter().notify()
+        else:
+            # Still drains what earlier runs left queued.
+            get_ticket_submitter().start()
+        if ticket["duplicate"]:
+            message = f"Ticket '{ticket['ticket_id']}' already exists for this issue; no new ticket was created."
+        else:
+            message = f"Ticket '{ticket['ticket_id']}' created successfully and queued for submission."
         return {
             "status": "success",
-            "ticket_id": simulated_ticket_id,
-            "message": f"Simulated ticket '{simulated_ticket_id}' created successfully with provided details."
+            "ticket_id": ticket["ticket_id"],
+            "duplicate": ticket["duplicate"],
+            "submission_status": ticket["status"],
+            "external_ticket_id": ticket["external_id"],
+            "message": message,
         }
     except Exception as e:
         print(f"ðŸ”´ Error: Failed to create ticket. {str(e)}")
@@ -34,9 +46,38 @@ def create_ticket_api_call(ticket_details:Dict[str, Any]) -> dict:
             "status": "failure",
             "message": f"Failed to create ticket: {str(e)}"
         }
+
+async def get_ticket(ticket_id: Optional[str] = None, order_id: Optional[str] = None) -> dict:
+    """
+    Looks up existing tickets by ticket ID or by order ID, without creating anything.
+    Args:
+        ticket_id(str, optional): The ticket ID returned by `create_ticket_api_call`.
+        order_id(str, optional): The order ID the tickets were raised for (newest first).
+
+    Returns:
+        dict: {"tickets": [...]} with each ticket's ID, subject, category, submission status and
+        external ticket ID, or {"error": ...}.
+    """
+    if not ticket_id and not order_id:
+        return {"error": "Provide a ticket_id or an order_id."}
+    try:
+        store = get_ticket_store()
+        get_ticket_submitter().start()
+        if ticket_id:
+            ticket = await asyncio.to_thread(store.get, ticket_id)
+            tickets = [ticket] if ticket else []
+        else:
+            tickets = await asyncio.to_thread(store.find_by_order, order_id)
+    except Exception as e:
+        return {"error": f"Failed to look up tickets: {str(e)}"}
+    return {"tickets": [{k: v for k, v in t.items() if k != "details"} for t in tickets]}
+
 create_ticket_tool = FunctionTool(
     func = create_ticket_api_call,
 )
+get_ticket_tool = FunctionTool(
+    func = get_ticket,
+)
 ticket_creation_agent = LlmAgent(
     name = "ticket_creation_agent",
     model = MODEL_GEMINI,
@@ -49,14 +90,16 @@ ticket_creation_agent = LlmAgent(
     **Input:** Expect a dictionary of `ticket_details` which should contain at least:
     - `subject` (str): A brief description of the issue.
     - `description` (str): Detailed information about the problem.
+    - `order_id` (str, optional but strongly preferred): The affected order ID. Used to detect duplicate tickets.
     - `customer_id` (str, optional): The ID of the affected customer.
     - `priority` (str, optional): The urgency of the ticket (e.g., 'Low', 'Medium', 'High', 'Urgent').
     - `category` (str, optional): The category of the issue (e.g., 'Billing', 'Technical', 'Network').
 
     **Process:**
-    1. Extract all relevant `ticket_details` from the instruction. Ensure all required fields (`subject`, `description`) are present.
-    2. Call the `create_ticket_api_call` tool with these details.
-    3. Report the outcome (success/failure and ticket ID if successful) back to the main agent.
+    1. If the user is asking about an existing ticket (its status or ID), call `get_ticket` with the `ticket_id` or `order_id` and report it. Do not create a new ticket.
+    2. Otherwise extract all relevant `ticket_details` from the instruction. Ensure all required fields (`subject`, `description`) are present.
+    3. Call the `create_ticket_api_call` tool with these details. It is safe to call again with the same details: a duplicate returns the existing ticket (`duplicate: true`).
+    4. Report the outcome (success/failure, ticket ID, and whether it was an existing ticket) back to the main agent.
     """,
-    tools=[create_ticket_tool]
+    tools=[create_ticket_tool, get_ticket_tool]
 )
\ No newline at end of file
@@ -0,0 +1,355 @@
+import asyncio
+import hashlib
+import importlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from ...config import (
+    TICKET_BACKEND,
+    TICKET_BATCH_INTERVAL_SECONDS,
+    TICKET_BATCH_SIZE,
+    TICKET_DB_PATH,
+    TICKET_DEDUP_WINDOW_SECONDS,
+    TICKET_MAX_SUBMIT_ATTEMPTS,
+    TICKET_RETRY_MAX_BACKOFF_SECONDS,
+    TICKET_SUBMIT_LEASE_SECONDS,
+)
+
+# --- Durable, de-duplicating ticket store ---
+# Tickets are written to a local SQLite file before anything else happens, so a
+# retried or concurrent escalation for the same order/subject/category returns the
+# existing ticket instead of creating a duplicate. A background submitter then sends
+# queued tickets in batches to the downstream ticketing backend, retrying failed
+# batches with backoff; each batch is leased, so several workers sharing the file
+# never submit the same ticket at once.
+
+_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS tickets (
+        ticket_id TEXT PRIMARY KEY,
+        fingerprint TEXT NOT NULL,
+        order_id TEXT,
+        subject TEXT NOT NULL,
+        category TEXT,
+        details TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'queued',
+        external_id TEXT,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        last_error TEXT,
+        created_at REAL NOT NULL,
+        submitted_at REAL,
+        claimed_at REAL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_tickets_fingerprint_created ON tickets (fingerprint, created_at)",
+    "CREATE INDEX IF NOT EXISTS idx_tickets_order_id ON tickets (order_id, created_at)",
+    "CREATE INDEX IF NOT EXISTS idx_tickets_status ON tickets (status, created_at)",
+]
+
+_COLUMNS = (
+    "ticket_id, order_id, subject, category, details, status, external_id, attempts, "
+    "last_error, created_at, submitted_at"
+)
+
+
+def _normalize(value: Any) -> str:
+    return " ".join(str(value or "").split()).lower()
+
+
+def ticket_fingerprint(order_id: Optional[str], subject: str, category: Optional[str]) -> str:
+    """Deterministic content fingerprint used for de-duplication.
+
+    Unlike Python's salted ``hash()``, this is stable across processes and restarts.
+    """
+    key = "\x1f".join((_normalize(order_id), _normalize(subject), _normalize(category)))
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+def _row_to_ticket(row) -> Dict[str, Any]:
+    ticket = dict(zip([c.strip() for c in _COLUMNS.split(",")], row))
+    ticket["details"] = json.loads(ticket["details"])
+    return ticket
+
+
+class TicketStore:
+    """SQLite-backed ticket store, safe to share between threads."""
+
+    def __init__(self, path: str = TICKET_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        for statement in _SCHEMA:
+            self._conn.execute(statement)
+        self._add_claimed_at()
+
+    def _add_claimed_at(self) -> None:
+        # Files created before submissions were leased lack the column.
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(tickets)")}
+        if "claimed_at" not in columns:
+            try:
+                self._conn.execute("ALTER TABLE tickets ADD COLUMN claimed_at REAL")
+            except sqlite3.OperationalError:
+                # Another worker added it first.
+                pass
+
+    def create(self, details: Dict[str, Any], window_seconds: float = TICKET_DEDUP_WINDOW_SECONDS) -> Dict[str, Any]:
+        """Stores a new queued ticket, or returns the existing one for the same content.
+
+        Returns:
+            dict: The ticket, with ``duplicate`` set to True if it already existed.
+        Raises:
+            ValueError: If the subject is missing.
+        """
+        return self.create_many([details], window_seconds)[0]
+
+    def create_many(self, details_list: List[Dict[str, Any]],
+                    window_seconds: float = TICKET_DEDUP_WINDOW_SECONDS) -> List[Dict[str, Any]]:
+        """Like `create`, for many tickets in one transaction (used by bulk escalations).
+
+        Returns:
+            list: One ticket per entry of ``details_list``, in the same order.
+        Raises:
+            ValueError: If any subject is missing; nothing is stored then.
+        """
+        for details in details_list:
+            if not details.get("subject"):
+                raise ValueError("ticket_details must include a 'subject'.")
+        now = time.time()
+
+        with self._lock:
+            # IMMEDIATE takes the write lock up front, so two processes escalating the
+            # same order cannot both miss the existing ticket and insert.
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                results = [self._create_locked(details, now, window_seconds) for details in details_list]
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return results
+
+    def _create_locked(self, details: Dict[str, Any], now: float, window_seconds: float) -> Dict[str, Any]:
+        order_id = details.get("order_id")
+        subject = details["subject"]
+        category = details.get("category")
+        fingerprint = ticket_fingerprint(order_id, subject, category)
+        row = self._conn.execute(
+            f"SELECT {_COLUMNS} FROM tickets WHERE fingerprint = ? AND created_at >= ? "
+            "ORDER BY created_at DESC LIMIT 1",
+            (fingerprint, now - window_seconds),
+        ).fetchone()
+        if row is not None:
+            return {**_row_to_ticket(row), "duplicate": True}
+
+        (previous,) = self._conn.execute(
+            "SELECT COUNT(*) FROM tickets WHERE fingerprint = ?", (fingerprint,)
+        ).fetchone()
+        ticket_id = f"TKT-{fingerprint[:12].upper()}-{previous + 1}"
+        self._conn.execute(
+            "INSERT INTO tickets (ticket_id, fingerprint, order_id, subject, category, details, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (ticket_id, fingerprint, order_id, subject, category, json.dumps(details, default=str), now),
+        )
+        row = self._conn.execute(f"SELECT {_COLUMNS} FROM tickets WHERE ticket_id = ?", (ticket_id,)).fetchone()
+        return {**_row_to_ticket(row), "duplicate": False}
+
+    def get(self, ticket_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(f"SELECT {_COLUMNS} FROM tickets WHERE ticket_id = ?", (ticket_id,)).fetchone()
+        return _row_to_ticket(row) if row else None
+
+    def find_by_order(self, order_id: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Returns the order's tickets, newest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {_COLUMNS} FROM tickets WHERE order_id = ? ORDER BY created_at DESC LIMIT ?",
+                (order_id, limit),
+            ).fetchall()
+        return [_row_to_ticket(r) for r in rows]
+
+    def queued(self, limit: int) -> List[Dict[str, Any]]:
+        """Returns the oldest tickets still waiting for submission."""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {_COLUMNS} FROM tickets WHERE status = 'queued' ORDER BY created_at LIMIT ?",
+                (limit,),
+            ).fetchall()
+        return [_row_to_ticket(r) for r in rows]
+
+    def claim_queued(self, limit: int, lease_seconds: float = TICKET_SUBMIT_LEASE_SECONDS) -> List[Dict[str, Any]]:
+        """Leases the oldest queued tickets no other submitter holds, for ``lease_seconds``.
+
+        A lease ends when the ticket is marked submitted or failed, or when it expires
+        (the submitter holding it stopped mid-batch).
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    f"SELECT {_COLUMNS} FROM tickets WHERE status = 'queued' "
+                    "AND (claimed_at IS NULL OR claimed_at < ?) ORDER BY created_at LIMIT ?",
+                    (now - lease_seconds, limit),
+                ).fetchall()
+                self._conn.executemany(
+                    "UPDATE tickets SET claimed_at = ? WHERE ticket_id = ?", [(now, row[0]) for row in rows]
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return [_row_to_ticket(r) for r in rows]
+
+    def has_queued(self) -> bool:
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM tickets WHERE status = 'queued' LIMIT 1").fetchone()
+        return row is not None
+
+    def mark_submitted(self, results: Dict[str, str]) -> None:
+        """Records the downstream IDs of successfully submitted tickets."""
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE tickets SET status = 'submitted', external_id = ?, submitted_at = ?, "
+                "attempts = attempts + 1, last_error = NULL, claimed_at = NULL WHERE ticket_id = ?",
+                [(external_id, now, ticket_id) for ticket_id, external_id in results.items()],
+            )
+
+    def mark_failed(self, ticket_ids: List[str], error: str, max_attempts: int = TICKET_MAX_SUBMIT_ATTEMPTS) -> None:
+        """Counts a failed attempt; tickets out of attempts are parked as 'failed'."""
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE tickets SET attempts = attempts + 1, last_error = ?, claimed_at = NULL, "
+                "status = CASE WHEN attempts + 1 >= ? THEN 'failed' ELSE status END WHERE ticket_id = ?",
+                [(error, max_attempts, ticket_id) for ticket_id in ticket_ids],
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+# --- Downstream backends ---
+
+
+class SimulatedTicketBackend:
+    """Default backend: accepts every ticket and derives a stable simulated ID from it."""
+
+    async def submit_batch(self, tickets: List[Dict[str, Any]]) -> Dict[str, str]:
+        return {t["ticket_id"]: f"SIM-{t['ticket_id']}" for t in tickets}
+
+
+def load_backend():
+    """Creates the backend named by TICKET_BACKEND ('package.module:factory'), or the simulator.
+
+    A backend is any object with ``async submit_batch(tickets) -> {ticket_id: external_id}``;
+    tickets missing from the returned mapping are retried later.
+    """
+    if not TICKET_BACKEND:
+        return SimulatedTicketBackend()
+    module_name, _, attr = TICKET_BACKEND.partition(":")
+    return getattr(importlib.import_module(module_name), attr)()
+
+
+class TicketSubmitter:
+    """Background task that drains queued tickets to the backend in batches.
+
+    Tickets are durable before they are queued. When the task starts (at worker
+    start-up or on the first ticket tool call) it first drains whatever earlier runs
+    left queued. Failed batches are retried with exponential backoff until each ticket
+    is submitted or has used TICKET_MAX_SUBMIT_ATTEMPTS attempts and is parked as 'failed'.
+    """
+
+    def __init__(self, store: TicketStore, backend=None,
+                 batch_size: int = TICKET_BATCH_SIZE, interval: float = TICKET_BATCH_INTERVAL_SECONDS,
+                 max_backoff: float = TICKET_RETRY_MAX_BACKOFF_SECONDS):
+        self.store = store
+        self.backend = backend or load_backend()
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_backoff = max_backoff
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """Starts the submitter on the running loop if it is not running; it drains straight away."""
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._wakeup.set()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def notify(self) -> None:
+        """Starts the submitter if needed and wakes it up."""
+        self.start()
+        self._wakeup.set()
+
+    async def flush(self) -> int:
+        """Submits queued tickets until none are left (or a batch fails); returns how many were sent."""
+        sent = 0
+        while True:
+            batch = await asyncio.to_thread(self.store.claim_queued, self.batch_size)
+            if not batch:
+                return sent
+            try:
+                results = await self.backend.submit_batch(batch)
+            except Exception as e:
+                await asyncio.to_thread(self.store.mark_failed, [t["ticket_id"] for t in batch], str(e))
+                return sent
+            if results:
+                await asyncio.to_thread(self.store.mark_submitted, results)
+            missing = [t["ticket_id"] for t in batch if t["ticket_id"] not in results]
+            if missing:
+                await asyncio.to_thread(self.store.mark_failed, missing, "Not accepted by the ticketing backend.")
+                return sent + len(results)
+            sent += len(results)
+
+    async def _run(self) -> None:
+        retries = 0
+        while True:
+            if retries:
+                # Tickets are still queued after a failure: retry after the backoff,
+                # or sooner if a new ticket arrives.
+                backoff = min(max(self.interval, 1.0) * 2 ** min(retries, 16), self.max_backoff)
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), backoff)
+                except asyncio.TimeoutError:
+                    pass
+            else:
+                await self._wakeup.wait()
+            # Give concurrent escalations a moment to join the same batch.
+            await asyncio.sleep(self.interval)
+            self._wakeup.clear()
+            try:
+                await self.flush()
+                pending = await asyncio.to_thread(self.store.has_queued)
+            except Exception as e:
+                print(f"ðŸ”´ Error: Ticket submission failed. {str(e)}")
+                pending = True
+            retries = retries + 1 if pending else 0
+
+
+# Shared instances, created on first use.
+_store: Optional[TicketStore] = None
+_submitter: Optional[TicketSubmitter] = None
+_init_lock = threading.Lock()
+
+
+def get_ticket_store() -> TicketStore:
+    global _store
+    with _init_lock:
+        if _store is None:
+            _store = TicketStore()
+    return _store
+
+
+def get_ticket_submitter() -> TicketSubmitter:
+    global _submitter
+    store = get_ticket_store()
+    with _init_lock:
+        if _submitter is None:
+            _submitter = TicketSubmitter(store)
+    return _submitter
@@ -0,0 +1,590 @@
+import contextlib
+import contextvars
+import json
+import random
+import secrets
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .config import METRICS_PORT, SERVICE_NAME, TRACE_EXPORT_PATH, TRACE_SAMPLE_RATE
+
+# --- Tracing and metrics for agent hops, model calls and tool calls ---
+# ADK before/after callbacks open and close spans per invocation (one user turn):
+# one span per agent hop as control is transferred, with model and tool spans under
+# the hop that made them. Metrics are always recorded; span details are kept and
+# exported only for the sampled share of invocations.
+
+# Traces whose root span never finished (e.g. a cancelled turn) are dropped after this long.
+TRACE_MAX_AGE_SECONDS = 600
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+_STATUS_OK = 1
+_STATUS_ERROR = 2
+
+
+# --- Metrics ---
+
+METRIC_HELP = {
+    "airtel_agent_runs_total": ("counter", "Agent runs (one per agent hop)."),
+    "airtel_agent_duration_seconds": ("histogram", "Time an agent held control of a turn, including its model and tool calls."),
+    "airtel_llm_calls_total": ("counter", "Model calls by agent and outcome."),
+    "airtel_llm_duration_seconds": ("histogram", "Model call latency."),
+    "airtel_llm_tokens_total": ("counter", "Tokens reported by the model, by direction."),
+    "airtel_tool_calls_total": ("counter", "Tool calls by tool and outcome."),
+    "airtel_tool_duration_seconds": ("histogram", "Tool call latency."),
+    "airtel_sql_rows_total": ("counter", "Rows returned by SQL tools."),
+    "airtel_http_requests_total": ("counter", "Outbound HTTP attempts by host, method and status."),
+    "airtel_traces_exported_total": ("counter", "Sampled traces written to the trace exporter."),
+    "airtel_context_compacted_chars_total": ("counter", "Characters removed from model requests by context compaction, by kind."),
+    "airtel_triage_orders_total": ("counter", "Orders handled by bulk triage, by root cause and outcome."),
+    "airtel_answer_cache_total": ("counter", "Answer cache lookups by scenario and outcome (hit, miss, stale)."),
+    "airtel_watcher_cycles_total": ("counter", "Stuck-order watcher cycles by mode (rebuild, incremental)."),
+    "airtel_watcher_cycle_seconds": ("histogram", "Stuck-order watcher cycle duration."),
+    "airtel_watcher_changed_rows_total": ("counter", "Changed task rows applied by the stuck-order watcher."),
+    "airtel_admission_total": ("counter", "Agent runs by admission outcome (admitted, queued, queue_full, queue_timeout, draining)."),
+    "airtel_admission_wait_seconds": ("histogram", "Time queued agent runs waited for admission."),
+}
+
+
+class Metrics:
+    """A small thread-safe registry of labelled counters and histograms."""
+
+    def __init__(self, buckets: Tuple[float, ...] = DURATION_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[Tuple[Tuple[str, str], ...], float]] = {}
+        # labels -> [count per bucket..., +Inf count, sum]
+        self._histograms: Dict[str, Dict[Tuple[Tuple[str, str], ...], List[float]]] = {}
+
+    def inc(self, name: str, labels: Dict[str, Any], value: float = 1.0) -> None:
+        key = tuple(sorted((k, str(v)) for k, v in labels.items()))
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+
+    def observe(self, name: str, labels: Dict[str, Any], value: float) -> None:
+        key = tuple(sorted((k, str(v)) for k, v in labels.items()))
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            counts = series.get(key)
+            if counts is None:
+                counts = series[key] = [0.0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            counts[-2] += 1
+            counts[-1] += value
+
+    def render(self) -> str:
+        """Renders all series in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            counters = {name: dict(series) for name, series in self._counters.items()}
+            histograms = {name: {k: list(v) for k, v in series.items()} for name, series in self._histograms.items()}
+        for name, series in sorted(counters.items()):
+            _header(lines, name)
+            for key, value in sorted(series.items()):
+                lines.append(f"{name}{_labels(key)} {_number(value)}")
+        for name, series in sorted(histograms.items()):
+            _header(lines, name)
+            for key, counts in sorted(series.items()):
+                for bound, count in zip(self.buckets, counts):
+                    lines.append(f"{name}_bucket{_labels(key, ('le', _number(bound)))} {_number(count)}")
+                lines.append(f"{name}_bucket{_labels(key, ('le', '+Inf'))} {_number(counts[-2])}")
+                lines.append(f"{name}_sum{_labels(key)} {counts[-1]}")
+                lines.append(f"{name}_count{_labels(key)} {_number(counts[-2])}")
+        return "\n".join(lines) + "\n"
+
+
+def _header(lines: List[str], name: str) -> None:
+    kind, help_text = METRIC_HELP.get(name, ("untyped", name))
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} {kind}")
+
+
+def _labels(key, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else str(value)
+
+
+def _gauge_lines() -> List[str]:
+    """Point-in-time gauges from the connection pool, caches, admission control and HTTP circuit breakers."""
+    lines = []
+
+    def gauges(prefix: str, help_text: str, values: Dict[str, Any]) -> None:
+        for key, value in sorted(values.items()):
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                continue
+            name = f"{prefix}_{key}"
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value}")
+
+    try:
+        from .db_pool import pool_stats
+
+        gauges("airtel_db_pool", "Connection pool counter (see db_pool.ConnectionPool.stats).", pool_stats())
+    except Exception:
+        pass
+    try:
+        from .result_cache import result_cache
+
+        gauges("airtel_result_cache", "Result cache counter (see result_cache.ResultCache.stats).", result_cache.stats())
+    except Exception:
+        pass
+    try:
+        from .answer_cache import answer_cache
+
+        gauges("airtel_answer_cache", "Answer cache counter (see answer_cache.AnswerCache.stats).", answer_cache.stats())
+    except Exception:
+        pass
+    try:
+        from .admission import admission
+
+        gauges("airtel_admission", "Admission control counter (see admission.AdmissionController.stats).", admission.stats())
+    except Exception:
+        pass
+    try:
+        from .http_client import breaker_states
+
+        states = breaker_states()
+        if states:
+            lines.append("# HELP airtel_http_breaker_open 1 if the host's circuit breaker is not closed.")
+            lines.append("# TYPE airtel_http_breaker_open gauge")
+            for host, state in sorted(states.items()):
+                lines.append(f'airtel_http_breaker_open{{host="{_escape(host)}"}} {0 if state["state"] == "closed" else 1}')
+    except Exception:
+        pass
+    return lines
+
+
+def render_metrics() -> str:
+    return metrics.render() + "\n".join(_gauge_lines()) + "\n"
+
+
+# --- Spans ---
+
+
+class Span:
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start_ns", "end_ns", "attributes", "error", "sampled")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], sampled: bool):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes: Dict[str, Any] = {}
+        self.error: Optional[str] = None
+        self.sampled = sampled
+
+    def set(self, key: str, value: Any) -> None:
+        """Sets an attribute; a no-op on unsampled spans so they stay cheap."""
+        if self.sampled and value is not None:
+            self.attributes[key] = value
+
+    def finish(self, error: Optional[str] = None) -> float:
+        """Ends the span and returns its duration in seconds."""
+        self.end_ns = time.time_ns()
+        if error:
+            self.error = error
+        return (self.end_ns - self.start_ns) / 1e9
+
+    def to_otlp(self) -> Dict[str, Any]:
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 1,  # SPAN_KIND_INTERNAL
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or self.start_ns),
+            "attributes": [_otlp_attribute(k, v) for k, v in self.attributes.items()],
+            "status": {"code": _STATUS_ERROR, "message": self.error} if self.error else {"code": _STATUS_OK},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+def _otlp_attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        typed = {"boolValue": value}
+    elif isinstance(value, int):
+        typed = {"intValue": str(value)}
+    elif isinstance(value, float):
+        typed = {"doubleValue": value}
+    else:
+        typed = {"stringValue": str(value)}
+    return {"key": key, "value": typed}
+
+
+class OtlpJsonFileExporter:
+    """Appends finished traces to a file as OTLP/JSON, one export request per line.
+
+    The format matches the OpenTelemetry Collector's file exporter, so the file can be
+    replayed into any OTLP backend.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans: List[Span]) -> None:
+        request = {
+            "resourceSpans": [{
+                "resource": {"attributes": [_otlp_attribute("service.name", SERVICE_NAME)]},
+                "scopeSpans": [{"scope": {"name": __name__}, "spans": [s.to_otlp() for s in spans]}],
+            }]
+        }
+        line = json.dumps(request, default=str, separators=(",", ":"))
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+
+class _Trace:
+    __slots__ = ("trace_id", "sampled", "started", "root", "hop", "open", "finished")
+
+    def __init__(self, sampled: bool, invocation_id: str):
+        self.trace_id = secrets.token_hex(16)
+        self.sampled = sampled
+        self.started = time.monotonic()
+        self.root = Span("invocation", self.trace_id, None, sampled)
+        self.root.set("adk.invocation_id", invocation_id)
+        # The agent currently holding control of the turn.
+        self.hop: Optional[Span] = None
+        # Open model/tool spans, keyed e.g. by ("tool", function_call_id).
+        self.open: Dict[Tuple[str, str], Span] = {}
+        self.finished: List[Span] = []
+
+
+class Tracer:
+    """Tracks the spans of each in-flight invocation and exports sampled traces.
+
+    An invocation is one user turn. Each agent that holds control during the turn gets
+    a hop span under the invocation's root span; a hop ends when control is transferred
+    to another agent or when the agent finishes. Model and tool spans are children of
+    the hop that made them.
+    """
+
+    def __init__(self, sample_rate: float = TRACE_SAMPLE_RATE, exporter: Optional[OtlpJsonFileExporter] = None):
+        self.sample_rate = sample_rate
+        self.exporter = exporter
+        self._lock = threading.Lock()
+        self._traces: Dict[str, _Trace] = {}
+
+    def _purge_stale_locked(self) -> None:
+        cutoff = time.monotonic() - TRACE_MAX_AGE_SECONDS
+        for invocation_id in [i for i, t in self._traces.items() if t.started < cutoff]:
+            del self._traces[invocation_id]
+
+    def _finish_locked(self, trace: _Trace, span: Span, error: Optional[str] = None) -> float:
+        duration = span.finish(error)
+        if trace.sampled:
+            trace.finished.append(span)
+        return duration
+
+    def start_agent(self, invocation_id: str, agent_name: str) -> Tuple[Span, Optional[Tuple[str, float]]]:
+        """Opens a hop span for the agent taking control.
+
+        Returns:
+            (span, handed_off) where ``handed_off`` is the (agent name, duration) of the
+            hop that just transferred control, if any.
+        """
+        handed_off = None
+        with self._lock:
+            trace = self._traces.get(invocation_id)
+            if trace is None:
+                self._purge_stale_locked()
+                trace = self._traces[invocation_id] = _Trace(random.random() < self.sample_rate, invocation_id)
+            if trace.hop is not None:
+                trace.hop.set("agent.transferred_to", agent_name)
+                handed_off = (trace.hop.attributes.get("agent.name") or trace.hop.name[len("agent "):],
+                              self._finish_locked(trace, trace.hop))
+            span = trace.hop = Span(f"agent {agent_name}", trace.trace_id, trace.root.span_id, trace.sampled)
+        span.set("agent.name", agent_name)
+        return span, handed_off
+
+    def end_agent(self, invocation_id: str) -> Optional[float]:
+        """Closes the final hop of the invocation and exports the trace if it was sampled.
+
+        Returns:
+            The duration of the closed hop, or None if none was open.
+        """
+        with self._lock:
+            trace = self._traces.pop(invocation_id, None)
+            if trace is None:
+                return None
+            duration = self._finish_locked(trace, trace.hop) if trace.hop is not None else None
+            trace.hop = None
+            self._finish_locked(trace, trace.root)
+        if trace.sampled and self.exporter is not None:
+            try:
+                self.exporter.export(trace.finished)
+                metrics.inc("airtel_traces_exported_total", {})
+            except OSError as e:
+                print(f"Warning: could not export trace to '{self.exporter.path}': {e}")
+        return duration
+
+    def root_span(self, invocation_id: str) -> Optional[Span]:
+        with self._lock:
+            trace = self._traces.get(invocation_id)
+            return trace.root if trace is not None else None
+
+    def start(self, invocation_id: str, key: Tuple[str, str], name: str) -> Optional[Span]:
+        """Opens a model, tool or block span under the invocation's current hop."""
+        with self._lock:
+            trace = self._traces.get(invocation_id)
+            if trace is None:
+                return None
+            parent = (trace.hop or trace.root).span_id
+            span = trace.open[key] = Span(name, trace.trace_id, parent, trace.sampled)
+        return span
+
+    def end(self, invocation_id: str, key: Tuple[str, str], error: Optional[str] = None) -> Tuple[Optional[Span], Optional[float]]:
+        with self._lock:
+            trace = self._traces.get(invocation_id)
+            span = trace.open.pop(key, None) if trace is not None else None
+            if span is None:
+                return None, None
+            duration = self._finish_locked(trace, span, error)
+        return span, duration
+
+    def active_traces(self) -> int:
+        with self._lock:
+            return len(self._traces)
+
+
+metrics = Metrics()
+tracer = Tracer(exporter=OtlpJsonFileExporter(TRACE_EXPORT_PATH) if TRACE_EXPORT_PATH else None)
+
+# The tool span of the tool call running in the current task, so helpers called by
+# the tool (e.g. the HTTP client) can annotate it.
+_current_tool_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("current_tool_span", default=None)
+
+
+@contextlib.contextmanager
+def span(invocation_id: str, name: str, attributes: Optional[Dict[str, Any]] = None) -> Iterator[Optional[Span]]:
+    """Times a block as a child of the invocation's current agent span, e.g. a diagnostic
+    run from a callback. Yields None if the invocation is not being traced."""
+    key = ("block", secrets.token_hex(4))
+    current = tracer.start(invocation_id, key, name)
+    if current is not None:
+        for k, v in (attributes or {}).items():
+            current.set(k, v)
+    try:
+        yield current
+    except BaseException as e:
+        tracer.end(invocation_id, key, error=f"{type(e).__name__}: {e}")
+        raise
+    tracer.end(invocation_id, key)
+
+
+def record_http_response(host: str, method: str, status: Any) -> None:
+    """Counts one outbound HTTP attempt and annotates the running tool's span.
+
+    ``status`` is the response status code, or an error name for failed attempts.
+    """
+    metrics.inc("airtel_http_requests_total", {"host": host, "method": method, "status": status})
+    current = _current_tool_span.get()
+    if current is not None:
+        current.set("http.host", host)
+        current.set("http.method", method)
+        current.set("http.status_code" if isinstance(status, int) else "http.error", status)
+        if current.sampled:
+            current.attributes["http.attempts"] = current.attributes.get("http.attempts", 0) + 1
+
+
+# --- ADK callbacks ---
+
+
+def _record_hop(agent_name: str, duration: float) -> None:
+    labels = {"agent": agent_name}
+    metrics.inc("airtel_agent_runs_total", labels)
+    metrics.observe("airtel_agent_duration_seconds", labels, duration)
+
+
+def trace_before_agent(callback_context) -> None:
+    start_metrics_server()
+    span, handed_off = tracer.start_agent(callback_context.invocation_id, callback_context.agent_name)
+    if handed_off is not None:
+        _record_hop(*handed_off)
+    root = tracer.root_span(callback_context.invocation_id)
+    if root is not None and root.sampled and "session.id" not in root.attributes:
+        root.set("session.id", callback_context.session.id)
+        root.set("user.id", callback_context.user_id)
+    return None
+
+
+def trace_after_agent(callback_context) -> None:
+    duration = tracer.end_agent(callback_context.invocation_id)
+    if duration is not None:
+        _record_hop(callback_context.agent_name, duration)
+    return None
+
+
+def trace_before_model(callback_context, llm_request) -> None:
+    span = tracer.start(callback_context.invocation_id, ("model", callback_context.agent_name), "llm call")
+    if span is not None:
+        span.set("agent.name", callback_context.agent_name)
+        span.set("llm.model", llm_request.model)
+        span.set("llm.tools", len(llm_request.tools_dict))
+        span.set("llm.contents", len(llm_request.contents))
+    return None
+
+
+def trace_after_model(callback_context, llm_response) -> None:
+    if llm_response.partial:
+        return None
+    error = llm_response.error_message or llm_response.error_code
+    span, duration = tracer.end(
+        callback_context.invocation_id, ("model", callback_context.agent_name), error=str(error) if error else None
+    )
+    labels = {"agent": callback_context.agent_name}
+    metrics.inc("airtel_llm_calls_total", {**labels, "outcome": "error" if error else "ok"})
+    if duration is not None:
+        metrics.observe("airtel_llm_duration_seconds", labels, duration)
+    usage = llm_response.usage_metadata
+    if usage is not None:
+        if usage.prompt_token_count:
+            metrics.inc("airtel_llm_tokens_total", {**labels, "direction": "input"}, usage.prompt_token_count)
+        if usage.candidates_token_count:
+            metrics.inc("airtel_llm_tokens_total", {**labels, "direction": "output"}, usage.candidates_token_count)
+        if span is not None:
+            span.set("llm.input_tokens", usage.prompt_token_count)
+            span.set("llm.output_tokens", usage.candidates_token_count)
+            span.set("llm.cached_tokens", usage.cached_content_token_count)
+    return None
+
+
+def trace_on_model_error(callback_context, llm_request, error) -> None:
+    tracer.end(callback_context.invocation_id, ("model", callback_context.agent_name), error=f"{type(error).__name__}: {error}")
+    metrics.inc("airtel_llm_calls_total", {"agent": callback_context.agent_name, "outcome": "error"})
+    return None
+
+
+def trace_before_tool(tool, args, tool_context) -> None:
+    span = tracer.start(tool_context.invocation_id, ("tool", tool_context.function_call_id or tool.name), f"tool {tool.name}")
+    if span is not None:
+        span.set("tool.name", tool.name)
+        span.set("agent.name", tool_context.agent_name)
+        span.set("tool.args", json.dumps(args, default=str)[:1000])
+    _current_tool_span.set(span)
+    return None
+
+
+def trace_after_tool(tool, args, tool_context, tool_response) -> None:
+    _current_tool_span.set(None)
+    error = tool_response.get("error") if isinstance(tool_response, dict) else None
+    span, duration = tracer.end(tool_context.invocation_id, ("tool", tool_context.function_call_id or tool.name), error=error)
+    labels = {"tool": tool.name}
+    metrics.inc("airtel_tool_calls_total", {**labels, "outcome": "error" if error else "ok"})
+    if duration is not None:
+        metrics.observe("airtel_tool_duration_seconds", labels, duration)
+    row_count = tool_response.get("row_count") if isinstance(tool_response, dict) else None
+    if isinstance(row_count, int):
+        metrics.inc("airtel_sql_rows_total", labels, row_count)
+        if span is not None:
+            span.set("sql.row_count", row_count)
+            span.set("sql.truncated", tool_response.get("truncated"))
+    return None
+
+
+def trace_on_tool_error(tool, args, tool_context, error) -> None:
+    _current_tool_span.set(None)
+    tracer.end(tool_context.invocation_id, ("tool", tool_context.function_call_id or tool.name), error=f"{type(error).__name__}: {error}")
+    metrics.inc("airtel_tool_calls_total", {"tool": tool.name, "outcome": "error"})
+    return None
+
+
+def callback_list(callbacks) -> list:
+    """An agent's callback setting (None, one callback or a list) as a new list."""
+    if callbacks is None:
+        return []
+    return list(callbacks) if isinstance(callbacks, list) else [callbacks]
+
+
+def instrument_agent_tree(agent) -> None:
+    """Adds the tracing callbacks to an agent and all of its sub-agents.
+
+    Tracing runs before the agent's own callbacks, except before the model call, where
+    it runs last so that work done by other before-model callbacks (such as the fast
+    path's diagnostic query) is not counted as model latency.
+    """
+    agents = [agent]
+    while agents:
+        current = agents.pop()
+        agents.extend(current.sub_agents)
+        if trace_before_agent in callback_list(current.before_agent_callback):
+            continue
+        current.before_agent_callback = [trace_before_agent] + callback_list(current.before_agent_callback)
+        current.after_agent_callback = [trace_after_agent] + callback_list(current.after_agent_callback)
+        if hasattr(current, "before_model_callback"):
+            current.before_model_callback = callback_list(current.before_model_callback) + [trace_before_model]
+            current.after_model_callback = [trace_after_model] + callback_list(current.after_model_callback)
+            current.on_model_error_callback = [trace_on_model_error] + callback_list(current.on_model_error_callback)
+            current.before_tool_callback = [trace_before_tool] + callback_list(current.before_tool_callback)
+            current.after_tool_callback = [trace_after_tool] + callback_list(current.after_tool_callback)
+            current.on_tool_error_callback = [trace_on_tool_error] + callback_list(current.on_tool_error_callback)
+
+
+# --- /metrics endpoint ---
+
+_metrics_server: Optional[ThreadingHTTPServer] = None
+_metrics_server_attempted = False
+_metrics_server_lock = threading.Lock()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render_metrics().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port: Optional[int] = None) -> Optional[ThreadingHTTPServer]:
+    """Serves /metrics on a background thread (once per process).
+
+    The port comes from ``port`` or METRICS_PORT; without either nothing is started.
+    """
+    global _metrics_server, _metrics_server_attempted
+    if _metrics_server_attempted:
+        return _metrics_server
+    port = port if port is not None else METRICS_PORT
+    if port is None:
+        return None
+    with _metrics_server_lock:
+        if not _metrics_server_attempted:
+            _metrics_server_attempted = True
+            try:
+                server = ThreadingHTTPServer(("0.0.0.0", port), _MetricsHandler)
+            except OSError as e:
+                print(f"Warning: could not start the metrics endpoint on port {port}: {e}")
+                return None
+            server.daemon_threads = True
+            threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+            _metrics_server = server
+            print(f"Metrics available at http://0.0.0.0:{port}/metrics")
+    return _metrics_server
@@ -0,0 +1,377 @@
+# Incremental stuck-order watcher.
+#
+# Keeps two small tables next to `task` up to date, so agents and dashboards can read
+# them instead of scanning the base table:
+#
+#   task_summary      order counts by status x process path x age bucket
+#   task_stuck_flags  orders that have been in a stuck status for longer than their
+#                     SOP's age threshold
+#
+# A cycle reads only the rows whose modified_date is at or after the previous cycle's
+# watermark (a trigger created by setup_database.py stamps it on every insert and
+# update), plus the orders that crossed an age threshold since the
+# previous cycle (a range scan on the (status, created_date) index). Each order's
+# last-seen status, path and created day are kept in task_watch_state, so a changed row
+# moves its count from the old cell of task_watch_counts to the new one; task_summary is
+# then rebuilt from task_watch_counts, which has one row per status/path/day and does
+# not grow with the number of orders. Re-reading a row does not change any count, so
+# the scan window overlaps the previous one by WATCHER_SAFETY_LAG_SECONDS.
+#
+# The first cycle (or --rebuild) builds everything from a full scan. Deleted tasks are
+# not noticed by incremental cycles; run with --rebuild after deleting rows.
+#
+#   python order_watcher.py --interval 60
+#   python order_watcher.py --once
+
+import argparse
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+from main_agent.config import WATCHER_BATCH_SIZE, WATCHER_INTERVAL_SECONDS, WATCHER_SAFETY_LAG_SECONDS
+from main_agent.db_pool import close_pool, get_backend_name, get_pool
+from main_agent.telemetry import metrics, start_metrics_server
+
+
+# --- Thresholds ---
+# Hours an order may stay in a status before it is flagged, and the SOP that covers it.
+STUCK_THRESHOLDS = {
+    "Activation In Progress": (24, "SOP 1: DTH activation stuck"),
+    "Feasibility Check": (48, "SOP 2: broadband feasibility address mismatch"),
+    "Pending with Billing System": (72, "SOP 3: postpaid bill not generated"),
+    "Installation Engineer Assignment": (24, "OAOE engineer assignment"),
+    "Pending": (48, "Incorrect sub-order flag"),
+    "Reached Onsite": (12, "Unable to mark Reached Onsite"),
+}
+
+# (lower bound in days, label) of each age bucket, youngest first.
+AGE_BUCKETS = ((0, "<1d"), (1, "1-3d"), (3, "3-7d"), (7, "7-30d"), (30, ">=30d"))
+
+# Serialises watchers on one PostgreSQL database; two overlapping cycles would count
+# the same change twice.
+ADVISORY_LOCK_ID = 0x7461736B
+
+# --- Schema ---
+
+DIALECTS = {
+    True: {
+        "text": "VARCHAR(100)", "day": "DATE", "ts": "TIMESTAMP WITH TIME ZONE", "p": "%s",
+        "created_day": "CAST(COALESCE(created_date, modified_date, now()) AT TIME ZONE 'UTC' AS DATE)",
+        "age_days": "(CAST(%s AS DATE) - created_day)",
+        "age_hours": "EXTRACT(EPOCH FROM (CAST(%s AS TIMESTAMP WITH TIME ZONE) - created_date)) / 3600",
+    },
+    False: {
+        "text": "TEXT", "day": "TEXT", "ts": "TIMESTAMP", "p": "?",
+        "created_day": "date(COALESCE(created_date, modified_date, CURRENT_TIMESTAMP))",
+        "age_days": "CAST(julianday(?) - julianday(created_day) AS INTEGER)",
+        "age_hours": "(julianday(?) - julianday(created_date)) * 24",
+    },
+}
+
+WATCH_SCHEMA_COMMANDS = [
+    # Last-seen state of every order, to know which count a changed row leaves.
+    """
+    CREATE TABLE IF NOT EXISTS task_watch_state (
+        order_id {text} PRIMARY KEY,
+        status {text} NOT NULL,
+        organisation_process_path {text} NOT NULL,
+        created_day {day} NOT NULL
+    );
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS task_watch_counts (
+        status {text} NOT NULL,
+        organisation_process_path {text} NOT NULL,
+        created_day {day} NOT NULL,
+        order_count INTEGER NOT NULL,
+        PRIMARY KEY (status, organisation_process_path, created_day)
+    );
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS task_summary (
+        status {text} NOT NULL,
+        organisation_process_path {text} NOT NULL,
+        age_bucket {text} NOT NULL,
+        min_age_days INTEGER NOT NULL,
+        order_count INTEGER NOT NULL,
+        oldest_created_day {day},
+        refreshed_at {ts},
+        PRIMARY KEY (status, organisation_process_path, age_bucket)
+    );
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS task_stuck_flags (
+        order_id {text} PRIMARY KEY,
+        corelation_id {text},
+        status {text},
+        organisation_process_path {text},
+        created_date {ts},
+        threshold_hours INTEGER,
+        sop {text},
+        flagged_at {ts}
+    );
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_task_stuck_flags_status ON task_stuck_flags (status, created_date);",
+    "CREATE TABLE IF NOT EXISTS task_watch_meta (name {text} PRIMARY KEY, value {text});",
+    # Incremental scans read rows by modification time.
+    "CREATE INDEX IF NOT EXISTS idx_task_modified_date ON task (modified_date);",
+]
+
+_FLAG_COLUMNS = "order_id, corelation_id, status, organisation_process_path, created_date, threshold_hours, sop, flagged_at"
+_FLAG_UPSERT = (
+    " ON CONFLICT (order_id) DO UPDATE SET corelation_id = excluded.corelation_id, status = excluded.status, "
+    "organisation_process_path = excluded.organisation_process_path, created_date = excluded.created_date, "
+    "threshold_hours = excluded.threshold_hours, sop = excluded.sop"
+)
+
+
+class OrderWatcher:
+    """Runs watcher cycles on pooled connections; one instance per process."""
+
+    def __init__(self, batch_size: int = WATCHER_BATCH_SIZE, safety_lag: float = WATCHER_SAFETY_LAG_SECONDS):
+        self.batch_size = batch_size
+        self.safety_lag = timedelta(seconds=safety_lag)
+        self.is_postgres = get_backend_name() != "local"
+        self.d = DIALECTS[self.is_postgres]
+
+    # --- Helpers ---
+
+    def _sql(self, sql: str) -> str:
+        return sql.replace("{p}", self.d["p"])
+
+    def _ts(self, value: datetime):
+        """A timestamp parameter: aware datetimes for pg8000, CURRENT_TIMESTAMP-style text for SQLite."""
+        if self.is_postgres:
+            return value
+        return value.astimezone(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+    def _now(self, cur) -> datetime:
+        """The database's clock, so watermarks agree with the timestamps it writes."""
+        cur.execute("SELECT CURRENT_TIMESTAMP")
+        (value,) = cur.fetchone()
+        if isinstance(value, str):
+            value = datetime.fromisoformat(value).replace(tzinfo=timezone.utc)
+        return value
+
+    def _meta(self, cur, name: str):
+        cur.execute(self._sql("SELECT value FROM task_watch_meta WHERE name = {p}"), (name,))
+        row = cur.fetchone()
+        return datetime.fromisoformat(row[0]) if row and row[0] else None
+
+    def _set_meta(self, cur, values) -> None:
+        cur.executemany(
+            self._sql("INSERT INTO task_watch_meta (name, value) VALUES ({p}, {p}) "
+                      "ON CONFLICT (name) DO UPDATE SET value = excluded.value"),
+            [(name, value.isoformat() if value else None) for name, value in values.items()],
+        )
+
+    def ensure_schema(self) -> None:
+        with get_pool().connection() as conn:
+            cur = conn.cursor()
+            for command in WATCH_SCHEMA_COMMANDS:
+                cur.execute(command.format(**self.d))
+            conn.commit()
+
+    def reset(self) -> None:
+        """Forgets the watermark, so the next cycle rebuilds everything from a full scan."""
+        with get_pool().connection() as conn:
+            cur = conn.cursor()
+            cur.execute("DELETE FROM task_watch_meta")
+            conn.commit()
+
+    # --- Cycle ---
+
+    def run_cycle(self) -> dict:
+        """Brings the summary and flags up to date in one transaction; returns cycle stats."""
+        started = time.perf_counter()
+        with get_pool().connection() as conn:
+            cur = conn.cursor()
+            try:
+                if self.is_postgres:
+                    cur.execute("SELECT pg_try_advisory_xact_lock(%s)", (ADVISORY_LOCK_ID,))
+                    if not cur.fetchone()[0]:
+                        conn.rollback()
+                        return {"skipped": "another watcher holds the lock"}
+                now = self._now(cur)
+                watermark = self._meta(cur, "watermark")
+                last_cycle_at = self._meta(cur, "last_cycle_at")
+                if watermark is None:
+                    stats = {"mode": "rebuild", **self._rebuild(cur, now)}
+                else:
+                    stats = {"mode": "incremental", "changed_rows": self._apply_changes(conn, cur, watermark, now)}
+                    stats["crossed_threshold"] = self._flag_crossings(cur, last_cycle_at, now)
+                stats["summary_rows"] = self._refresh_summary(cur, now)
+                self._set_meta(cur, {"watermark": now - self.safety_lag, "last_cycle_at": now})
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+        stats["seconds"] = round(time.perf_counter() - started, 3)
+        metrics.inc("airtel_watcher_cycles_total", {"mode": stats["mode"]})
+        metrics.observe("airtel_watcher_cycle_seconds", {"mode": stats["mode"]}, stats["seconds"])
+        metrics.inc("airtel_watcher_changed_rows_total", {}, stats.get("changed_rows", 0))
+        return stats
+
+    def _rebuild(self, cur, now: datetime) -> dict:
+        for table in ("task_watch_state", "task_watch_counts", "task_stuck_flags"):
+            cur.execute(f"DELETE FROM {table}")
+        cur.execute(
+            "INSERT INTO task_watch_state (order_id, status, organisation_process_path, created_day) "
+            f"SELECT order_id, COALESCE(status, ''), COALESCE(organisation_process_path, ''), {self.d['created_day']} "
+            "FROM task"
+        )
+        cur.execute(
+            "INSERT INTO task_watch_counts (status, organisation_process_path, created_day, order_count) "
+            "SELECT status, organisation_process_path, created_day, COUNT(*) FROM task_watch_state GROUP BY 1, 2, 3"
+        )
+        cur.execute("SELECT COUNT(*) FROM task_watch_state")
+        return {"changed_rows": cur.fetchone()[0], "crossed_threshold": self._flag_crossings(cur, None, now)}
+
+    def _apply_changes(self, conn, cur, watermark: datetime, now: datetime) -> int:
+        """Moves the counts and flags of every row changed since the watermark."""
+        cur.execute(
+            self._sql(
+                "SELECT order_id, corelation_id, COALESCE(status, ''), COALESCE(organisation_process_path, ''), "
+                f"created_date, {self.d['created_day']}, {self.d['age_hours']} "
+                "FROM task WHERE modified_date >= {p}"
+            ),
+            (self._ts(now), self._ts(watermark)),
+        )
+        changed = 0
+        # A second cursor writes while the first is still being read in batches.
+        writer = conn.cursor()
+        while True:
+            rows = cur.fetchmany(self.batch_size)
+            if not rows:
+                return changed
+            changed += len(rows)
+            self._apply_batch(writer, rows, now)
+
+    def _apply_batch(self, cur, rows, now: datetime) -> None:
+        ids = [row[0] for row in rows]
+        cur.execute(
+            self._sql("SELECT status, organisation_process_path, created_day FROM task_watch_state "
+                      f"WHERE order_id IN ({', '.join(['{p}'] * len(ids))})"),
+            ids,
+        )
+        deltas = Counter(tuple(old) for old in cur.fetchall())
+        deltas = Counter({cell: -count for cell, count in deltas.items()})
+        for _, _, status, path, _, created_day, _ in rows:
+            deltas[(status, path, created_day)] += 1
+        moved = [(*cell, delta) for cell, delta in deltas.items() if delta]
+        if moved:
+            cur.executemany(
+                self._sql("INSERT INTO task_watch_counts (status, organisation_process_path, created_day, order_count) "
+                          "VALUES ({p}, {p}, {p}, {p}) ON CONFLICT (status, organisation_process_path, created_day) "
+                          "DO UPDATE SET order_count = task_watch_counts.order_count + excluded.order_count"),
+                moved,
+            )
+            cur.execute("DELETE FROM task_watch_counts WHERE order_count <= 0")
+        cur.executemany(
+            self._sql("INSERT INTO task_watch_state (order_id, status, organisation_process_path, created_day) "
+                      "VALUES ({p}, {p}, {p}, {p}) ON CONFLICT (order_id) DO UPDATE SET status = excluded.status, "
+                      "organisation_process_path = excluded.organisation_process_path, created_day = excluded.created_day"),
+            [(order_id, status, path, day) for order_id, _, status, path, _, day, _ in rows],
+        )
+
+        flagged, cleared = [], []
+        for order_id, corelation_id, status, path, created_date, _, age_hours in rows:
+            threshold = STUCK_THRESHOLDS.get(status)
+            if threshold and age_hours is not None and float(age_hours) >= threshold[0]:
+                flagged.append((order_id, corelation_id, status, path, created_date, *threshold, self._ts(now)))
+            else:
+                cleared.append(order_id)
+        if flagged:
+            cur.executemany(
+                self._sql(f"INSERT INTO task_stuck_flags ({_FLAG_COLUMNS}) VALUES ({', '.join(['{p}'] * 8)})"
+                          + _FLAG_UPSERT),
+                flagged,
+            )
+        if cleared:
+            cur.execute(
+                self._sql(f"DELETE FROM task_stuck_flags WHERE order_id IN ({', '.join(['{p}'] * len(cleared))})"),
+                cleared,
+            )
+
+    def _flag_crossings(self, cur, since, now: datetime) -> int:
+        """Flags orders whose age passed their status's threshold between ``since`` and ``now``.
+
+        Without ``since`` every order over its threshold is flagged (used by rebuilds).
+        """
+        crossed = 0
+        for status, (hours, sop) in STUCK_THRESHOLDS.items():
+            limit = timedelta(hours=hours)
+            where = "status = {p} AND created_date <= {p}"
+            params = [hours, sop, self._ts(now), status, self._ts(now - limit)]
+            if since is not None:
+                where += " AND created_date > {p}"
+                params.append(self._ts(since - limit))
+            cur.execute(
+                self._sql(
+                    f"INSERT INTO task_stuck_flags ({_FLAG_COLUMNS}) "
+                    "SELECT order_id, corelation_id, status, COALESCE(organisation_process_path, ''), created_date, "
+                    f"CAST({{p}} AS INTEGER), {{p}}, {{p}} FROM task WHERE {where}" + _FLAG_UPSERT
+                ),
+                params,
+            )
+            crossed += max(cur.rowcount, 0)
+        return crossed
+
+    def _refresh_summary(self, cur, now: datetime) -> int:
+        """Rebuilds task_summary from task_watch_counts (one row per status, path and day)."""
+        bucket = "CASE " + " ".join(
+            f"WHEN age_days >= {low} THEN '{label}'" for low, label in reversed(AGE_BUCKETS[1:])
+        ) + f" ELSE '{AGE_BUCKETS[0][1]}' END"
+        min_age = "CASE " + " ".join(
+            f"WHEN age_days >= {low} THEN {low}" for low, _ in reversed(AGE_BUCKETS[1:])
+        ) + f" ELSE {AGE_BUCKETS[0][0]} END"
+        today = now.astimezone(timezone.utc).date()
+        cur.execute("DELETE FROM task_summary")
+        cur.execute(
+            self._sql(
+                "INSERT INTO task_summary (status, organisation_process_path, age_bucket, min_age_days, order_count, "
+                "oldest_created_day, refreshed_at) "
+                f"SELECT status, organisation_process_path, {bucket}, {min_age}, SUM(order_count), MIN(created_day), {{p}} "
+                f"FROM (SELECT status, organisation_process_path, created_day, order_count, {self.d['age_days']} AS age_days "
+                "FROM task_watch_counts) AS counts GROUP BY 1, 2, 3, 4"
+            ),
+            (self._ts(now), today if self.is_postgres else today.isoformat()),
+        )
+        cur.execute("SELECT COUNT(*) FROM task_summary")
+        return cur.fetchone()[0]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Keep task_summary and task_stuck_flags up to date incrementally.")
+    parser.add_argument("--interval", type=float, default=WATCHER_INTERVAL_SECONDS, help="Seconds between cycles.")
+    parser.add_argument("--once", action="store_true", help="Run a single cycle and exit.")
+    parser.add_argument("--rebuild", action="store_true", help="Rebuild the summary and flags from a full scan first.")
+    parser.add_argument("--metrics-port", type=int, help="Serve /metrics on this port (default: METRICS_PORT).")
+    args = parser.parse_args()
+
+    watcher = OrderWatcher()
+    watcher.ensure_schema()
+    if args.rebuild:
+        watcher.reset()
+    if not args.once:
+        start_metrics_server(args.metrics_port)
+    try:
+        while True:
+            try:
+                stats = watcher.run_cycle()
+                print(f"âœ… Watcher cycle: {stats}")
+            except Exception as e:
+                print(f"ðŸ”´ Error: Watcher cycle failed. {str(e)}")
+                if args.once:
+                    raise
+            if args.once:
+                break
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        close_pool()
+
+
+if __name__ == "__main__":
+    main()
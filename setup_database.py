@@ -1,181 +1,522 @@
+# Connections come from the same bounded pool the agent tools use, so the
+# backend (Cloud SQL Connector, plain PostgreSQL or a local stand-in) is
+# selected the same way. See main_agent/db_pool.py.
+import argparse
+import csv
+import io
+import json
+import multiprocessing
 import os
-# Import the Cloud SQL Python Connector and a compatible driver (e.g., pg8000)
-from google.cloud.sql.connector import Connector, IPTypes
-import pg8000.dbapi 
-from psycopg2 import sql, OperationalError 
-from dotenv import load_dotenv
-cloud_sql_connector = None
-load_dotenv() 
-def get_db_connection():
-    """Establishes a connection to the PostgreSQL database via Cloud SQL Proxy."""
-    global cloud_sql_connector
-    instance_connection_name = os.environ.get("CLOUD_SQL_CONNECTION_NAME")
-    db_user = os.environ.get("DB_USER")
-    db_password = os.environ.get("DB_PASSWORD")
-    db_name = os.environ.get("DB_NAME")
-
-    if not all([instance_connection_name, db_user, db_password, db_name]):
-        print("ðŸ”´ Error: Missing one or more required environment variables for Cloud SQL.")
-        print("Please set CLOUD_SQL_CONNECTION_NAME, DB_USER, DB_PASSWORD, and DB_NAME.")
-        raise ValueError("Cloud SQL environment variables not set.")
+import random
+import time
+from datetime import datetime, timedelta, timezone
 
-    try:
-        if cloud_sql_connector is None:
-            ip_type = IPTypes.PUBLIC # Or IPTypes.PRIVATE
-            cloud_sql_connector = Connector(ip_type=ip_type)
-        conn = cloud_sql_connector.connect(
-            instance_connection_name,
-            "pg8000", 
-            user=db_user,
-            password=db_password,
-            db=db_name,
-        )
-        return conn
-    except Exception as e:
-        print(f"ðŸ”´ Error: Could not connect to the Cloud SQL database.")
-        print(f"Please ensure CLOUD_SQL_CONNECTION_NAME ('{instance_connection_name}') is correct,")
-        print(f"and that your application has permission (Cloud SQL Client role) to connect.")
-        raise e
-
-def setup_database():
+from main_agent.db_pool import BACKENDS, get_backend_name, get_pool, close_pool
+
+
+# --- Dummy Data ---
+# One row per SOP scenario. A timedelta `created_date` is relative to the time of setup;
+# columns that are left out take the table defaults.
+SCENARIO_TASKS = [
+    # SOP #1: DTH Activation Stuck
+    {"order_id": "DT100987654", "corelation_id": "cor_dth_stuck_123", "status": "Activation In Progress",
+     "task_type": "INSTALL", "organisation_process_path": "AIRTEL.DTH.INSTALL_AND_FAULT_REPAIR",
+     "created_date": timedelta(days=2)},
+
+    # SOP #2: Broadband Order Stuck in 'Feasibility Check'
+    {"order_id": "XBB10054321", "status": "Feasibility Check", "rsu": None,
+     "operating_boundary_path": "OB_PATH_VALID_123", "task_type": "INSTALL",
+     "organisation_process_path": "AIRTEL.TELEMEDIA.INSTALLATION___FAULT_REPAIR"},
+
+    # SOP #3: Postpaid Bill Not Generated
+    {"order_id": "SR_POSTPAID_98765", "corelation_id": "cor_postpaid_bill_789", "status": "Pending with Billing System",
+     "created_date": "2025-06-27 12:00:00+00", "task_type": "BILLING", "organisation_process_path": "AIRTEL.POSTPAID.BILLING"},
+
+    # SOP #5: Broadband Order Stuck due to Incorrect Sub-Order Flag
+    {"order_id": "XBB_STUCK_999", "corelation_id": "cor_stuck_sub_456", "status": "Pending", "one_airtel_suborder": True,
+     "task_type": "INSTALL", "organisation_process_path": "AIRTEL.TELEMEDIA.INSTALLATION___FAULT_REPAIR"},
+
+    # Older SOP Scenario: FFC RC Issue
+    {"order_id": "10045909651", "status": "Fault Repair", "task_type": "Fault Repair",
+     "organisation_process_path": "AIRTEL.TELEMEDIA.INSTALLATION___FAULT_REPAIR",
+     "common_details": {
+         "commonDetails": {
+             "telemedia": {
+                 "problemType": "Hardware Related",
+                 "problemSubType": "CPE accessories related issues",
+                 "productType": "FLVOICE",
+                 "ffc": "Jumpering Issues",
+                 "rc": "Jumpering issue rectified at MDF or Pillar or Sub Pillar"
+             }
+         }
+     }},
+
+    # Older SOP Scenario: Order stuck at Installation Engineer Assignment (OAOE Order)
+    {"order_id": "OAOE_ORDER_123", "corelation_id": "cor12345oaoe", "status": "Installation Engineer Assignment",
+     "one_airtel_suborder": True, "common_details": {"commonDetails": {"telemedia": {"bin": "OAOE"}}},
+     "task_type": "INSTALL", "organisation_process_path": "AIRTEL.TELEMEDIA.INSTALLATION___FAULT_REPAIR"},
+
+    # Older SOP Scenario: Unable to mark onsite
+    {"order_id": "ONSITE_ISSUE_101", "status": "Reached Onsite",
+     "organisation_process_path": "AIRTEL.TELEMEDIA.INSTALLATION___FAULT_REPAIR",
+     "pending_with_details": "9860434407", "created_date": "2025-02-15 11:00:00+00", "task_type": "Fault Repair"},
+]
+
+# --- Schema ---
+# Creation is idempotent so the script can be re-run to load more data; pass --reset
+# to drop the table first.
+
+SCHEMA_COMMANDS = [
+    # Create the main 'task' table.
+    """
+    CREATE TABLE IF NOT EXISTS task (
+        order_id VARCHAR(50) PRIMARY KEY,
+        corelation_id VARCHAR(50) UNIQUE,
+        status VARCHAR(50),
+        task_type VARCHAR(50),
+        organisation_process_path VARCHAR(100),
+        common_details JSONB,
+        one_airtel_suborder BOOLEAN,
+        pending_with_details VARCHAR(50),
+        rsu VARCHAR(50),
+        operating_boundary_path VARCHAR(100),
+        created_date TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+        modified_date TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+    );
+    """,
+
+    # Add comments to the table and columns for clarity.
+    "COMMENT ON TABLE task IS 'Stores tasks for installations, fault repairs, and other customer support scenarios.';",
+    "COMMENT ON COLUMN task.order_id IS 'Unique identifier for the customer order or service request.';",
+    "COMMENT ON COLUMN task.corelation_id IS 'Correlation ID for tracking across different microservices.';",
+    "COMMENT ON COLUMN task.status IS 'The current lifecycle status of the task (e.g., ''Feasibility Check'', ''Activation In Progress'').';",
+    "COMMENT ON COLUMN task.common_details IS 'A JSON blob for storing nested, issue-specific details like FFC/RC values.';",
+    "COMMENT ON COLUMN task.rsu IS 'Residential Service Unit, relevant for broadband feasibility.';",
+    "COMMENT ON COLUMN task.modified_date IS 'When the row was last inserted or updated; set by trg_task_modified_date.';",
+
+    # Stamp modified_date on every insert and update, whatever the writer sends, so the
+    # stuck-order watcher (order_watcher.py) sees every changed row. clock_timestamp()
+    # rather than now() keeps rows of a long transaction or COPY close to their commit time.
+    """
+    CREATE OR REPLACE FUNCTION task_touch_modified_date() RETURNS trigger AS $$
+    BEGIN
+        NEW.modified_date := clock_timestamp();
+        RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql;
+    """,
+    "DROP TRIGGER IF EXISTS trg_task_modified_date ON task;",
+    """
+    CREATE TRIGGER trg_task_modified_date BEFORE INSERT OR UPDATE ON task
+    FOR EACH ROW EXECUTE FUNCTION task_touch_modified_date();
+    """,
+]
+
+# Indexes are created after bulk loads; building them once is much cheaper than
+# maintaining them row by row during COPY.
+INDEX_COMMANDS = [
+    # --- Indexes for the agent's SOP queries ---
+    # Lookups by pending engineer ("Reached Onsite" by mobile number).
+    "CREATE INDEX IF NOT EXISTS idx_task_pending_with_details ON task (pending_with_details);",
+    # Status scans, optionally narrowed by age.
+    "CREATE INDEX IF NOT EXISTS idx_task_status_created_date ON task (status, created_date);",
+    # SOP diagnostics filter by process path + task type + status (e.g. DTH activation stuck).
+    "CREATE INDEX IF NOT EXISTS idx_task_process_type_status ON task (organisation_process_path, task_type, status);",
+    # Time-window scans across all statuses.
+    "CREATE INDEX IF NOT EXISTS idx_task_created_date ON task (created_date);",
+    # Containment queries on common_details (common_details @> '{...}').
+    "CREATE INDEX IF NOT EXISTS idx_task_common_details_gin ON task USING GIN (common_details jsonb_path_ops);",
+    # Equality on the telemedia bin, e.g. common_details->'commonDetails'->'telemedia'->>'bin' = 'OAOE'.
+    "CREATE INDEX IF NOT EXISTS idx_task_telemedia_bin ON task ((common_details->'commonDetails'->'telemedia'->>'bin'));",
+    # Partial index covering only the statuses orders get stuck in, so "find stuck orders"
+    # scans a small index instead of the whole table.
+    """
+    CREATE INDEX IF NOT EXISTS idx_task_stuck_orders ON task (organisation_process_path, created_date)
+    WHERE status IN ('Activation In Progress', 'Feasibility Check', 'Installation Engineer Assignment',
+                     'Pending with Billing System', 'Pending', 'Reached Onsite');
+    """,
+]
+
+# Schema for the local SQLite stand-in (DB_BACKEND=local), used for development and
+# the offline benchmark. JSON is stored as text; SQLite's -> and ->> operators read it.
+LOCAL_SCHEMA_COMMANDS = [
+    """
+    CREATE TABLE IF NOT EXISTS task (
+        order_id TEXT PRIMARY KEY,
+        corelation_id TEXT UNIQUE,
+        status TEXT,
+        task_type TEXT,
+        organisation_process_path TEXT,
+        common_details TEXT,
+        one_airtel_suborder BOOLEAN,
+        pending_with_details TEXT,
+        rsu TEXT,
+        operating_boundary_path TEXT,
+        created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        modified_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    """,
+    # SQLite has no BEFORE triggers that can change NEW, so these re-stamp the row after
+    # the write; with recursive_triggers off (the default) the UPDATE does not fire them again.
     """
-    Executes the full database setup: drops the existing table,
-    creates a new one, and inserts all dummy data.
+    CREATE TRIGGER IF NOT EXISTS trg_task_modified_date_insert AFTER INSERT ON task
+    BEGIN
+        UPDATE task SET modified_date = CURRENT_TIMESTAMP WHERE order_id = NEW.order_id;
+    END;
+    """,
     """
-    commands = [
+    CREATE TRIGGER IF NOT EXISTS trg_task_modified_date_update AFTER UPDATE ON task
+    BEGIN
+        UPDATE task SET modified_date = CURRENT_TIMESTAMP WHERE order_id = NEW.order_id;
+    END;
+    """,
+]
+
+LOCAL_INDEX_COMMANDS = [
+    "CREATE INDEX IF NOT EXISTS idx_task_pending_with_details ON task (pending_with_details);",
+    "CREATE INDEX IF NOT EXISTS idx_task_status_created_date ON task (status, created_date);",
+    "CREATE INDEX IF NOT EXISTS idx_task_process_type_status ON task (organisation_process_path, task_type, status);",
+    "CREATE INDEX IF NOT EXISTS idx_task_created_date ON task (created_date);",
+]
+
+
+def _sqlite_timestamp(value: datetime) -> str:
+    # SQLite compares timestamps as text, in the same format as CURRENT_TIMESTAMP.
+    return value.astimezone(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def task_insert(task, is_postgres):
+    """Builds a parameterised INSERT for one task row; existing order IDs are left untouched.
+
+    Returns:
+        (sql, values) using the placeholder style of the target driver.
+    """
+    columns = list(task)
+    values = []
+    for column in columns:
+        value = task[column]
+        if isinstance(value, timedelta):
+            value = datetime.now(timezone.utc) - value
+            value = value if is_postgres else _sqlite_timestamp(value)
+        elif isinstance(value, str) and column == "created_date" and not is_postgres:
+            value = _sqlite_timestamp(datetime.fromisoformat(value))
+        elif isinstance(value, dict):
+            value = json.dumps(value)
+        values.append(value)
+    placeholder = "%s" if is_postgres else "?"
+    sql = (
+        f"INSERT INTO task ({', '.join(columns)}) VALUES ({', '.join([placeholder] * len(columns))}) "
+        "ON CONFLICT (order_id) DO NOTHING"
+    )
+    return sql, values
+
+
+# --- Synthetic Data ---
+# Generates realistic rows in the shapes of the scenarios above: the same process paths,
+# task types, statuses and common_details layouts, with most tasks completed, a tail of
+# stuck ones, and created_date skewed towards recent days. Each chunk is generated from
+# its own seeded RNG, so a given (seed, chunk) always produces the same rows.
+
+SYNTHETIC_COLUMNS = (
+    "order_id", "corelation_id", "status", "task_type", "organisation_process_path", "common_details",
+    "one_airtel_suborder", "pending_with_details", "rsu", "operating_boundary_path", "created_date",
+)
+# Synthetic rows are numbered through their corelation_id, so incremental loads can
+# continue after the highest number already present.
+SYNTHETIC_COREL_PREFIX = "cor_syn_"
+SYNTHETIC_CHUNK_SIZE = 50_000
+# Mean task age in days; ages follow an exponential distribution capped at two years.
+SYNTHETIC_MEAN_AGE_DAYS = 10
+SYNTHETIC_MAX_AGE_DAYS = 730
+
+TELEMEDIA_PATH = "AIRTEL.TELEMEDIA.INSTALLATION___FAULT_REPAIR"
+DTH_PATH = "AIRTEL.DTH.INSTALL_AND_FAULT_REPAIR"
+POSTPAID_PATH = "AIRTEL.POSTPAID.BILLING"
+
+PROBLEM_TYPES = {
+    "Hardware Related": ["CPE accessories related issues", "Router not powering on", "ONT faulty"],
+    "Connectivity": ["No internet", "Slow speed", "Frequent disconnection"],
+    "Voice": ["No dial tone", "Cross talk"],
+}
+FFC_RC = [
+    ("Jumpering Issues", "Jumpering issue rectified at MDF or Pillar or Sub Pillar"),
+    ("Cable Cut", "Drop wire replaced"),
+    ("CPE Faulty", "CPE replaced"),
+    ("Configuration", "Router reconfigured"),
+]
+
+
+def _pick(rng, weighted):
+    """Picks a value from a list of (value, weight) pairs."""
+    values, weights = zip(*weighted)
+    return rng.choices(values, weights)[0]
+
+
+def _mobile(rng):
+    return f"{rng.choice('6789')}{rng.randrange(10 ** 9):09d}"
+
+
+def _broadband_install(rng, n):
+    status = _pick(rng, [("Completed", 55), ("Feasibility Check", 12), ("Pending", 8),
+                         ("Installation Engineer Assignment", 10), ("Reached Onsite", 5), ("Cancelled", 10)])
+    oaoe = status == "Installation Engineer Assignment" and rng.random() < 0.3
+    missing_address = status == "Feasibility Check" and rng.random() < 0.5
+    return {
+        "order_id": f"XBB2{n:09d}",
+        "status": status,
+        "task_type": "INSTALL",
+        "organisation_process_path": TELEMEDIA_PATH,
+        "common_details": {"commonDetails": {"telemedia": {
+            "bin": "OAOE" if oaoe else "REGULAR",
+            "productType": _pick(rng, [("BROADBAND", 80), ("FLVOICE", 20)]),
+        }}},
+        "one_airtel_suborder": oaoe or (status == "Pending" and rng.random() < 0.2),
+        "pending_with_details": _mobile(rng) if status in ("Installation Engineer Assignment", "Reached Onsite") else None,
+        "rsu": None if missing_address else f"RSU_{rng.randrange(5000):04d}",
+        "operating_boundary_path": None if missing_address and rng.random() < 0.4 else f"OB_PATH_{rng.randrange(900):03d}",
+    }
+
+
+def _fault_repair(rng, n):
+    status = _pick(rng, [("Completed", 60), ("Fault Repair", 30), ("Reached Onsite", 10)])
+    problem_type = rng.choice(list(PROBLEM_TYPES))
+    ffc, rc = rng.choice(FFC_RC)
+    return {
+        "order_id": f"2{n:010d}",
+        "status": status,
+        "task_type": "Fault Repair",
+        "organisation_process_path": TELEMEDIA_PATH,
+        "common_details": {"commonDetails": {"telemedia": {
+            "problemType": problem_type,
+            "problemSubType": rng.choice(PROBLEM_TYPES[problem_type]),
+            "productType": _pick(rng, [("BROADBAND", 70), ("FLVOICE", 30)]),
+            "ffc": ffc,
+            "rc": rc if status == "Completed" else None,
+        }}},
+        "one_airtel_suborder": False,
+        "pending_with_details": _mobile(rng) if status != "Completed" else None,
+    }
+
+
+def _dth_install(rng, n):
+    status = _pick(rng, [("Completed", 75), ("Activation In Progress", 10), ("Pending", 10), ("Cancelled", 5)])
+    return {
+        "order_id": f"DT2{n:09d}",
+        "status": status,
+        "task_type": "INSTALL",
+        "organisation_process_path": DTH_PATH,
+        "common_details": {"commonDetails": {"dth": {
+            "stbType": _pick(rng, [("HD", 60), ("SD", 30), ("4K", 10)]),
+            "packCode": f"PK{rng.randrange(300):03d}",
+        }}},
+        "one_airtel_suborder": False,
+    }
+
+
+def _postpaid_billing(rng, n):
+    return {
+        "order_id": f"SR_POSTPAID_2{n:09d}",
+        "status": _pick(rng, [("Completed", 80), ("Pending with Billing System", 20)]),
+        "task_type": "BILLING",
+        "organisation_process_path": POSTPAID_PATH,
+        "common_details": None,
+        "one_airtel_suborder": False,
+    }
+
+
+# Share of each scenario family in generated data.
+SYNTHETIC_PROFILES = [(_broadband_install, 40), (_fault_repair, 25), (_dth_install, 20), (_postpaid_billing, 15)]
+
+
+def generate_tasks(start, count, seed, now=None):
+    """Generates ``count`` synthetic task rows numbered from ``start``, as tuples in SYNTHETIC_COLUMNS order."""
+    rng = random.Random(f"{seed}:{start}")
+    now = now or datetime.now(timezone.utc)
+    profiles, weights = zip(*SYNTHETIC_PROFILES)
+    rows = []
+    for n in range(start, start + count):
+        task = rng.choices(profiles, weights)[0](rng, n)
+        age = timedelta(days=min(rng.expovariate(1 / SYNTHETIC_MEAN_AGE_DAYS), SYNTHETIC_MAX_AGE_DAYS))
+        created = now - age
+        task["corelation_id"] = f"{SYNTHETIC_COREL_PREFIX}{n:012d}"
+        task["created_date"] = created
+        rows.append(tuple(task.get(column) for column in SYNTHETIC_COLUMNS))
+    return rows
+
+
+def _csv_stream(rows):
+    """Renders rows as CSV for COPY ... FROM STDIN (FORMAT csv), where an unquoted empty field is NULL."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    for row in rows:
+        writer.writerow([
+            "" if value is None
+            else ("t" if value else "f") if isinstance(value, bool)
+            else json.dumps(value) if isinstance(value, dict)
+            else value.isoformat() if isinstance(value, datetime)
+            else value
+            for value in row
+        ])
+    return io.BytesIO(buffer.getvalue().encode("utf-8"))
+
+
+def _local_row(row):
+    return tuple(
+        json.dumps(value) if isinstance(value, dict)
+        else _sqlite_timestamp(value) if isinstance(value, datetime)
+        else value
+        for value in row
+    )
+
+
+# Per-process connection of a PostgreSQL loader worker.
+_worker_conn = None
+
+
+def _init_worker():
+    global _worker_conn
+    if get_backend_name() != "local":
+        _worker_conn = BACKENDS[get_backend_name()]()
+        cur = _worker_conn.cursor()
+        # Synthetic data can be regenerated; don't wait for WAL flushes on every chunk.
+        cur.execute("SET synchronous_commit = off")
+        cur.close()
+
+
+def _load_chunk(job):
+    """Generates one chunk in a worker process.
+
+    On PostgreSQL the worker COPYs the chunk itself and returns the row count; SQLite
+    allows one writer at a time, so the rows are returned for the parent to insert.
+    """
+    start, count, seed = job
+    rows = generate_tasks(start, count, seed)
+    if _worker_conn is None:
+        return [_local_row(row) for row in rows]
+    cur = _worker_conn.cursor()
+    cur.execute(
+        f"COPY task ({', '.join(SYNTHETIC_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+        stream=_csv_stream(rows),
+    )
+    cur.close()
+    _worker_conn.commit()
+    return count
+
+
+def next_synthetic_number(cur):
+    """Returns the number after the highest synthetic row already loaded (0 for none)."""
+    # '_' is a LIKE wildcard, so it is escaped in the prefix.
+    pattern = SYNTHETIC_COREL_PREFIX.replace("_", "!_") + "%"
+    cur.execute(f"SELECT MAX(corelation_id) FROM task WHERE corelation_id LIKE '{pattern}' ESCAPE '!'")
+    (highest,) = cur.fetchone()
+    return int(highest[len(SYNTHETIC_COREL_PREFIX):]) + 1 if highest else 0
+
+
+def load_synthetic_tasks(conn, rows, workers=None, chunk_size=SYNTHETIC_CHUNK_SIZE, seed=0):
+    """Generates and bulk-loads ``rows`` synthetic tasks using parallel worker processes.
+
+    Returns:
+        dict: rows loaded, elapsed seconds and rows per second.
+    """
+    is_postgres = get_backend_name() != "local"
+    cur = conn.cursor()
+    first = next_synthetic_number(cur)
+    jobs = [(start, min(chunk_size, first + rows - start), seed) for start in range(first, first + rows, chunk_size)]
+    workers = workers or os.cpu_count() or 1
+    print(f"Loading {rows} synthetic tasks (numbers {first}..{first + rows - 1}) in {len(jobs)} chunks "
+          f"with {workers} worker processes...")
+
+    loaded = 0
+    started = time.perf_counter()
+    # Spawned (not forked) workers each open their own connection; pooled connections
+    # and the Cloud SQL Connector's threads must not be shared across processes.
+    with multiprocessing.get_context("spawn").Pool(workers, initializer=_init_worker) as pool:
+        for result in pool.imap_unordered(_load_chunk, jobs):
+            if is_postgres:
+                loaded += result
+            else:
+                cur.executemany(
+                    f"INSERT INTO task ({', '.join(SYNTHETIC_COLUMNS)}) VALUES ({', '.join('?' * len(SYNTHETIC_COLUMNS))})",
+                    result,
+                )
+                conn.commit()
+                loaded += len(result)
+            elapsed = time.perf_counter() - started
+            print(f"  {loaded}/{rows} rows, {loaded / elapsed:,.0f} rows/s")
+    cur.close()
+    elapsed = time.perf_counter() - started
+    return {"rows": loaded, "seconds": round(elapsed, 3), "rows_per_second": round(loaded / elapsed) if elapsed else None}
+
+
+def setup_database(synthetic_rows=0, workers=None, chunk_size=SYNTHETIC_CHUNK_SIZE, seed=0, reset=False):
+    """
+    Executes the full database setup: creates the table if needed, inserts the scenario
+    rows, optionally bulk-loads synthetic rows, then creates the indexes.
+    With ``reset`` the existing table is dropped first.
+    """
+    is_postgres = get_backend_name() != "local"
+    schema_commands = SCHEMA_COMMANDS if is_postgres else LOCAL_SCHEMA_COMMANDS
+    index_commands = INDEX_COMMANDS if is_postgres else LOCAL_INDEX_COMMANDS
+    if reset:
         # Drop the table if it exists to ensure a clean slate.
-        "DROP TABLE IF EXISTS task;",
-
-        # Create the main 'task' table.
-        """
-        CREATE TABLE task (
-            order_id VARCHAR(50) PRIMARY KEY,
-            corelation_id VARCHAR(50) UNIQUE,
-            status VARCHAR(50),
-            task_type VARCHAR(50),
-            organisation_process_path VARCHAR(100),
-            common_details JSONB,
-            one_airtel_suborder BOOLEAN,
-            pending_with_details VARCHAR(50),
-            rsu VARCHAR(50),
-            operating_boundary_path VARCHAR(100),
-            created_date TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
-            modified_date TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
-        );
-        """,
-
-        # Add comments to the table and columns for clarity.
-        "COMMENT ON TABLE task IS 'Stores tasks for installations, fault repairs, and other customer support scenarios.';",
-        "COMMENT ON COLUMN task.order_id IS 'Unique identifier for the customer order or service request.';",
-        "COMMENT ON COLUMN task.corelation_id IS 'Correlation ID for tracking across different microservices.';",
-        "COMMENT ON COLUMN task.status IS 'The current lifecycle status of the task (e.g., ''Feasibility Check'', ''Activation In Progress'').';",
-        "COMMENT ON COLUMN task.common_details IS 'A JSON blob for storing nested, issue-specific details like FFC/RC values.';",
-        "COMMENT ON COLUMN task.rsu IS 'Residential Service Unit, relevant for broadband feasibility.';",
-
-        # --- Insert Dummy Data ---
-
-        # SOP #1: DTH Activation Stuck
-        """
-        INSERT INTO task (order_id, corelation_id, status, task_type, organisation_process_path, created_date) VALUES
-        ('DT100987654', 'cor_dth_stuck_123', 'Activation In Progress', 'INSTALL', 'AIRTEL.DTH.INSTALL_AND_FAULT_REPAIR', CURRENT_DATE - INTERVAL '2 day');
-        """,
-
-        # SOP #2: Broadband Order Stuck in 'Feasibility Check'
-        """
-        INSERT INTO task (order_id, status, rsu, operating_boundary_path, task_type, organisation_process_path) VALUES
-        ('XBB10054321', 'Feasibility Check', NULL, 'OB_PATH_VALID_123', 'INSTALL', 'AIRTEL.TELEMEDIA.INSTALLATION___FAULT_REPAIR');
-        """,
-
-        # SOP #3: Postpaid Bill Not Generated
-        """
-        INSERT INTO task (order_id, corelation_id, status, created_date, task_type, organisation_process_path) VALUES
-        ('SR_POSTPAID_98765', 'cor_postpaid_bill_789', 'Pending with Billing System', '2025-06-27 12:00:00+00', 'BILLING', 'AIRTEL.POSTPAID.BILLING');
-        """,
-
-        # SOP #5: Broadband Order Stuck due to Incorrect Sub-Order Flag
-        """
-        INSERT INTO task (order_id, corelation_id, status, one_airtel_suborder, task_type, organisation_process_path) VALUES
-        ('XBB_STUCK_999', 'cor_stuck_sub_456', 'Pending', true, 'INSTALL', 'AIRTEL.TELEMEDIA.INSTALLATION___FAULT_REPAIR');
-        """,
-
-        # Older SOP Scenario: FFC RC Issue
-        """
-        INSERT INTO task (order_id, status, task_type, organisation_process_path, common_details) VALUES
-        ('10045909651', 'Fault Repair', 'Fault Repair', 'AIRTEL.TELEMEDIA.INSTALLATION___FAULT_REPAIR',
-        '{
-          "commonDetails": {
-            "telemedia": {
-              "problemType": "Hardware Related",
-              "problemSubType": "CPE accessories related issues",
-              "productType": "FLVOICE",
-              "ffc": "Jumpering Issues",
-              "rc": "Jumpering issue rectified at MDF or Pillar or Sub Pillar"
-            }
-          }
-        }');
-        """,
-
-        # Older SOP Scenario: Order stuck at Installation Engineer Assignment (OAOE Order)
-        """
-        INSERT INTO task (order_id, corelation_id, status, one_airtel_suborder, common_details, task_type, organisation_process_path) VALUES
-        ('OAOE_ORDER_123', 'cor12345oaoe', 'Installation Engineer Assignment', true,
-        '{
-          "commonDetails": {
-            "telemedia": {
-              "bin": "OAOE"
-            }
-          }
-        }', 'INSTALL', 'AIRTEL.TELEMEDIA.INSTALLATION___FAULT_REPAIR');
-        """,
-
-        # Older SOP Scenario: Unable to mark onsite
-        """
-        INSERT INTO task (order_id, status, organisation_process_path, pending_with_details, created_date, task_type) VALUES
-        ('ONSITE_ISSUE_101', 'Reached Onsite', 'AIRTEL.TELEMEDIA.INSTALLATION___FAULT_REPAIR', '9860434407', '2025-02-15 11:00:00+00', 'Fault Repair');
-        """
-    ]
-
-    conn = None
+        schema_commands = ["DROP TABLE IF EXISTS task;"] + schema_commands
+
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-        print("âœ… Database connection successful. Setting up tables...")
+        with get_pool().connection() as conn:
+            cur = conn.cursor()
+            print("âœ… Database connection successful. Setting up tables...")
 
-        # Execute each command
-        for command in commands:
-            print(f"Executing: {command.strip().splitlines()[0]}...") # Print first line of command
-            cur.execute(command)
+            # Execute each command
+            for command in schema_commands:
+                print(f"Executing: {command.strip().splitlines()[0]}...") # Print first line of command
+                cur.execute(command)
 
-        # Commit the changes
-        conn.commit()
-        cur.close()
-        print("âœ… Database initialization complete. The 'task' table has been created and populated.")
+            # --- Insert Dummy Data ---
+            print(f"Inserting {len(SCENARIO_TASKS)} scenario tasks...")
+            for task in SCENARIO_TASKS:
+                cur.execute(*task_insert(task, is_postgres))
+            conn.commit()
+
+            if synthetic_rows > 0:
+                stats = load_synthetic_tasks(conn, synthetic_rows, workers, chunk_size, seed)
+                print(f"âœ… Loaded {stats['rows']} synthetic tasks in {stats['seconds']}s "
+                      f"({stats['rows_per_second']:,} rows/s).")
 
-    except (Exception, pg8000.dbapi.Error) as error: # Catch pg8000's specific error type
+            started = time.perf_counter()
+            for command in index_commands:
+                print(f"Executing: {command.strip().splitlines()[0]}...")
+                cur.execute(command)
+            # Refresh planner statistics so EXPLAIN estimates used by run_sql are accurate.
+            cur.execute("ANALYZE task;" if is_postgres else "ANALYZE;")
+            print(f"Indexes and statistics ready in {time.perf_counter() - started:.2f}s.")
+
+            # Commit the changes
+            conn.commit()
+            cur.close()
+            print("âœ… Database initialization complete. The 'task' table has been created and populated.")
+
+    except Exception as error:
+        # The pool rolls back any open transaction when the connection is returned
         print(f"ðŸ”´ Error during database setup: {error}")
-        if conn is not None:
-            conn.rollback() # Roll back the transaction on error
     finally:
-        if conn is not None:
-            conn.close()
-            print("Connection closed.")
-        # Ensure the global connector is closed when the script finishes
-        global cloud_sql_connector
-        if cloud_sql_connector:
-            cloud_sql_connector.close()
-            print("Cloud SQL Connector resources released.")
-
+        # Close pooled connections and release the Cloud SQL Connector, if any
+        close_pool()
+        print("Connection closed.")
 
 if __name__ == '__main__':
     # This block runs when the script is executed directly from the command line.
     # To run this script:
     # 1. Make sure your virtual environment is activated.
-    # 2. Set the following environment variables BEFORE running the script:
+    # 2. Set the following environment variables BEFORE running the script
+    #    (or PG_HOST/PG_PORT/PG_DBNAME/PG_USER/PG_PASSWORD for a plain PostgreSQL server;
+    #    DB_BACKEND=cloudsql|postgres|local forces a backend):
     #    - CLOUD_SQL_CONNECTION_NAME (e.g., my-gcp-project:asia-south1:my-airtel-pg-instance)
     #    - DB_USER (your PostgreSQL username)
     #    - DB_PASSWORD (your PostgreSQL password)
     #    - DB_NAME (your PostgreSQL database name, e.g., airtel_db)
     # 3. Run 'python setup_database.py' in your terminal.
+    #    Add '--rows 1000000' to bulk-load synthetic tasks (repeat to load more),
+    #    '--reset' to drop the existing table first.
 
     # Example of how to set environment variables in bash (for testing):
     # export CLOUD_SQL_CONNECTION_NAME="your-project-id:your-region:your-instance-name"
@@ -184,4 +525,12 @@ if __name__ == '__main__':
     # export DB_NAME="airtel_db"
     # python setup_database.py
 
-    setup_database()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Create and populate the 'task' table.")
+    parser.add_argument("--rows", type=int, default=0, help="Number of synthetic tasks to generate and bulk-load.")
+    parser.add_argument("--workers", type=int, default=None, help="Loader processes (default: CPU count).")
+    parser.add_argument("--chunk-size", type=int, default=SYNTHETIC_CHUNK_SIZE, help="Rows per COPY chunk.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for reproducible synthetic data.")
+    parser.add_argument("--reset", action="store_true", help="Drop the existing 'task' table first.")
+    args = parser.parse_args()
+
+    setup_database(args.rows, args.workers, args.chunk_size, args.seed, args.reset)
\ No newline at end of file
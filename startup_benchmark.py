@@ -0,0 +1,186 @@
+# Cold-start benchmark for the Airtel support agent.
+#
+# Starts fresh Python processes, as `adk web` or a restarted worker would, and
+# measures in each one the time to import ADK and the agent tree and the time to
+# answer the first message. The first answer includes every on-first-use
+# initialisation (SOP index, database pool, ticket store), so it is also timed again
+# in a second session of the same process. The model is the scripted stand-in from
+# benchmark.py, and the database is a fresh local SQLite stand-in by default.
+#
+#   python startup_benchmark.py --samples 5 --budget-import-ms 2500 --budget-first-response-ms 4000
+#
+# The exit status is 1 when a median exceeds its budget, so the check can run in CI.
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+from benchmark import CONVERSATIONS, distribution, prepare_environment
+
+# Marks the child's result line in its stdout, which agent tools also print to.
+RESULT_PREFIX = "STARTUP_RESULT "
+
+
+# --- Child process ---
+
+
+async def _first_responses(conversation: str) -> Dict[str, Any]:
+    from google.adk.runners import Runner
+    from google.adk.sessions import InMemorySessionService
+
+    from benchmark import install_scripted_llm, run_turn
+    from main_agent.agent import root_agent
+
+    install_scripted_llm(root_agent, 0.0)
+    session_service = InMemorySessionService()
+    runner = Runner(agent=root_agent, app_name="startup_benchmark", session_service=session_service)
+    turn = CONVERSATIONS[conversation][0]
+    results = []
+    for _ in range(2):
+        session = await session_service.create_session(app_name=runner.app_name, user_id="bench")
+        with contextlib.redirect_stdout(io.StringIO()):
+            results.append(await run_turn(runner, session.id, conversation, 0, turn))
+    first, warm = results
+    return {
+        "first_response_ms": first.latency_ms,
+        "warm_response_ms": warm.latency_ms,
+        "first_tool_latency_ms": {name: values[0] for name, values in first.tool_latency_ms.items()},
+        "error": first.error or warm.error,
+    }
+
+
+def child(conversation: str) -> None:
+    """Runs in the measured process: timestamps are wall-clock so the parent can add process start-up."""
+    marks = {"started": time.time()}
+    import google.adk.agents  # noqa: F401  (framework import, measured on its own)
+    import google.adk.runners  # noqa: F401
+
+    marks["framework_imported"] = time.time()
+    import main_agent.agent  # noqa: F401
+
+    marks["agents_imported"] = time.time()
+    result = asyncio.run(_first_responses(conversation))
+    marks["first_response"] = marks["agents_imported"] + result["first_response_ms"] / 1000
+    print(RESULT_PREFIX + json.dumps({"marks": marks, **result}))
+
+
+# --- Parent process ---
+
+
+def own_import_times() -> List[Dict[str, Any]]:
+    """Cumulative import time of each main_agent module, from one `python -X importtime` run.
+
+    ADK is imported first, as in the measured processes, so the framework's own import
+    time is not attributed to the first agent module that happens to pull it in.
+    """
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c",
+         "import google.adk.agents, google.adk.runners; import main_agent.agent"],
+        capture_output=True, text=True, env=os.environ.copy(),
+    )
+    modules = []
+    for line in completed.stderr.splitlines():
+        parts = [p.strip() for p in line.removeprefix("import time:").split("|")]
+        if len(parts) == 3 and parts[2].startswith("main_agent"):
+            modules.append({"module": parts[2], "self_ms": int(parts[0]) / 1000, "cumulative_ms": int(parts[1]) / 1000})
+    return sorted(modules, key=lambda m: -m["cumulative_ms"])
+
+
+def sample(conversation: str) -> Dict[str, Any]:
+    spawned = time.time()
+    completed = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", "--conversation", conversation],
+        capture_output=True, text=True, env=os.environ.copy(),
+    )
+    lines = [l for l in completed.stdout.splitlines() if l.startswith(RESULT_PREFIX)]
+    if completed.returncode != 0 or not lines:
+        raise RuntimeError(f"Startup sample failed (exit {completed.returncode}):\n{completed.stderr[-2000:]}")
+    result = json.loads(lines[-1][len(RESULT_PREFIX):])
+    marks = result.pop("marks")
+    return {
+        "interpreter_ms": (marks["started"] - spawned) * 1000,
+        "framework_import_ms": (marks["framework_imported"] - marks["started"]) * 1000,
+        "agent_import_ms": (marks["agents_imported"] - marks["framework_imported"]) * 1000,
+        "import_ms": (marks["agents_imported"] - marks["started"]) * 1000,
+        "time_to_first_response_ms": (marks["first_response"] - spawned) * 1000,
+        **result,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Cold-start benchmark: import time and time-to-first-response.")
+    parser.add_argument("--samples", type=int, default=5, help="Fresh processes to start.")
+    parser.add_argument("--conversation", default="broadband_feasibility", choices=sorted(CONVERSATIONS),
+                        help="Conversation whose first message is answered.")
+    parser.add_argument("--cold-sop-cache", action="store_true",
+                        help="Start every sample with an empty SOP index cache, so the PDF is parsed.")
+    parser.add_argument("--use-configured-db", action="store_true",
+                        help="Use the database configured in the environment instead of a local SQLite stand-in.")
+    parser.add_argument("--budget-import-ms", type=float, default=2500,
+                        help="Budget for the median time to import ADK and the agent tree.")
+    parser.add_argument("--budget-first-response-ms", type=float, default=4000,
+                        help="Budget for the median time from process start to the first answer.")
+    parser.add_argument("--top-imports", type=int, default=10, help="Slowest main_agent modules to list.")
+    parser.add_argument("--output", help="Where to write the JSON results.")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.conversation)
+        return
+
+    samples = []
+    with tempfile.TemporaryDirectory(prefix="airtel_startup_") as workdir:
+        env_args = SimpleNamespace(no_result_cache=False, no_compaction=False, no_answer_cache=False, workers=0, use_configured_db=args.use_configured_db, synthetic_rows=0)
+        prepare_environment(env_args, workdir)
+        for i in range(args.samples):
+            if args.cold_sop_cache:
+                os.environ["SOP_INDEX_CACHE_DIR"] = os.path.join(workdir, f"sop_index_{i}")
+            samples.append(sample(args.conversation))
+        imports = own_import_times()[:args.top_imports]
+
+    keys = ("interpreter_ms", "framework_import_ms", "agent_import_ms", "import_ms",
+            "time_to_first_response_ms", "first_response_ms", "warm_response_ms")
+    summary = {key: distribution([s[key] for s in samples]) for key in keys}
+    budgets = {"import_ms": args.budget_import_ms, "time_to_first_response_ms": args.budget_first_response_ms}
+    over_budget = {key: summary[key]["p50"] for key, budget in budgets.items() if summary[key]["p50"] > budget}
+    report = {
+        "config": {"samples": args.samples, "conversation": args.conversation,
+                   "cold_sop_cache": args.cold_sop_cache, "budgets_ms": budgets},
+        "summary": summary,
+        "slowest_imports": imports,
+        "samples": samples,
+        "over_budget": over_budget,
+        "errors": sorted({s["error"] for s in samples if s["error"]}),
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    for key in keys:
+        dist = summary[key]
+        budget = f" (budget {budgets[key]:.0f})" if key in budgets else ""
+        print(f"{key}: p50={dist['p50']} max={dist['max']}{budget}")
+    print("Slowest main_agent imports (cumulative ms):")
+    for module in imports:
+        print(f"  {module['module']}: {module['cumulative_ms']:.1f}")
+    for error in report["errors"]:
+        print(f"ðŸ”´ Error: {error}")
+    for key, value in over_budget.items():
+        print(f"ðŸ”´ Error: median {key} {value} is over its budget of {budgets[key]:.0f} ms.")
+    if over_budget or report["errors"]:
+        sys.exit(1)
+    print("âœ… Cold start is within budget.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+import asyncio
+import gzip
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+
+from main_agent import http_client
+from main_agent.http_client import (
+    CircuitOpenError,
+    DeadlineExceeded,
+    InvalidRequestURL,
+    ResponseTooLarge,
+    request_json,
+)
+
+# Tests for the shared HTTP client against a stub server on 127.0.0.1. Each path
+# serves a script of responses, one per request, then repeats the last one.
+
+OK_BODY = json.dumps({"ok": True}).encode()
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), StubHandler)
+        self.scripts = {}
+        self.hits = {}
+        self.lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def script(self, path, *responses):
+        """Each response is (status, body, headers, delay_seconds)."""
+        self.scripts[path] = list(responses)
+
+    def next_response(self, path):
+        with self.lock:
+            self.hits[path] = self.hits.get(path, 0) + 1
+            script = self.scripts.get(path) or [(200, OK_BODY, {}, 0)]
+            return script.pop(0) if len(script) > 1 else script[0]
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def _respond(self):
+        length = int(self.headers.get("content-length") or 0)
+        if length:
+            self.rfile.read(length)
+        status, body, headers, delay = self.server.next_response(self.path)
+        if delay:
+            time.sleep(delay)
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        if "content-length" not in {name.lower() for name in headers}:
+            self.send_header("Connection", "close")
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_POST = do_PUT = do_DELETE = _respond
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    stub = StubServer()
+    thread = threading.Thread(target=stub.serve_forever, daemon=True)
+    thread.start()
+    yield stub
+    stub.shutdown()
+    stub.server_close()
+
+
+@pytest.fixture(autouse=True)
+def fast_client(monkeypatch):
+    # Fresh breakers, quick backoff and no proxy for the loopback server.
+    monkeypatch.setattr(http_client, "_breakers", {})
+    monkeypatch.setattr(http_client, "HTTP_RETRY_BACKOFF_SECONDS", 0.01)
+    monkeypatch.setattr(http_client, "HTTP_MAX_RETRIES", 2)
+    monkeypatch.setenv("NO_PROXY", "127.0.0.1")
+
+
+def run(coro):
+    async def wrapper():
+        try:
+            return await coro
+        finally:
+            await http_client.aclose_client()
+
+    return asyncio.run(wrapper())
+
+
+def status(code):
+    body = json.dumps({"status": code}).encode()
+    return (code, body, {"Content-Length": str(len(body))}, 0)
+
+
+# --- Retries ---
+
+
+@pytest.mark.parametrize("code", [429, 502, 503, 504])
+def test_idempotent_method_is_retried_on_retryable_status(server, code):
+    server.script("/flaky", status(code), status(code), (200, OK_BODY, {}, 0))
+    assert run(request_json("GET", server.base_url + "/flaky")) == {"ok": True}
+    assert server.hits["/flaky"] == 3
+
+
+def test_retries_stop_after_max_retries(server):
+    server.script("/down", status(503))
+    with pytest.raises(httpx.HTTPStatusError):
+        run(request_json("GET", server.base_url + "/down"))
+    assert server.hits["/down"] == 3
+
+
+@pytest.mark.parametrize("code", [429, 502, 503, 504])
+def test_non_idempotent_method_is_not_retried(server, code):
+    server.script("/write", status(code), (200, OK_BODY, {}, 0))
+    with pytest.raises(httpx.HTTPStatusError):
+        run(request_json("POST", server.base_url + "/write", json_body={"a": 1}))
+    assert server.hits["/write"] == 1
+
+
+def test_non_retryable_status_is_not_retried(server):
+    server.script("/error", status(500), (200, OK_BODY, {}, 0))
+    with pytest.raises(httpx.HTTPStatusError):
+        run(request_json("GET", server.base_url + "/error"))
+    assert server.hits["/error"] == 1
+
+
+# --- Circuit breaker ---
+
+
+def open_breaker(monkeypatch, server, reset_seconds=0.2):
+    monkeypatch.setattr(http_client, "HTTP_BREAKER_FAILURE_THRESHOLD", 2)
+    monkeypatch.setattr(http_client, "HTTP_BREAKER_RESET_SECONDS", reset_seconds)
+    server.script("/fail", status(500))
+    for _ in range(2):
+        with pytest.raises(httpx.HTTPStatusError):
+            run(request_json("GET", server.base_url + "/fail"))
+    return http_client.get_breaker("127.0.0.1")
+
+
+def test_breaker_opens_and_skips_the_host(monkeypatch, server):
+    breaker = open_breaker(monkeypatch, server, reset_seconds=60)
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        run(request_json("GET", server.base_url + "/ok"))
+    assert "/ok" not in server.hits
+
+
+def test_breaker_closes_after_successful_half_open_trial(monkeypatch, server):
+    breaker = open_breaker(monkeypatch, server)
+    time.sleep(0.25)
+    assert breaker.state == "half_open"
+    assert run(request_json("GET", server.base_url + "/ok")) == {"ok": True}
+    assert breaker.state == "closed"
+    assert breaker.failures == 0
+
+
+def test_breaker_reopens_after_failed_half_open_trial(monkeypatch, server):
+    breaker = open_breaker(monkeypatch, server)
+    time.sleep(0.25)
+    with pytest.raises(httpx.HTTPStatusError):
+        run(request_json("GET", server.base_url + "/fail"))
+    assert breaker.state == "open"
+    assert not breaker.trial_in_flight
+
+
+def test_half_open_allows_a_single_trial(monkeypatch, server):
+    breaker = open_breaker(monkeypatch, server)
+    time.sleep(0.25)
+    server.script("/slow", (200, OK_BODY, {"Content-Length": str(len(OK_BODY))}, 0.3))
+
+    async def concurrent():
+        return await asyncio.gather(
+            request_json("GET", server.base_url + "/slow"),
+            request_json("GET", server.base_url + "/slow"),
+            return_exceptions=True,
+        )
+
+    results = run(concurrent())
+    assert results.count({"ok": True}) == 1
+    assert sum(isinstance(r, CircuitOpenError) for r in results) == 1
+    assert server.hits["/slow"] == 1
+    assert breaker.state == "closed"
+
+
+def test_unexpected_error_ends_half_open_trial(monkeypatch, server):
+    breaker = open_breaker(monkeypatch, server)
+    time.sleep(0.25)
+    server.script("/corrupt", (200, b"not gzip", {"Content-Encoding": "gzip", "Content-Length": "8"}, 0))
+    with pytest.raises(httpx.DecodingError):
+        run(request_json("GET", server.base_url + "/corrupt"))
+    assert not breaker.trial_in_flight
+    assert breaker.state == "open"
+
+
+# --- Deadline budget ---
+
+
+def test_expired_deadline_skips_the_call(server):
+    with pytest.raises(DeadlineExceeded):
+        run(request_json("GET", server.base_url + "/ok", deadline=time.time() - 1))
+    assert "/ok" not in server.hits
+
+
+def test_deadline_caps_the_attempt_timeout(monkeypatch, server):
+    monkeypatch.setattr(http_client, "HTTP_MAX_RETRIES", 0)
+    server.script("/slow", (200, OK_BODY, {"Content-Length": str(len(OK_BODY))}, 2))
+    started = time.monotonic()
+    with pytest.raises(httpx.TimeoutException):
+        run(request_json("GET", server.base_url + "/slow", deadline=time.time() + 0.3))
+    assert time.monotonic() - started < 1.5
+
+
+def test_no_retry_is_started_past_the_deadline(monkeypatch, server):
+    monkeypatch.setattr(http_client, "HTTP_RETRY_BACKOFF_SECONDS", 0.1)
+    server.script("/down", status(503))
+    started = time.monotonic()
+    with pytest.raises((httpx.HTTPStatusError, DeadlineExceeded)):
+        run(request_json("GET", server.base_url + "/down", deadline=time.time() + 0.15))
+    assert time.monotonic() - started < 0.5
+    assert server.hits["/down"] < 3
+
+
+# --- Response size cap ---
+
+
+def test_declared_oversized_response_is_rejected(server):
+    body = json.dumps({"data": "x" * 2000}).encode()
+    server.script("/big", (200, body, {"Content-Length": str(len(body))}, 0))
+    with pytest.raises(ResponseTooLarge):
+        run(request_json("GET", server.base_url + "/big", max_bytes=1000))
+
+
+def test_streamed_oversized_response_is_rejected(server):
+    # No Content-Length: the cap is enforced while reading.
+    server.script("/stream", (200, json.dumps({"data": "x" * 5000}).encode(), {}, 0))
+    with pytest.raises(ResponseTooLarge):
+        run(request_json("GET", server.base_url + "/stream", max_bytes=1000))
+    assert http_client.get_breaker("127.0.0.1").state == "closed"
+
+
+def test_cap_applies_to_decoded_body(server):
+    body = gzip.compress(json.dumps({"data": "x" * 5000}).encode())
+    server.script("/gzip", (200, body, {"Content-Encoding": "gzip", "Content-Length": str(len(body))}, 0))
+    with pytest.raises(ResponseTooLarge):
+        run(request_json("GET", server.base_url + "/gzip", max_bytes=1000))
+
+
+def test_response_under_the_cap_is_returned(server):
+    assert run(request_json("GET", server.base_url + "/ok", max_bytes=1000)) == {"ok": True}
+
+
+# --- Invalid input ---
+
+
+def test_malformed_url_is_rejected_without_a_call():
+    with pytest.raises(InvalidRequestURL):
+        run(request_json("GET", "http://[::1"))
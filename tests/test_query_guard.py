@@ -0,0 +1,72 @@
+import json
+
+import pytest
+
+from main_agent.sub_agents.execution_agent import query_guard
+from main_agent.sub_agents.execution_agent.query_guard import QueryRejected, guard_query, limit_ordered_query
+
+# Tests for bounding over-budget reads: a LIMIT only goes on a query with its own
+# top-level ORDER BY, and on that statement itself.
+
+
+@pytest.mark.parametrize("query, bounded", [
+    ("SELECT * FROM task ORDER BY created_date", "SELECT * FROM task ORDER BY created_date LIMIT 51"),
+    ("SELECT * FROM task ORDER BY created_date LIMIT 1000", "SELECT * FROM task ORDER BY created_date LIMIT 51"),
+    ("SELECT * FROM task ORDER BY created_date LIMIT 10", "SELECT * FROM task ORDER BY created_date LIMIT 10"),
+    ("SELECT * FROM task ORDER BY created_date LIMIT ALL OFFSET 5",
+     "SELECT * FROM task ORDER BY created_date LIMIT 51 OFFSET 5"),
+    ("SELECT a FROM x UNION SELECT a FROM y ORDER BY a", "SELECT a FROM x UNION SELECT a FROM y ORDER BY a LIMIT 51"),
+    ("SELECT * FROM task ORDER BY created_date FOR UPDATE",
+     "SELECT * FROM task ORDER BY created_date LIMIT 51 FOR UPDATE"),
+])
+def test_ordered_query_gets_its_own_limit(query, bounded):
+    assert limit_ordered_query(query, 51) == bounded
+
+
+@pytest.mark.parametrize("query", [
+    "SELECT * FROM task",
+    "SELECT * FROM (SELECT * FROM task ORDER BY created_date) AS t",
+    "SELECT * FROM task WHERE status = 'order by created_date'",
+    "SELECT * FROM task ORDER BY created_date FETCH FIRST 10 ROWS ONLY",
+    "SELECT * FROM task -- ORDER BY created_date",
+])
+def test_unordered_query_cannot_be_bounded(query):
+    assert limit_ordered_query(query, 51) is None
+
+
+class PlanConn:
+    """Answers EXPLAIN with a cheap plan for LIMITed statements and an expensive one otherwise."""
+
+    def __init__(self):
+        self.explained = []
+
+    def cursor(self):
+        return self
+
+    def execute(self, sql):
+        query = sql[len("EXPLAIN (FORMAT JSON) "):]
+        self.explained.append(query)
+        rows = 51 if "LIMIT 51" in query else 10_000_000
+        self._plan = json.dumps([{"Plan": {"Total Cost": rows * 10.0, "Plan Rows": rows}}])
+
+    def fetchone(self):
+        return (self._plan,)
+
+    def close(self):
+        pass
+
+
+def test_guard_bounds_ordered_query(monkeypatch):
+    monkeypatch.setattr(query_guard, "SQL_MAX_PLAN_COST", 1000)
+    monkeypatch.setattr(query_guard, "SQL_MAX_PLAN_ROWS", 100)
+    query, bounded = guard_query(PlanConn(), "SELECT * FROM task ORDER BY created_date", 51)
+    assert (query, bounded) == ("SELECT * FROM task ORDER BY created_date LIMIT 51", True)
+
+
+def test_guard_rejects_unordered_query(monkeypatch):
+    monkeypatch.setattr(query_guard, "SQL_MAX_PLAN_COST", 1000)
+    monkeypatch.setattr(query_guard, "SQL_MAX_PLAN_ROWS", 100)
+    conn = PlanConn()
+    with pytest.raises(QueryRejected, match="ORDER BY"):
+        guard_query(conn, "SELECT * FROM task", 51)
+    assert conn.explained == ["SELECT * FROM task"]
@@ -0,0 +1,92 @@
+import pytest
+
+from main_agent import result_cache as cache_module
+from main_agent.result_cache import (
+    ResultCache,
+    invalidate_for_sql_write,
+    sql_key_values,
+    sql_read_tables,
+)
+
+# Tests for key-narrowed invalidation: a write only spares cached reads that it
+# provably cannot touch.
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    fresh = ResultCache(max_bytes=1024 * 1024)
+    monkeypatch.setattr(cache_module, "result_cache", fresh)
+    return fresh
+
+
+def cache_read(cache, query):
+    cache.put(query, {"rows": []}, 60, tables=sql_read_tables(query), key_values=sql_key_values(query))
+
+
+# --- Key extraction ---
+
+
+@pytest.mark.parametrize("query, keys", [
+    ("SELECT * FROM task WHERE order_id = 'A'", {"order_id=A"}),
+    ("SELECT * FROM task t WHERE t.order_id IN ('A', 'B') ORDER BY created_date LIMIT 5", {"order_id=A", "order_id=B"}),
+    ("SELECT * FROM task WHERE (order_id = 'A') AND corelation_id = 'C'", {"order_id=A", "corelation_id=C"}),
+    ("DELETE FROM task WHERE order_id = 'O''Brien';", {"order_id=O'Brien"}),
+    ("UPDATE task SET status = 'or where' WHERE order_id = 'A'", {"order_id=A"}),
+])
+def test_and_of_key_equalities_narrows(query, keys):
+    assert sql_key_values(query) == keys
+
+
+@pytest.mark.parametrize("query", [
+    "SELECT * FROM task WHERE order_id = 'A' OR status = 'PENDING'",
+    "SELECT * FROM task WHERE order_id = 'A' AND status = 'PENDING'",
+    "SELECT * FROM task WHERE NOT order_id = 'A'",
+    "SELECT * FROM task WHERE order_id IN (SELECT order_id FROM task_stuck_flags)",
+    "SELECT * FROM task WHERE order_id = 'A' UNION SELECT * FROM task WHERE order_id = 'B'",
+    "SELECT * FROM task",
+    "UPDATE task SET order_id = 'B' WHERE order_id = 'A'",
+    "INSERT INTO task (order_id) VALUES ('A')",
+])
+def test_anything_else_is_table_wide(query):
+    assert sql_key_values(query) == set()
+
+
+# --- Invalidation ---
+
+
+def test_write_with_or_drops_reads_of_other_keys(cache):
+    read = "SELECT * FROM task WHERE order_id = 'B'"
+    cache_read(cache, read)
+    assert invalidate_for_sql_write("UPDATE task SET status = 'X' WHERE order_id = 'A' OR status = 'PENDING'") == 1
+    assert cache.get(read) is None
+
+
+def test_read_with_or_is_dropped_by_write_of_any_key(cache):
+    read = "SELECT * FROM task WHERE order_id = 'A' OR status = 'PENDING'"
+    cache_read(cache, read)
+    assert invalidate_for_sql_write("UPDATE task SET status = 'X' WHERE order_id = 'C'") == 1
+    assert cache.get(read) is None
+
+
+def test_keyed_write_keeps_reads_of_other_keys(cache):
+    kept = "SELECT * FROM task WHERE order_id = 'B'"
+    dropped = "SELECT * FROM task WHERE order_id IN ('A', 'C')"
+    cache_read(cache, kept)
+    cache_read(cache, dropped)
+    assert invalidate_for_sql_write("UPDATE task SET status = 'X' WHERE order_id = 'A'") == 1
+    assert cache.get(kept) is not None
+    assert cache.get(dropped) is None
+
+
+def test_key_changing_update_drops_every_read_of_the_table(cache):
+    read = "SELECT * FROM task WHERE order_id = 'B'"
+    cache_read(cache, read)
+    assert invalidate_for_sql_write("UPDATE task SET order_id = 'B' WHERE order_id = 'A'") == 1
+    assert cache.get(read) is None
+
+
+def test_write_to_another_table_keeps_reads(cache):
+    read = "SELECT * FROM task WHERE order_id = 'A'"
+    cache_read(cache, read)
+    assert invalidate_for_sql_write("DELETE FROM task_stuck_flags WHERE order_id = 'A'") == 0
+    assert cache.get(read) is not None